@@ -0,0 +1,195 @@
+"""
+Asyncio variant of the survey API.
+
+Requests are handled on an event loop. Database calls run on a bounded thread
+pool, sized to the connection pool, so one process can hold many in-flight
+requests while only ASYNC_DB_THREADS of them touch the database at a time.
+Validation, caching and SQL are shared with the Flask app in app.main.
+
+    uvicorn app.asgi:app --port 8001
+    gunicorn -k uvicorn.workers.UvicornWorker app.asgi:app
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.config import Config
+from app import main
+from app.utils.response_reader import decode_cursor, parse_since, parse_limit, fetch_responses_page
+
+logger = logging.getLogger(__name__)
+
+_db_executor = None
+_db_slots = None
+
+
+async def run_db(func, *args):
+    """
+    Run a blocking database call on the DB thread pool.
+    At most ASYNC_DB_MAX_PENDING calls may be queued or running; further callers wait.
+    """
+    async with _db_slots:
+        return await asyncio.get_running_loop().run_in_executor(_db_executor, func, *args)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _db_executor, _db_slots
+    _db_executor = ThreadPoolExecutor(max_workers=Config.ASYNC_DB_THREADS, thread_name_prefix='db')
+    _db_slots = asyncio.Semaphore(Config.ASYNC_DB_MAX_PENDING)
+    # Idempotent, so also safe under gunicorn's UvicornWorker, whose post_fork hook starts them too
+    main.start_background_services()
+    try:
+        yield
+    finally:
+        _db_executor.shutdown(wait=True)  # Let running database calls finish before the pool is closed
+        main.stop_background_services()
+
+
+async def conduct_survey(request):
+    """API endpoint to submit a survey"""
+    start_time = time.time()
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        error = main.validate_submission(data)
+        if error:
+            main.survey_failures.inc()
+            return JSONResponse({'error': error}, status_code=400)
+
+        survey = await run_db(main.metadata_cache.get_survey)
+        if survey is None:
+            main.survey_failures.inc()
+            return JSONResponse({'error': 'Survey not found'}, status_code=404)
+
+        errors = main.check_answers(survey, data['answers'])
+        if errors:
+            main.survey_failures.inc()
+            return JSONResponse({'error': 'Invalid answers', 'errors': errors}, status_code=400)
+
+        if Config.INGEST_MODE == 'spool':
+            receipt_id = await run_db(main.spool_submission, data['answers'])
+            return JSONResponse({'message': 'Survey accepted', 'receipt_id': receipt_id}, status_code=202)
+
+        response_id = await run_db(main.submit_answers, survey, data['answers'])
+        main.survey_counter.inc()
+        return JSONResponse({'message': 'Survey submitted successfully', 'response_id': response_id},
+                            status_code=201)
+
+    except Exception as e:
+        main.survey_failures.inc()
+        logger.error(f"Survey submission failed: {e}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+    finally:
+        main.survey_duration.observe(time.time() - start_time)
+
+
+async def get_questions(request):
+    """API endpoint to get survey questions (served from the metadata cache with an ETag)"""
+    with main.request_duration.labels(method='GET', endpoint='/api/questions').time():
+        try:
+            survey = await run_db(main.metadata_cache.get_survey)
+            if survey is None:
+                return JSONResponse({'error': 'Survey not found'}, status_code=404)
+
+            headers = {'ETag': f'"{survey.etag}"', 'Cache-Control': 'no-cache'}
+            if_none_match = request.headers.get('if-none-match', '')
+            if headers['ETag'] in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+                return Response(status_code=304, headers=headers)
+            return Response(survey.questions_json, media_type='application/json', headers=headers)
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve questions: {e}")
+            return JSONResponse({'error': str(e)}, status_code=500)
+
+
+def _fetch_page(after_id, since, limit):
+    with main.storage.connection() as conn:
+        return fetch_responses_page(conn.cursor(), after_id, since, limit, main.storage.dialect,
+                                    main.archived_responses_for(after_id, since))
+
+
+async def _stream_document(stream, first_chunk):
+    """Relay the synchronous responses stream, pulling each chunk on the DB thread pool"""
+    try:
+        yield first_chunk
+        while True:
+            chunk = await run_db(next, stream, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # Returns the pooled connection even if the client disconnects mid-stream
+        await run_db(stream.close)
+
+
+async def get_responses(request):
+    """API endpoint to get survey responses (same parameters as the Flask route)"""
+    with main.request_duration.labels(method='GET', endpoint='/api/responses').time():
+        try:
+            after_id = decode_cursor(request.query_params.get('after'))
+            since = parse_since(request.query_params.get('since'))
+            limit = parse_limit(request.query_params.get('limit'))
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        try:
+            if limit is not None:
+                page = await run_db(_fetch_page, after_id, since, limit)
+                return JSONResponse(page)
+
+            stream = main.stream_responses(after_id, since)
+            first_chunk = await run_db(next, stream)  # Runs the query so database errors still return a 500
+            return StreamingResponse(_stream_document(stream, first_chunk), media_type='application/json')
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve responses: {e}")
+            return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def health_check(request):
+    """Health check endpoint (the cached database check shared with the Flask app)"""
+    body, status = await run_db(main.health)
+    return JSONResponse(body, status_code=status)
+
+
+async def liveness_check(request):
+    """Liveness probe: never touches the database"""
+    return JSONResponse({'status': 'alive'})
+
+
+async def readiness_check(request):
+    """Readiness probe: 503 until background initialization has finished or while the database is unreachable"""
+    body, status = await run_db(main.readiness)
+    return JSONResponse(body, status_code=status)
+
+
+async def metrics(request):
+    """Prometheus metrics endpoint"""
+    # Collectors may query the database, so scraping also goes through the DB pool
+    body = await run_db(generate_latest, main.metrics_registry())
+    return Response(body, headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+
+app = Starlette(
+    routes=[
+        Route('/api/survey', conduct_survey, methods=['POST']),
+        Route('/api/questions', get_questions, methods=['GET']),
+        Route('/api/responses', get_responses, methods=['GET']),
+        Route('/health', health_check, methods=['GET']),
+        Route('/livez', liveness_check, methods=['GET']),
+        Route('/readyz', readiness_check, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,137 @@
+"""
+Fingerprinted, precompressed static assets.
+
+The build step copies every file under static/ into the asset directory with a
+content hash in its name (css/survey.css -> css/survey.1a2b3c4d5e6f.css),
+writes gzip and brotli variants of text files next to it, and records the
+mapping in manifest.json:
+
+    python -m app.assets build [--output build/assets]
+
+The app serves the build under /assets/ with a year-long immutable
+Cache-Control, since changed content always gets a new URL, and picks the .br
+or .gz variant from Accept-Encoding. Templates link files with asset_url(),
+which falls back to the plain /static/ URL when nothing was built.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+# Same default as Config.ASSET_DIR; the build does not import Config so it runs without database settings
+DEFAULT_OUTPUT_DIR = os.getenv('ASSET_DIR', os.path.join('build', 'assets'))
+MANIFEST_NAME = 'manifest.json'
+URL_PREFIX = '/assets/'
+MAX_AGE = 365 * 24 * 3600
+
+# Already-compressed formats (images, fonts) gain nothing from another pass
+COMPRESSIBLE = {'.css', '.js', '.svg', '.html', '.json', '.txt', '.map', '.xml', '.ico'}
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(name, digest):
+    root, ext = os.path.splitext(name)
+    return f"{root}.{digest}{ext}"
+
+
+def _write(path, data):
+    """Write atomically, so a server reading the directory never sees a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _compressed_variants(data):
+    yield '.gz', gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress(data, quality=11)
+
+
+def build_assets(source_dir=STATIC_DIR, output_dir=DEFAULT_OUTPUT_DIR):
+    """
+    Fingerprint and precompress every file in source_dir; returns the manifest.
+    Files from earlier builds are kept, so pages rendered before a deploy still load.
+    """
+    if brotli is None:
+        logger.warning("brotli is not installed; building gzip variants only (pip install brotli)")
+    manifest = {}
+    for directory, _, filenames in sorted(os.walk(source_dir)):
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, source_dir).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            built = hashed_name(name, fingerprint(data))
+            target = os.path.join(output_dir, built)
+            _write(target, data)
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                for suffix, compressed in _compressed_variants(data):
+                    if len(compressed) < len(data):
+                        _write(target + suffix, compressed)
+            manifest[name] = built
+    _write(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    logger.info(f"Built {len(manifest)} assets into {output_dir}")
+    return manifest
+
+
+class AssetManifest:
+    """The built assets of one directory, loaded once; empty when nothing was built."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+                self.paths = json.load(f)
+        except FileNotFoundError:
+            self.paths = {}
+        self._built = set(self.paths.values())
+
+    def url(self, name):
+        """Fingerprinted URL for the static file name, or None if it was not built."""
+        built = self.paths.get(name)
+        return URL_PREFIX + built if built else None
+
+    def locate(self, built_name, accept_encodings):
+        """
+        Return (path, content_encoding) of the best variant of a built asset the
+        client accepts (content_encoding None for the original), or None if
+        built_name is not in the manifest.
+        """
+        if built_name not in self._built:
+            return None
+        path = os.path.join(self.directory, *built_name.split('/'))
+        for encoding, suffix in ENCODINGS:
+            if accept_encodings[encoding] and os.path.isfile(path + suffix):
+                return path + suffix, encoding
+        return path, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets")
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--source', default=STATIC_DIR, help='static files to build')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help='where built assets and manifest.json go')
+    args = parser.parse_args(argv)
+    build_assets(args.source, args.output)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -28,17 +28,123 @@ class Config:
         f"Connection Timeout=30;" # Increase timeout if needed
     )
 
+    # Storage backend (app.utils.storage): 'sqlserver' (Azure SQL via pyodbc) or 'sqlite' (embedded file)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlserver')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join('data', 'survey.db'))
+    SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 5)) # Seconds a writer waits for the write lock
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL') # FULL fsyncs every commit (survives power loss)
+
+    # Connection pool settings (see app.utils.db_utils.ConnectionPool)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10)) # Max connections per database
+    DB_POOL_MIN_IDLE = int(os.getenv('DB_POOL_MIN_IDLE', 2)) # Warm connections opened on startup
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5)) # Seconds to wait for a free connection
+    DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)) # Recycle connections older than this
+    DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', 30)) # Validate connections idle longer than this
+
+    # Statements slower than this are written to the app.db.slow log (with parameter types, not values)
+    DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 500))
+
+    # Fingerprinted, precompressed static files built by `python -m app.assets build`, served under /assets/
+    ASSET_DIR = os.getenv('ASSET_DIR', os.path.join('build', 'assets'))
+
+    # Response compression (app.utils.compression): encodings in order of preference, empty disables it
+    COMPRESS_ENCODINGS = [e.strip() for e in os.getenv('COMPRESS_ENCODINGS', 'zstd,br,gzip').split(',') if e.strip()]
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024)) # Smaller buffered bodies are sent as-is
+    COMPRESS_ZSTD_LEVEL = int(os.getenv('COMPRESS_ZSTD_LEVEL', 3)) # 1-22
+    COMPRESS_BROTLI_LEVEL = int(os.getenv('COMPRESS_BROTLI_LEVEL', 4)) # 0-11
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6)) # 1-9
+
+    # Trends (/api/trends): the questions giving each response's site and 1-5 satisfaction score, and
+    # how long after a bucket ends it is treated as closed and cached for good (late uploads invalidate it)
+    TREND_SITE_QUESTION = os.getenv('TREND_SITE_QUESTION', 'Which site did you visit?')
+    TREND_RATING_QUESTION = os.getenv('TREND_RATING_QUESTION', 'Overall satisfaction (1-5)')
+    TREND_SETTLE_HOURS = float(os.getenv('TREND_SETTLE_HOURS', 48))
+
+    # Free-text search (/api/search): an in-process index per worker over text answers, except these questions
+    SEARCH_INDEX_ENABLED = os.getenv('SEARCH_INDEX_ENABLED', 'true').lower() == 'true'
+    SEARCH_EXCLUDED_QUESTIONS = [
+        q.strip() for q in os.getenv('SEARCH_EXCLUDED_QUESTIONS', 'Patient name?,Date of visit?').split(',') if q.strip()
+    ]
+    SEARCH_SNAPSHOT_PATH = os.getenv('SEARCH_SNAPSHOT_PATH', os.path.join('data', 'search_index.json.gz'))
+    SEARCH_SYNC_INTERVAL = float(os.getenv('SEARCH_SYNC_INTERVAL', 5)) # Seconds between catch-ups with other workers' writes
+
+    # Hot/cold tiering (python -m app.utils.archive run): responses older than this many days move out of the
+    # responses/answers tables into compressed files under ARCHIVE_DIR, which reads consult for old date ranges
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join('data', 'archive'))
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+    # The job refuses to run unless ARCHIVE_DIR is on a mounted, persistent volume (false for local runs only)
+    ARCHIVE_REQUIRE_PERSISTENT = os.getenv('ARCHIVE_REQUIRE_PERSISTENT', 'true').lower() == 'true'
+
+    # Seconds before cached survey/question definitions are reloaded
+    METADATA_CACHE_TTL = float(os.getenv('METADATA_CACHE_TTL', 300))
+
+    # Seconds a database check is reused by the /readyz and /health probes
+    HEALTH_CHECK_TTL = float(os.getenv('HEALTH_CHECK_TTL', 10))
+
+    # Seconds the database-derived /metrics totals are cached between scrapes
+    DB_METRICS_TTL = float(os.getenv('DB_METRICS_TTL', 30))
+
+    # Seconds between background samples of CPU, memory, threads, FDs and GC (app.utils.system_metrics)
+    SYSTEM_METRICS_INTERVAL = float(os.getenv('SYSTEM_METRICS_INTERVAL', 15))
+
+    # Survey ingestion: 'direct' writes each submission synchronously,
+    # 'spool' acknowledges with 202 and group-commits from a local durable spool
+    INGEST_MODE = os.getenv('INGEST_MODE', 'direct')
+    INGEST_SPOOL_PATH = os.getenv('INGEST_SPOOL_PATH', os.path.join('data', 'ingest_spool.db'))
+    INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 100)) # Max submissions per group commit
+    INGEST_FLUSH_INTERVAL = float(os.getenv('INGEST_FLUSH_INTERVAL', 0.5)) # Idle poll interval in seconds
+    # Bulk uploads from offline kiosks (POST /api/survey/batch), written in one transaction
+    BATCH_MAX_RESPONSES = int(os.getenv('BATCH_MAX_RESPONSES', 500)) # Max responses per request
+
+    # Production server (gunicorn.conf.py). Each worker has its own DB_POOL_SIZE connections.
+    WEB_BIND = os.getenv('WEB_BIND', '0.0.0.0:8001')
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', min(2 * (os.cpu_count() or 1) + 1, 8)))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 4)) # Request threads per worker
+    WEB_KEEPALIVE = int(os.getenv('WEB_KEEPALIVE', 5)) # Seconds to hold idle keep-alive connections
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', 60)) # Restart workers silent for longer than this
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30)) # Time to finish requests on reload/stop
+    WEB_MAX_REQUESTS = int(os.getenv('WEB_MAX_REQUESTS', 0)) # Recycle workers after this many requests (0 = never)
+    WEB_PRELOAD = os.getenv('WEB_PRELOAD', 'true').lower() == 'true' # Import the app once before forking
+
+    # Admission control for database-bound endpoints (app.utils.admission), per worker; 0 capacity disables it.
+    # By default running plus waiting requests leave one request thread free, so /metrics, health checks and
+    # the survey page are still served while the database is slow.
+    ADMISSION_CAPACITY = int(os.getenv('ADMISSION_CAPACITY', max(1, min(DB_POOL_SIZE, WEB_THREADS - 1))))
+    # Requests that may wait for a running one to finish
+    ADMISSION_QUEUE = int(os.getenv('ADMISSION_QUEUE', max(0, WEB_THREADS - 1 - ADMISSION_CAPACITY)))
+    ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', 1.0)) # Seconds a request waits before it is shed
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 2)) # Retry-After seconds sent with a 503
+    # Optional per-endpoint limits as endpoint=n pairs (e.g. export=1), so analyst reads cannot take every slot
+    ADMISSION_LIMITS = {
+        name.strip(): int(limit) for name, _, limit in
+        (item.partition('=') for item in os.getenv('ADMISSION_LIMITS', '').split(','))
+        if name.strip()
+    }
+    # Asyncio API (app.asgi): threads running pyodbc calls, and how many calls may wait for one
+    ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', DB_POOL_SIZE))
+    ASYNC_DB_MAX_PENDING = int(os.getenv('ASYNC_DB_MAX_PENDING', 200))
+    # Each process applies pending migrations in the background before /readyz reports ready.
+    # Set to false when migrations run as a separate deploy step (python -m app.utils.migrations upgrade)
+    MIGRATE_ON_START = os.getenv('MIGRATE_ON_START', 'true').lower() == 'true'
+
     @classmethod
     def validate(cls):
         missing = []
+        if cls.STORAGE_BACKEND not in ('sqlserver', 'sqlite'):
+            raise ValueError(f"STORAGE_BACKEND must be 'sqlserver' or 'sqlite', got {cls.STORAGE_BACKEND!r}")
+        if cls.SQLITE_SYNCHRONOUS.upper() not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError(f"SQLITE_SYNCHRONOUS must be OFF, NORMAL, FULL or EXTRA, got {cls.SQLITE_SYNCHRONOUS!r}")
         if not cls.DB_HOST:
             missing.append('DB_HOST')
-        if not cls.DB_USER:
+        # SQL Server credentials are not needed with the embedded backend
+        if not cls.DB_USER and cls.STORAGE_BACKEND == 'sqlserver':
             missing.append('DB_USER')
         if not cls.DB_PASSWORD:
             pass
         if not cls.ODBC_DRIVER:
             missing.append('ODBC_DRIVER')
+        if cls.INGEST_MODE not in ('direct', 'spool'):
+            raise ValueError(f"INGEST_MODE must be 'direct' or 'spool', got {cls.INGEST_MODE!r}")
 
         if missing:
             raise ValueError(f"Missing required config values: {missing}")
@@ -0,0 +1,302 @@
+"""
+Bulk export of survey responses to CSV, NDJSON or Parquet.
+
+Responses are read in keyset chunks of a fixed number of responses, each on a
+freshly borrowed pooled connection, and written one row per response with one
+column per question. Memory use depends on the chunk size, not the export size.
+
+    python -m app.export --format csv --from 2025-01-01 --to 2025-02-01 -o january.csv
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from datetime import date, datetime
+from itertools import islice
+
+from app.utils.archive import merge_responses
+from app.utils.db_utils import db_statement
+from app.utils.sql_dialects import SQL_SERVER
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def parse_date(value):
+    """Parse an ISO date or datetime bound; None when not given."""
+    if not value:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date (expected ISO-8601): {value!r}")
+
+
+def iter_response_chunks(connect, survey_id, date_from=None, date_to=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                         dialect=SQL_SERVER, archive=None, answer_pairs=False):
+    """
+    Yield lists of (response_id, submitted_at, {question_id: answer_value}), or with
+    answer_pairs a list of every (question_id, answer_value) row instead of the dict.
+
+    Each chunk is one keyset query on the responses primary key, bounded by
+    submitted_at >= date_from and submitted_at < date_to when given. Archived
+    responses in the range (app.utils.archive) are merged in by response_id.
+    """
+    if archive is not None and archive.overlaps(survey_id, date_from=date_from, date_to=date_to):
+        hot = (row for chunk in iter_response_chunks(connect, survey_id, date_from, date_to, chunk_size, dialect,
+                                                     answer_pairs=answer_pairs)
+               for row in chunk)
+        cold = archive.iter_responses(survey_id, date_from=date_from, date_to=date_to)
+        if not answer_pairs:
+            cold = ((response_id, submitted_at, dict(answers)) for response_id, submitted_at, answers in cold)
+        merged = merge_responses(hot, cold)
+        while True:
+            chunk = list(islice(merged, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    after_id = 0
+    while True:
+        filters = "survey_id = ? AND response_id > ?"
+        params = [survey_id, after_id]
+        if date_from is not None:
+            filters += " AND submitted_at >= ?"
+            params.append(date_from)
+        if date_to is not None:
+            filters += " AND submitted_at < ?"
+            params.append(date_to)
+        responses, params = dialect.select_first(
+            "response_id, submitted_at", "responses", filters, params, "response_id", chunk_size
+        )
+
+        chunk = []
+        with connect() as conn:
+            cursor = conn.cursor()
+            with db_statement('export_chunk'):
+                cursor.execute(f"""
+                    SELECT r.response_id, r.submitted_at, a.question_id, a.answer_value
+                    FROM ({responses}) r
+                    LEFT JOIN answers a ON a.response_id = r.response_id
+                    ORDER BY r.response_id, a.question_id
+                """, params)  # nosec B608 # responses is a select_first derived table over constant names
+            for response_id, submitted_at, question_id, answer_value in cursor:
+                if not chunk or chunk[-1][0] != response_id:
+                    chunk.append((response_id, submitted_at, [] if answer_pairs else {}))
+                if question_id is None:
+                    continue
+                if answer_pairs:
+                    chunk[-1][2].append((question_id, answer_value))
+                else:
+                    chunk[-1][2][question_id] = answer_value
+
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        after_id = chunk[-1][0]
+
+
+def _column_names(questions):
+    """One unique column name per question, based on its text."""
+    names, seen = [], set()
+    for question in questions:
+        name = question.question_text
+        if name in seen:
+            name = f"{name} ({question.question_id})"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _timestamp(value):
+    return value.isoformat(sep=' ') if isinstance(value, datetime) else value
+
+
+class CsvWriter:
+    def __init__(self, questions):
+        self.question_ids = [q.question_id for q in questions]
+        self.header = ['response_id', 'submitted_at'] + _column_names(questions)
+
+    def _render(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+    def begin(self):
+        return self._render([self.header])
+
+    def write(self, chunk):
+        return self._render(
+            [response_id, _timestamp(submitted_at)] + [answers.get(q) for q in self.question_ids]
+            for response_id, submitted_at, answers in chunk
+        )
+
+    def end(self):
+        return b''
+
+
+class NdjsonWriter:
+    def __init__(self, questions):
+        self.columns = list(zip([q.question_id for q in questions], _column_names(questions)))
+
+    def begin(self):
+        return b''
+
+    def write(self, chunk):
+        return ''.join(
+            json.dumps({
+                'response_id': response_id,
+                'submitted_at': _timestamp(submitted_at),
+                'answers': {name: answers.get(question_id) for question_id, name in self.columns}
+            }) + '\n'
+            for response_id, submitted_at, answers in chunk
+        ).encode('utf-8')
+
+    def end(self):
+        return b''
+
+
+class _DrainableSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+class ParquetWriter:
+    """zstd-compressed Parquet, one row group per chunk."""
+
+    def __init__(self, questions):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self.question_ids = [q.question_id for q in questions]
+        self.names = ['response_id', 'submitted_at'] + _column_names(questions)
+        self.schema = pa.schema(
+            [('response_id', pa.int64()), ('submitted_at', pa.timestamp('ms'))]
+            + [(name, pa.string()) for name in self.names[2:]]
+        )
+        self._sink = _DrainableSink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression='zstd')
+
+    def begin(self):
+        return b''
+
+    def write(self, chunk):
+        columns = [
+            [row[0] for row in chunk],
+            [row[1] for row in chunk],
+        ] + [[row[2].get(q) for row in chunk] for q in self.question_ids]
+        self._writer.write_table(self._pa.table(columns, schema=self.schema))
+        return self._sink.drain()
+
+    def end(self):
+        self._writer.close()
+        return self._sink.drain()
+
+
+WRITERS = {'csv': CsvWriter, 'ndjson': NdjsonWriter, 'parquet': ParquetWriter}
+
+
+def export_responses(connect, survey, fmt='csv', date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE, stats=None, dialect=SQL_SERVER, archive=None):
+    """
+    Generate the export file as a stream of byte chunks.
+    If stats (a dict) is given, it is filled with row and chunk counts as the export progresses.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format {fmt!r}; choose one of {', '.join(WRITERS)}")
+    writer = WRITERS[fmt](survey.questions)
+    stats = stats if stats is not None else {}
+    stats.update(rows=0, chunks=0)
+
+    header = writer.begin()
+    if header:
+        yield header
+    for chunk in iter_response_chunks(connect, survey.survey_id, date_from, date_to, chunk_size, dialect, archive):
+        stats['rows'] += len(chunk)
+        stats['chunks'] += 1
+        data = writer.write(chunk)
+        if data:
+            yield data
+    trailer = writer.end()
+    if trailer:
+        yield trailer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export survey responses")
+    parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+    parser.add_argument('--from', dest='date_from', type=parse_date, help='submitted on or after (ISO date)')
+    parser.add_argument('--to', dest='date_to', type=parse_date, help='submitted before (ISO date)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='responses per query')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    from app.config import Config
+    from app.utils.archive import ResponseArchive
+    from app.utils.metadata_cache import MetadataCache
+    from app.utils.storage import get_storage
+
+    storage = get_storage()
+    connect = storage.connection
+    survey = MetadataCache(connect).get_survey()
+    if survey is None:
+        raise SystemExit("Survey not found")
+
+    stats = {}
+    start = time.perf_counter()
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for data in export_responses(connect, survey, args.format, args.date_from, args.date_to,
+                                     args.chunk_size, stats, storage.dialect, ResponseArchive(Config.ARCHIVE_DIR)):
+            out.write(data)
+    finally:
+        if args.output:
+            out.close()
+    elapsed = time.perf_counter() - start
+    logger.info(f"Exported {stats['rows']} responses in {stats['chunks']} chunks, {elapsed:.2f}s "
+                f"({stats['rows'] / elapsed if elapsed else 0:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,13 +1,43 @@
+import time
+_import_started = time.perf_counter()  # Reported as the 'import' startup phase
+
 import os
+import re
+import functools
+import hashlib
 import logging
-import json
-import time
-import pyodbc
-import psutil
+import threading
+import mimetypes
+from datetime import date, datetime, timedelta, timezone
+from itertools import chain
 import platform
-from flask import Flask, request, jsonify, render_template
-from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST, Gauge, Histogram, Summary
-from app.utils.db_utils import get_db_connection
+from flask import Flask, Response, request, jsonify, render_template, send_file, url_for
+from prometheus_client import (
+    Counter, generate_latest, CONTENT_TYPE_LATEST, Histogram, Summary, REGISTRY, CollectorRegistry, multiprocess
+)
+from app.utils.archive import ResponseArchive
+from app.utils.db_utils import db_statement
+from app.utils.storage import get_storage
+from app.utils.submissions import BatchItem
+from app.utils.spool import SubmissionSpool, SpoolWriter, SpoolMetricsCollector
+from app.utils.metadata_cache import MetadataCache
+from app.utils.db_metrics import DatabaseMetricsCollector
+from app.utils.system_metrics import SystemMetricsSampler
+from app.utils.startup import Startup, CachedCheck, record_phase
+from app.utils.compression import ResponseCompressor
+from app.utils.admission import (
+    AdmissionController, AdmissionRejected, PRIORITY_SUBMISSION, PRIORITY_READ, PRIORITY_BULK_READ
+)
+from app.utils.rollups import rollup_rows, fetch_distribution, build_stats
+from app.utils.search_index import TextIndex, SearchIndexer, indexable_fields
+from app.utils.trends import (
+    GRANULARITIES as TREND_GRANULARITIES, TrendCache, bucket_range, default_first_day, find_question, load_trend
+)
+from app.assets import AssetManifest, MAX_AGE as ASSET_MAX_AGE
+from app.export import FORMATS as EXPORT_FORMATS, export_responses, parse_date as parse_export_date
+from app.utils.response_reader import (
+    decode_cursor, parse_since, parse_limit, fetch_responses_page, stream_responses_json, archived_responses
+)
 from app.config import Config
 
 # Initialize logging
@@ -15,282 +45,491 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app directly
-app = Flask(__name__, template_folder='../templates', static_folder='static', static_url_path='/static')
+app = Flask(__name__, template_folder='../templates', static_folder='../static', static_url_path='/static')
 
 # Simple direct metric creation
-survey_counter = Counter('patient_survey_submissions_total', 'Total number of patient surveys submitted')
+# Per-process submission outcomes; database-wide totals come from db_metrics below
+survey_counter = Counter('patient_survey_submissions_accepted_total', 'Survey submissions stored by this process')
+spool_batch_size = Histogram('patient_survey_spool_batch_size', 'Survey submissions written per group commit',
+                             buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+survey_batch_size = Histogram('patient_survey_batch_size', 'Survey responses per bulk upload',
+                              buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
 survey_duration = Summary('patient_survey_duration_seconds', 'Time spent completing surveys')
-survey_failures = Counter('patient_survey_failures_total', 'Total failed survey submissions')
-active_surveys = Gauge('active_surveys_total', 'Number of active surveys initialized')
-question_count = Gauge('survey_questions_total', 'Total number of questions initialized')
+survey_failures = Counter('patient_survey_submission_errors_total', 'Survey submissions rejected or failed in this process')
+validation_errors = Counter('patient_survey_validation_errors_total', 'Submitted answers rejected by validation',
+                            ['code'])
 request_duration = Histogram('http_request_duration_seconds', 'HTTP request duration in seconds', ['method', 'endpoint'])
-active_connections = Gauge('db_active_connections', 'Number of active database connections')
 
-system_cpu_usage = Gauge('app_cpu_usage_percent', 'Application CPU usage percentage')
-system_memory_usage = Gauge('app_memory_usage_bytes', 'Application memory usage in bytes')
-system_uptime = Gauge('app_uptime_seconds', 'Application uptime in seconds')
 start_time = time.time()
-
-def initialize_metrics_from_db():
-    """Initialize Prometheus metrics from the database for absolute totals"""
+system_sampler = None
+
+# SQL Server or embedded SQLite, per Config.STORAGE_BACKEND
+storage = get_storage()
+
+# Survey and question definitions, shared by every route
+metadata_cache = MetadataCache(storage.connection, ttl=Config.METADATA_CACHE_TTL)
+
+# Responses moved out of the hot tables by `python -m app.utils.archive run`
+archive = ResponseArchive(Config.ARCHIVE_DIR)
+
+# Submission, failure, survey and question totals, read from the database (plus the archive) at scrape time
+db_metrics = DatabaseMetricsCollector(storage.connection, ttl=Config.DB_METRICS_TTL,
+                                      loader=lambda conn: archive.add_totals(storage.load_totals(conn)))
+REGISTRY.register(db_metrics)
+
+# Closed trend buckets, kept until a late upload lands in one
+trend_cache = TrendCache()
+TREND_SETTLE = timedelta(hours=Config.TREND_SETTLE_HOURS)
+
+# Database setup, run in the background by start_background_services(); /readyz reports when it is done
+startup = None
+_startup_lock = threading.Lock()
+
+# Database round trip shared by /readyz and /health, at most once per HEALTH_CHECK_TTL seconds
+database_check = CachedCheck(lambda: check_database(), ttl=Config.HEALTH_CHECK_TTL)
+
+# Free-text answers, indexed in memory; built in the background by start_background_services()
+search_index = TextIndex()
+search_indexer = None
+
+# Bounds concurrent database work per worker and sheds the excess with 503s
+admission = AdmissionController(
+    Config.ADMISSION_CAPACITY, Config.ADMISSION_QUEUE, Config.ADMISSION_MAX_WAIT,
+    limits=Config.ADMISSION_LIMITS, retry_after=Config.ADMISSION_RETRY_AFTER
+) if Config.ADMISSION_CAPACITY > 0 else None
+
+# Built static assets (empty until `python -m app.assets build` has run)
+assets = AssetManifest(Config.ASSET_DIR)
+
+@app.template_global()
+def asset_url(name):
+    """Fingerprinted URL for a file in static/, or its plain /static/ URL when assets were not built"""
+    return assets.url(name) or url_for('static', filename=name)
+
+# JSON, NDJSON, CSV and HTML bodies are compressed with the best encoding the client accepts
+response_compressor = ResponseCompressor(
+    Config.COMPRESS_ENCODINGS,
+    levels={'zstd': Config.COMPRESS_ZSTD_LEVEL, 'br': Config.COMPRESS_BROTLI_LEVEL, 'gzip': Config.COMPRESS_GZIP_LEVEL},
+    min_size=Config.COMPRESS_MIN_SIZE,
+    mimetypes=('application/json', 'application/x-ndjson', 'text/csv', 'text/html'),
+)
+
+@app.after_request
+def compress_response(response):
+    return response_compressor.compress(response, request.accept_encodings)
+
+# Home page rendered for the current question-set version (see render_index)
+_index_page = None
+
+# Write-behind ingestion (INGEST_MODE=spool)
+_ingest_spool = None
+_ingest_writer = None
+_ingest_lock = threading.Lock()
+
+spool_metrics = SpoolMetricsCollector(lambda: _ingest_spool)
+REGISTRY.register(spool_metrics)
+
+def metrics_registry():
+    """Registry served on /metrics, aggregated across worker processes when running under gunicorn"""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(db_metrics)
+    registry.register(spool_metrics)
+    return registry
+
+def _write_spooled_batch(items):
+    """Group-commit a batch of spooled submissions to the database"""
+    survey = metadata_cache.get_survey()
+    if survey is None:
+        raise LookupError("Survey not found")
     try:
-        conn = get_db_connection(database_name=Config.DB_NAME)
-        cursor = conn.cursor()
-
-        # Total survey submissions
-        cursor.execute("SELECT COUNT(*) FROM responses")
-        total_submissions = cursor.fetchone()[0] or 0
-        survey_counter._value.set(total_submissions)  # Absolute value
-
-        # Total survey failures
-        cursor.execute("SELECT COUNT(*) FROM responses WHERE response_id IN (SELECT response_id FROM answers WHERE answer_value IS NULL)")
-        total_failures = cursor.fetchone()[0] or 0
-        survey_failures._value.set(total_failures)
-
-        # Total active surveys
-        cursor.execute("SELECT COUNT(*) FROM surveys WHERE is_active = 1")
-        total_active = cursor.fetchone()[0] or 0
-        active_surveys.set(total_active)
+        with storage.connection() as conn:
+            written = storage.insert_spooled_responses(conn, items, survey.survey_id,
+                                                       rollups_for=lambda answers: rollup_rows(survey, answers))
+    except storage.integrity_errors:
+        metadata_cache.invalidate()  # The cached survey or questions may be stale
+        raise
+    invalidate_late_trends(item.submitted_at for item in items)
+    for item in items:
+        if item.receipt_id in written:
+            index_submission(written[item.receipt_id], item.answers, item.submitted_at)
+
+def sync_search_index():
+    """Index responses stored since the last sync, by any worker"""
+    survey = metadata_cache.get_survey()
+    if survey is None:
+        return 0
+    question_ids, site_question_id = indexable_fields(survey, Config.SEARCH_EXCLUDED_QUESTIONS,
+                                                      Config.TREND_SITE_QUESTION)
+    return search_index.sync(storage.connection, survey.survey_id, question_ids, site_question_id, archive)
+
+def index_submission(response_id, answers, submitted_at=None):
+    """Make a submission this process stored searchable at once; a failure here never fails the submission"""
+    try:
+        search_index.add_response(response_id, submitted_at or datetime.now(timezone.utc).replace(tzinfo=None),
+                                  answers)
+    except Exception as e:
+        logger.warning(f"Indexing response {response_id} failed; the next sync picks it up: {e}")
+
+def invalidate_late_trends(submitted_ats):
+    """Drop cached trend buckets that responses stored after the fact (spool backlog, kiosk uploads) land in"""
+    settled = datetime.now(timezone.utc).replace(tzinfo=None) - TREND_SETTLE
+    trend_cache.invalidate({t.date() for t in submitted_ats if t is not None and t < settled})
+
+def _spooled_batch_written(items):
+    spool_batch_size.observe(len(items))
+    survey_counter.inc(len(items))
+
+def _is_rejected_submission(error):
+    """Errors caused by the submission itself, which retrying will never fix"""
+    return isinstance(error, storage.rejected_errors)
+
+def get_ingest_spool():
+    """Return the submission spool, starting its background writer on first use"""
+    global _ingest_spool, _ingest_writer
+    with _ingest_lock:
+        if _ingest_spool is None:
+            _ingest_spool = SubmissionSpool(Config.INGEST_SPOOL_PATH)
+            _ingest_writer = SpoolWriter(
+                _ingest_spool,
+                _write_spooled_batch,
+                batch_size=Config.INGEST_BATCH_SIZE,
+                flush_interval=Config.INGEST_FLUSH_INTERVAL,
+                is_permanent_error=_is_rejected_submission,
+                on_batch=_spooled_batch_written
+            )
+            _ingest_writer.start()
+            logger.info(f"Ingestion spool started at {Config.INGEST_SPOOL_PATH}")
+        return _ingest_spool
+
+def load_survey_definitions():
+    """Load the survey and its questions into the metadata cache"""
+    if metadata_cache.get_survey() is None:
+        raise LookupError("Survey not found")
+
+def start_initialization():
+    """
+    Start setting up the database in the background, once per process: migrations (with MIGRATE_ON_START),
+    warm pooled connections and the survey definitions. Requests are served meanwhile
+    """
+    global startup
+    with _startup_lock:
+        if startup is None:
+            phases = [('migrate', initialize_database)] if Config.MIGRATE_ON_START else []
+            phases += [('warm_pool', storage.warm), ('metadata', load_survey_definitions)]
+            startup = Startup(phases)
+            startup.start()
+        return startup
+
+def stop_initialization():
+    """Abandon background initialization if it is still retrying"""
+    global startup
+    with _startup_lock:
+        if startup is not None:
+            startup.stop(timeout=1)
+            startup = None
+
+def start_background_services():
+    """
+    Per-process startup, none of which blocks serving: initialize the database, sample system metrics,
+    build the search index and, in spool mode, drain the spool
+    """
+    global system_sampler, search_indexer
+    start_initialization()
+    if system_sampler is None:
+        system_sampler = SystemMetricsSampler(Config.SYSTEM_METRICS_INTERVAL, start_time=start_time)
+        system_sampler.start()
+    if Config.SEARCH_INDEX_ENABLED and search_indexer is None:
+        search_indexer = SearchIndexer(search_index, sync_search_index, Config.SEARCH_SNAPSHOT_PATH,
+                                       Config.SEARCH_SYNC_INTERVAL)
+        search_indexer.start()
+    if Config.INGEST_MODE == 'spool':
+        get_ingest_spool()  # Replays anything left in the spool by a previous run
+
+def stop_background_services():
+    """
+    Stop the background threads, snapshotting the search index, and close pooled connections;
+    undrained submissions stay in the spool
+    """
+    global _ingest_spool, _ingest_writer, system_sampler, search_indexer
+    stop_initialization()
+    if system_sampler is not None:
+        system_sampler.stop(timeout=1)
+        system_sampler = None
+    if search_indexer is not None:
+        search_indexer.stop(timeout=5)
+        search_indexer = None
+    with _ingest_lock:
+        if _ingest_writer is not None:
+            _ingest_writer.stop(timeout=Config.INGEST_FLUSH_INTERVAL * 10)
+        _ingest_spool = _ingest_writer = None
+    storage.close()
 
-        # Total survey questions
-        cursor.execute("SELECT COUNT(*) FROM questions")
-        total_questions = cursor.fetchone()[0] or 0
-        question_count.set(total_questions)
+def initialize_database():
+    """Create the database if needed and bring its schema up to date"""
+    try:
+        # A single version query when the schema is already current
+        if storage.initialize():
+            metadata_cache.invalidate()
+        logger.info("Database initialized successfully")
 
-        # Optional: log the values for debugging
-        logger.info(f"Metrics initialized from DB: submissions={total_submissions}, failures={total_failures}, active_surveys={total_active}, questions={total_questions}")
+    except Exception as e:
+        logger.error(f"Database initialization failed: {e}")
+        raise
 
-        conn.close()
+def validate_submission(data):
+    """Return an error message for a malformed submission body, or None if it is well formed"""
+    if not data or 'answers' not in data:
+        return 'No JSON data provided or missing answers field'
+    if not isinstance(data.get('answers'), list):
+        return 'Answers must be a list'
+    for answer in data['answers']:
+        if not isinstance(answer, dict) or 'question_id' not in answer or 'answer_value' not in answer:
+            return 'Each answer must have question_id and answer_value'
+    return None
+
+def check_answers(survey, answers):
+    """Field errors for answers that do not fit the survey's questions; checked in memory, without the database"""
+    errors = survey.validator.validate(answers)
+    for error in errors:
+        validation_errors.labels(code=error['code']).inc()
+    return errors
+
+RECEIPT_ID = re.compile(r'^[0-9a-f]{32}$')
+# Kiosk clocks drift; later timestamps than this are rejected
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+def parse_submitted_at(value):
+    """Parse an ISO-8601 timestamp into a naive UTC datetime (naive values are taken as UTC)"""
+    # Date.toISOString() ends in Z, which datetime.fromisoformat only accepts from Python 3.11
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    submitted_at = datetime.fromisoformat(value)
+    if submitted_at.tzinfo is not None:
+        submitted_at = submitted_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return submitted_at
+
+def validate_batch_item(data, survey, now):
+    """Return (BatchItem, None) for a valid response of a bulk upload, or (None, error dict)"""
+    if not isinstance(data, dict):
+        return None, {'error': 'Each response must be an object'}
+    error = validate_submission(data)
+    if error:
+        return None, {'error': error}
+    errors = check_answers(survey, data['answers'])
+    if errors:
+        return None, {'error': 'Invalid answers', 'errors': errors}
+
+    submitted_at = data.get('submitted_at')
+    if submitted_at is not None:
+        try:
+            submitted_at = parse_submitted_at(submitted_at)
+        except (TypeError, ValueError):
+            return None, {'error': 'submitted_at must be an ISO-8601 timestamp'}
+        if submitted_at > now + MAX_CLOCK_SKEW:
+            return None, {'error': 'submitted_at is in the future'}
+
+    receipt_id = data.get('receipt_id')
+    if receipt_id is not None and not (isinstance(receipt_id, str) and RECEIPT_ID.match(receipt_id)):
+        return None, {'error': 'receipt_id must be 32 lowercase hex characters'}
+    return BatchItem(data['answers'], submitted_at, receipt_id), None
+
+def validate_batch(responses, survey):
+    """Validate every response of a bulk upload; returns (items, errors) with one error dict per bad response"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    items, errors, receipts = [], [], set()
+    for index, data in enumerate(responses):
+        item, error = validate_batch_item(data, survey, now)
+        if item is not None and item.receipt_id is not None:
+            if item.receipt_id in receipts:
+                item, error = None, {'error': 'Duplicate receipt_id in batch'}
+            else:
+                receipts.add(item.receipt_id)
+        if error:
+            errors.append({'index': index, **error})
+        items.append(item)
+    return items, errors
+
+def spool_submission(answers):
+    """Durably spool a submission for the background writer and return its receipt id"""
+    receipt_id = get_ingest_spool().append(answers)
+    _ingest_writer.notify()
+    return receipt_id
+
+def store_submission(survey, answers):
+    """Write the response, its answers and rollups in one transaction and return the response id"""
+    try:
+        with storage.connection() as conn:
+            return storage.insert_survey_response(conn, answers, survey.survey_id,
+                                                  rollups=rollup_rows(survey, answers))
+    except storage.integrity_errors:
+        metadata_cache.invalidate()  # The cached survey or questions may be stale
+        raise
 
-    except Exception as e:
-        logger.error(f"Failed to initialize metrics from DB: {e}")
-        if 'conn' in locals():
-            conn.close()
+def submit_answers(survey, answers):
+    """Store a submission and run the post-store hooks shared by the Flask and asyncio APIs; returns the response id"""
+    response_id = store_submission(survey, answers)
+    index_submission(response_id, answers)
+    return response_id
 
-def create_survey_tables(conn):
-    """Create all necessary tables for surveys safely (if not exist)"""
+def store_batch(survey, items):
+    """Write a bulk upload in one transaction; returns (response_id, created) per item"""
     try:
+        with storage.connection() as conn:
+            results = storage.insert_response_batch(conn, items, survey.survey_id,
+                                                    rollups_for=lambda answers: rollup_rows(survey, answers))
+    except storage.integrity_errors:
+        metadata_cache.invalidate()  # The cached survey or questions may be stale
+        raise
+    invalidate_late_trends(item.submitted_at for item in items)
+    return results
+
+def check_database():
+    """Round-trip a trivial query on a pooled connection"""
+    with storage.connection() as conn, db_statement('health_check'):
         cursor = conn.cursor()
+        cursor.execute("SELECT 1")
 
-        # Create surveys table
-        cursor.execute("""
-            IF OBJECT_ID('surveys', 'U') IS NULL
-            CREATE TABLE surveys (
-                survey_id INT IDENTITY(1,1) PRIMARY KEY,
-                title NVARCHAR(255) NOT NULL,
-                description NVARCHAR(MAX),
-                created_at DATETIME DEFAULT GETDATE(),
-                is_active BIT DEFAULT 1
-            )
-        """)
-
-        # Create questions table
-        cursor.execute("""
-            IF OBJECT_ID('questions', 'U') IS NULL
-            CREATE TABLE questions (
-                question_id INT IDENTITY(1,1) PRIMARY KEY,
-                survey_id INT NOT NULL,
-                question_text NVARCHAR(MAX) NOT NULL,
-                question_type NVARCHAR(50) NOT NULL,
-                is_required BIT DEFAULT 0,
-                options NVARCHAR(MAX),
-                FOREIGN KEY (survey_id) REFERENCES surveys(survey_id) ON DELETE CASCADE
-            )
-        """)
-
-        # Create responses table
-        cursor.execute("""
-            IF OBJECT_ID('responses', 'U') IS NULL
-            CREATE TABLE responses (
-                response_id INT IDENTITY(1,1) PRIMARY KEY,
-                survey_id INT NOT NULL,
-                submitted_at DATETIME DEFAULT GETDATE(),
-                FOREIGN KEY (survey_id) REFERENCES surveys(survey_id) ON DELETE CASCADE
-            )
-        """)
-
-        # Create answers table
-        cursor.execute("""
-            IF OBJECT_ID('answers', 'U') IS NULL
-                CREATE TABLE answers (
-                answer_id INT IDENTITY(1,1) PRIMARY KEY,
-                response_id INT NOT NULL,
-                question_id INT NOT NULL,
-                answer_value NVARCHAR(MAX),
-                FOREIGN KEY (response_id) REFERENCES responses(response_id) ON DELETE CASCADE,
-                FOREIGN KEY (question_id) REFERENCES questions(question_id) ON DELETE NO ACTION
-            )
-        """)
-
-        # Insert default survey if it doesn't exist
-        cursor.execute("SELECT survey_id FROM surveys WHERE title = 'Patient Experience Survey'")
-        survey = cursor.fetchone()
-
-        if not survey:
-            cursor.execute("""
-                INSERT INTO surveys (title, description, is_active)
-                VALUES (?, ?, ?)
-            """, ('Patient Experience Survey', 'Survey to collect feedback', True))
-            conn.commit()
-
-            # Get survey ID
-            cursor.execute("SELECT survey_id FROM surveys WHERE title = ?", ('Patient Experience Survey',))
-            survey_id_row = cursor.fetchone()
-            if survey_id_row is None:
-                raise Exception("Failed to create or retrieve default survey")
-
-            survey_id = int(survey_id_row[0])
-            active_surveys.inc()  # Increment active surveys metric
-        else:
-            survey_id = survey[0]
-            # Set the gauge to 1 since a survey exists
-            active_surveys.set(1)
-
-        # Insert default questions only if they do not exist
-        cursor.execute("SELECT COUNT(*) FROM questions WHERE survey_id = ?", (survey_id,))
-        existing_questions = cursor.fetchone()[0]
-        
-        if existing_questions == 0:
-            questions = [
-                {'text': 'Date of visit?', 'type': 'text', 'required': True},
-                {'text': 'Which site did you visit?', 'type': 'multiple_choice', 'required': True,
-                 'options': ['Princess Alexandra Hospital', 'St Margaret\'s Hospital', 'Herts & Essex Hospital']},
-                {'text': 'Patient name?', 'type': 'text', 'required': True},
-                {'text': 'How easy was it to get an appointment?', 'type': 'multiple_choice', 'required': True,
-                 'options': ['Very difficult', 'Somewhat difficult', 'Neutral', 'Easy', 'Very easy']},
-                {'text': 'Were you properly informed about your procedure?', 'type': 'multiple_choice', 'required': True,
-                 'options': ['Yes', 'No', 'Partially']},
-                {'text': 'What went well during your visit?', 'type': 'text', 'required': False},
-                {'text': 'Overall satisfaction (1-5)', 'type': 'multiple_choice', 'required': True,
-                 'options': ['1', '2', '3', '4', '5']}
-            ]
-            
-            for q in questions:
-                cursor.execute("""
-                    INSERT INTO questions (survey_id, question_text, question_type, is_required, options)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    survey_id,
-                    q['text'],
-                    q['type'],
-                    q.get('required', False),
-                    json.dumps(q['options']) if 'options' in q else None
-                ))
-            
-            # Set the question count after inserting all questions
-            question_count.set(len(questions))
-
-        conn.commit()
-        logger.info("Database tables initialized safely.")
+def readiness():
+    """(body, status code) for /readyz: ready once startup has finished and the cached database check passes"""
+    if startup is None:
+        return {'status': 'starting', 'startup': None}, 503
+    status = startup.status()
+    if not status['ready']:
+        return {'status': 'starting', 'startup': status}, 503
+    ok, error = database_check.result()
+    if not ok:
+        return {'status': 'unavailable', 'database': 'disconnected', 'error': error, 'startup': status}, 503
+    return {'status': 'ready', 'database': 'connected', 'startup': status}, 200
+
+def health():
+    """(body, status code) for /health, from the cached database check"""
+    ok, error = database_check.result()
+    if not ok:
+        return {'status': 'unhealthy', 'database': 'disconnected', 'error': error}, 500
+    return {'status': 'healthy', 'database': 'connected'}, 200
+
+def admit(endpoint, priority=PRIORITY_READ, bypass=None):
+    """
+    Run a view under admission control, answering 503 with Retry-After when it is shed.
+    Streamed responses keep their slot until the stream is closed. bypass() returning
+    True skips admission (e.g. submissions that only go to the local spool).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if admission is None or (bypass is not None and bypass()):
+                return view(*args, **kwargs)
+            try:
+                admission.acquire(endpoint, priority)
+            except AdmissionRejected as e:
+                response = jsonify({'error': 'Server busy, please retry later'})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except BaseException:
+                admission.release(endpoint)
+                raise
+            if response.is_streamed:
+                response.call_on_close(lambda: admission.release(endpoint))
+            else:
+                admission.release(endpoint)
+            return response
+        return wrapper
+    return decorator
 
-    except Exception as e:
-        conn.rollback()
-        logger.error(f"Database initialization failed: {e}")
-        raise
-def initialize_database():
-    """Initialize the database tables"""
+# Flask Routes
+def render_index():
+    """
+    Return (question-set version, body, ETag) of the home page with the questions rendered in.
+    Rendered once per version; without metadata it falls back to the shell that fetches /api/questions.
+    """
+    global _index_page
     try:
-        # Get connection for DDL operations
-        conn = get_db_connection(database_name=None)
-        conn.autocommit = True
-        
-        cursor = conn.cursor()
-        
-        # Check if database exists
-        cursor.execute(
-            "SELECT name FROM sys.databases WHERE name = ?", 
-            (Config.DB_NAME,)
-        )
-        db_exists = cursor.fetchone()
-        
-        if not db_exists:
-            cursor.execute(f"CREATE DATABASE [{Config.DB_NAME}]")
-            logger.info(f"Created database: {Config.DB_NAME}")
-        
-        cursor.close()
-        conn.close()
-        
-        # Now create tables in the database
-        conn = get_db_connection(database_name=Config.DB_NAME)
-        conn.autocommit = True
-        
-        create_survey_tables(conn)
-        
-        conn.close()
-        logger.info("Database initialized successfully")
-        
+        survey = metadata_cache.get_survey()
     except Exception as e:
-        logger.error(f"Database initialization failed: {e}")
-        raise
+        logger.warning(f"Rendering the survey page without questions: {e}")
+        survey = None
+    version = survey.version if survey else None
+    page = _index_page
+    if page is None or page[0] != version:
+        body = render_template('index.html', survey=survey).encode('utf-8')
+        page = (version, body, hashlib.sha256(body).hexdigest()[:16])
+        if survey is not None:
+            _index_page = page
+    return page
 
-# Flask Routes
 @app.route('/')
 def index():
     """Home page"""
     with request_duration.labels(method='GET', endpoint='/').time():
-        return render_template('index.html')
+        _, body, etag = render_index()
+        response = Response(body, mimetype='text/html')
+        response.set_etag(etag)
+        # Revalidated on every visit; a 304 until the questions (or the deployed assets) change
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    """Fingerprinted static file, precompressed when the client accepts it and cacheable forever"""
+    located = assets.locate(filename, request.accept_encodings)
+    if located is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    path, encoding = located
+    # The type of the original file, not of its .br/.gz variant
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_file(path, mimetype=mimetype, download_name=os.path.basename(filename),
+                         max_age=ASSET_MAX_AGE, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/api/survey', methods=['POST'])
+@admit('survey', PRIORITY_SUBMISSION, bypass=lambda: Config.INGEST_MODE == 'spool')
 def conduct_survey_api():
     """API endpoint to submit a survey"""
     start_time = time.time()
-    conn = None
     try:
-        # Get JSON data from request
-        data = request.get_json()
-        if not data or 'answers' not in data:
+        # Get JSON data from request; malformed JSON is reported as a missing body
+        data = request.get_json(silent=True)
+        error = validate_submission(data)
+        if error:
             survey_failures.inc()
-            return jsonify({'error': 'No JSON data provided or missing answers field'}), 400
+            return jsonify({'error': error}), 400
         
-        # Validate each answer
-        if not isinstance(data.get('answers'), list):
-            survey_failures.inc()
-            return jsonify({'error': 'Answers must be a list'}), 400
-        for answer in data['answers']:
-            if not isinstance(answer, dict) or 'question_id' not in answer or 'answer_value' not in answer:
-                survey_failures.inc()
-                return jsonify({'error': 'Each answer must have question_id and answer_value'}), 400
-        
-        # Database operations
-        conn = get_db_connection(database_name=Config.DB_NAME)
-        active_connections.inc()
-        cursor = conn.cursor()
-        
-        # Get survey ID
-        cursor.execute("SELECT survey_id FROM surveys WHERE title = 'Patient Experience Survey'")
-        survey = cursor.fetchone()
-        if not survey:
+        survey = metadata_cache.get_survey()
+        if survey is None:
             survey_failures.inc()
             return jsonify({'error': 'Survey not found'}), 404
-        
-        survey_id = survey[0]
-        
-        # Insert response - FIXED: Use explicit parameter passing
-        cursor.execute("INSERT INTO responses (survey_id) OUTPUT INSERTED.response_id VALUES (?)", (survey_id,))
-        result = cursor.fetchone()
-        if not result:
+
+        # Rejected from the cached question definitions, before a connection is borrowed
+        errors = check_answers(survey, data['answers'])
+        if errors:
             survey_failures.inc()
-            return jsonify({'error': 'Failed to create response record'}), 500
-            
-        response_id = int(result[0])
-        conn.commit()
-        
-        # Insert answers
-        for answer in data.get('answers', []):
-            cursor.execute("""
-                INSERT INTO answers (response_id, question_id, answer_value)
-                VALUES (?, ?, ?)
-            """, (response_id, answer['question_id'], answer['answer_value']))
-        conn.commit()
-        
+            return jsonify({'error': 'Invalid answers', 'errors': errors}), 400
+
+        # Write-behind mode: durably spool the submission and acknowledge immediately
+        if Config.INGEST_MODE == 'spool':
+            receipt_id = spool_submission(data['answers'])
+            return jsonify({'message': 'Survey accepted', 'receipt_id': receipt_id}), 202
+
+        # Database operations - response and answers are written in one transaction
+        response_id = submit_answers(survey, data['answers'])
+
         # Increment submission counter
         survey_counter.inc()
-        
+
         return jsonify({'message': 'Survey submitted successfully', 'response_id': response_id}), 201
 
     except Exception as e:
-        if conn:
-            conn.rollback()
+        # The pool rolls back any uncommitted work when the connection is returned
         survey_failures.inc()
         logger.error(f"Survey submission failed: {e}")
         return jsonify({'error': str(e)}), 500
@@ -298,116 +537,315 @@ def conduct_survey_api():
     finally:
         # Always observe duration
         survey_duration.observe(time.time() - start_time)
-        if conn:
-            conn.close()
-            active_connections.dec()
 
 
+@app.route('/api/survey/batch', methods=['POST'])
+@admit('survey_batch', PRIORITY_SUBMISSION)
+def conduct_survey_batch_api():
+    """
+    API endpoint for kiosks to upload surveys collected offline, up to BATCH_MAX_RESPONSES at a time.
+    Body: {"responses": [{"answers": [...], "submitted_at": "<ISO-8601>", "receipt_id": "<32 hex>"}, ...]}
+    with submitted_at and receipt_id optional. Nothing is written unless every response is valid;
+    responses whose receipt_id was stored before are reported as duplicates rather than written again.
+    """
+    with request_duration.labels(method='POST', endpoint='/api/survey/batch').time():
+        data = request.get_json(silent=True)
+        responses = data.get('responses') if isinstance(data, dict) else None
+        if not isinstance(responses, list) or not responses:
+            survey_failures.inc()
+            return jsonify({'error': 'No JSON data provided or missing responses list'}), 400
+        if len(responses) > Config.BATCH_MAX_RESPONSES:
+            survey_failures.inc(len(responses))
+            return jsonify({'error': f"At most {Config.BATCH_MAX_RESPONSES} responses per batch"}), 413
+
+        try:
+            survey = metadata_cache.get_survey()
+            if survey is None:
+                survey_failures.inc(len(responses))
+                return jsonify({'error': 'Survey not found'}), 404
+
+            items, errors = validate_batch(responses, survey)
+            if errors:
+                survey_failures.inc(len(errors))
+                return jsonify({'error': 'Invalid responses; none were stored', 'errors': errors}), 400
+
+            results = store_batch(survey, items)
+        except Exception as e:
+            # The pool rolls back any uncommitted work when the connection is returned
+            survey_failures.inc(len(responses))
+            logger.error(f"Batch submission of {len(responses)} surveys failed: {e}")
+            return jsonify({'error': str(e)}), 500
+
+        for item, (response_id, created) in zip(items, results):
+            if created:
+                index_submission(response_id, item.answers, item.submitted_at)
+        stored = sum(1 for _, created in results if created)
+        survey_batch_size.observe(len(items))
+        survey_counter.inc(stored)
+        return jsonify({
+            'message': 'Surveys submitted successfully',
+            'stored': stored,
+            'duplicates': len(results) - stored,
+            'results': [
+                {'index': index, 'status': 'stored' if created else 'duplicate', 'response_id': response_id}
+                for index, (response_id, created) in enumerate(results)
+            ],
+        }), 201
+
+@app.route('/api/survey/receipts/<receipt_id>', methods=['GET'])
+@admit('receipts', PRIORITY_SUBMISSION)
+def get_survey_receipt(receipt_id):
+    """API endpoint to check whether a spooled survey submission has been stored"""
+    try:
+        if Config.INGEST_MODE == 'spool':
+            spooled = get_ingest_spool().status(receipt_id)
+            if spooled:
+                status, error = spooled
+                body = {'receipt_id': receipt_id, 'status': status}
+                if status == 'failed':
+                    body['error'] = error
+                return jsonify(body), 200
+
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT response_id FROM ingest_receipts WHERE receipt_id = ?", (receipt_id,))
+            row = cursor.fetchone()
+        if not row:
+            return jsonify({'error': 'Receipt not found'}), 404
+        return jsonify({'receipt_id': receipt_id, 'status': 'stored', 'response_id': row[0]}), 200
+
+    except Exception as e:
+        logger.error(f"Failed to look up receipt {receipt_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def archived_responses_for(after_id, since):
+    """The archived responses a /api/responses request reaches back to, or None when it stays in the hot tables"""
+    if not archive.overlaps(after_id=after_id, date_from=since):
+        return None
+    return archived_responses(archive, after_id, since)
+
+def stream_responses(after_id, since):
+    """Generator that holds a pooled connection while the responses document is streamed"""
+    with storage.connection() as conn:
+        yield from stream_responses_json(conn.cursor(), after_id, since, dialect=storage.dialect,
+                                         archived=archived_responses_for(after_id, since))
+
 @app.route('/api/responses', methods=['GET'])
+@admit('responses')
 def get_responses():
-    """API endpoint to get all survey responses"""
+    """
+    API endpoint to get survey responses.
+
+    With ?limit=N returns one keyset page plus a next_cursor to pass back as ?after=.
+    Without limit, streams every response (after the optional cursor) as one JSON object.
+    ?since=<ISO date> restricts either mode to responses submitted at or after that time.
+    Archived responses are included when the requested range reaches back into the archive.
+    """
     with request_duration.labels(method='GET', endpoint='/api/responses').time():
         try:
-            conn = get_db_connection(database_name=Config.DB_NAME)
-            active_connections.inc()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT
-                    r.response_id,
-                    FORMAT(r.submitted_at, 'yyyy-MM-dd HH:mm') as date,
-                    q.question_text,
-                    a.answer_value
-                FROM responses r
-                JOIN answers a ON r.response_id = a.response_id
-                JOIN questions q ON a.question_id = q.question_id
-                ORDER BY r.response_id, q.question_id
-            """)
-            
-            responses = {}
-            current_id = None
-            
-            for row in cursor.fetchall():
-                if row[0] != current_id:
-                    current_id = row[0]
-                    responses[current_id] = {
-                        'date': row[1],
-                        'answers': []
-                    }
-                responses[current_id]['answers'].append({
-                    'question': row[2],
-                    'answer': row[3]
-                })
-            
-            conn.close()
-            active_connections.dec()
-            logger.info(f"Retrieved {len(responses)} survey responses")
-            return jsonify(responses)
-            
+            after_id = decode_cursor(request.args.get('after'))
+            since = parse_since(request.args.get('since'))
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            if limit is not None:
+                with storage.connection() as conn:
+                    page = fetch_responses_page(conn.cursor(), after_id, since, limit, storage.dialect,
+                                                archived_responses_for(after_id, since))
+                logger.info(f"Retrieved page of {len(page['responses'])} survey responses")
+                return jsonify(page)
+
+            stream = stream_responses(after_id, since)
+            first_chunk = next(stream)  # Runs the query so database errors still return a 500
+            return Response(chain([first_chunk], stream), mimetype='application/json')
+
         except Exception as e:
             logger.error(f"Failed to retrieve responses: {e}")
-            if 'conn' in locals():
-                conn.close()
-                active_connections.dec()
             return jsonify({'error': str(e)}), 500
 
 @app.route('/api/questions', methods=['GET'])
 def get_questions():
-    """API endpoint to get survey questions"""
+    """API endpoint to get survey questions (served from the metadata cache with an ETag)"""
     with request_duration.labels(method='GET', endpoint='/api/questions').time():
         try:
-            conn = get_db_connection(database_name=Config.DB_NAME)
-            active_connections.inc()
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT survey_id FROM surveys WHERE title = 'Patient Experience Survey'")
-            survey = cursor.fetchone()
-            if not survey:
-                conn.close()
-                active_connections.dec()
+            survey = metadata_cache.get_survey()
+            if survey is None:
                 return jsonify({'error': 'Survey not found'}), 404
-            
-            cursor.execute("""
-                SELECT question_id, question_text, question_type, is_required, options
-                FROM questions WHERE survey_id = ? ORDER BY question_id
-            """, (survey[0],))
-            
-            questions = []
-            for q in cursor.fetchall():
-                question = {
-                    'question_id': q[0],
-                    'question_text': q[1],
-                    'question_type': q[2],
-                    'is_required': bool(q[3]),
-                    'options': json.loads(q[4]) if q[4] else []
-                }
-                questions.append(question)
-            
-            conn.close()
-            active_connections.dec()
-            return jsonify(questions)
-            
+
+            response = Response(survey.questions_json, mimetype='application/json')
+            response.set_etag(survey.etag)
+            # Browsers may keep the body but must revalidate, which costs a 304 and no DB access
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+
         except Exception as e:
             logger.error(f"Failed to retrieve questions: {e}")
-            if 'conn' in locals():
-                conn.close()
-                active_connections.dec()
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/metadata/refresh', methods=['POST'])
+def refresh_metadata():
+    """Invalidate the survey/question cache after definitions were changed in the database"""
+    try:
+        metadata_cache.invalidate()
+        return jsonify({'message': 'Metadata reloaded', 'version': metadata_cache.version}), 200
+    except Exception as e:
+        logger.error(f"Failed to reload metadata: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stats', methods=['GET'])
+@admit('stats')
+def get_stats():
+    """
+    API endpoint for per-question answer distributions.
+    Reads only the answer_rollups table; ?from= and ?to= take ISO dates, ?by=day adds a daily breakdown.
+    """
+    with request_duration.labels(method='GET', endpoint='/api/stats').time():
+        try:
+            date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+            date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        except ValueError as e:
+            return jsonify({'error': f"Invalid date: {e}"}), 400
+        by_day = request.args.get('by') == 'day'
+
+        try:
+            survey = metadata_cache.get_survey()
+            if survey is None:
+                return jsonify({'error': 'Survey not found'}), 404
+
+            with storage.connection() as conn:
+                rows = fetch_distribution(conn.cursor(), survey.survey_id, date_from, date_to, by_day)
+
+            stats = build_stats(survey, rows, by_day)
+            stats['from'] = date_from.isoformat() if date_from else None
+            stats['to'] = date_to.isoformat() if date_to else None
+            return jsonify(stats)
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve stats: {e}")
+            return jsonify({'error': str(e)}), 500
+
+@app.route('/api/trends', methods=['GET'])
+@admit('trends')
+def get_trends():
+    """
+    API endpoint for response volume and average satisfaction per site over time.
+    ?by=day|week|month (default day); ?from= and ?to= are inclusive ISO dates, widened to whole
+    buckets (default: the last 30 days, 12 weeks or 12 months); ?site= keeps one site.
+    """
+    with request_duration.labels(method='GET', endpoint='/api/trends').time():
+        granularity = request.args.get('by', 'day')
+        if granularity not in TREND_GRANULARITIES:
+            return jsonify({'error': f"by must be one of {', '.join(TREND_GRANULARITIES)}"}), 400
+        try:
+            date_to = (date.fromisoformat(request.args['to']) if request.args.get('to')
+                       else datetime.now(timezone.utc).date())
+            date_from = (date.fromisoformat(request.args['from']) if request.args.get('from')
+                         else default_first_day(date_to, granularity))
+        except ValueError as e:
+            return jsonify({'error': f"Invalid date: {e}"}), 400
+        if date_from > date_to:
+            return jsonify({'error': 'from must not be after to'}), 400
+        try:
+            bucket_range(date_from, date_to, granularity)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        site = request.args.get('site') or None
+
+        try:
+            survey = metadata_cache.get_survey()
+            if survey is None:
+                return jsonify({'error': 'Survey not found'}), 404
+            site_question = find_question(survey, Config.TREND_SITE_QUESTION)
+            rating_question = find_question(survey, Config.TREND_RATING_QUESTION)
+            if site is not None and (site_question is None or site not in site_question.options):
+                return jsonify({'error': f"Unknown site {site!r}"}), 400
+
+            buckets = load_trend(
+                storage.connection, survey,
+                site_question.question_id if site_question else None,
+                rating_question.question_id if rating_question else None,
+                granularity, date_from, date_to, site,
+                cache=trend_cache, settle=TREND_SETTLE, dialect=storage.dialect, archive=archive
+            )
+            return jsonify({'survey_id': survey.survey_id, 'by': granularity, 'from': date_from.isoformat(),
+                            'to': date_to.isoformat(), 'site': site, 'buckets': buckets})
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve trends: {e}")
+            return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search', methods=['GET'])
+def search_answers():
+    """
+    API endpoint for full-text search over free-text answers, served from the in-memory index.
+    ?q= (every word must match), ?question_id=, ?site=, ?from= and ?to= (inclusive ISO dates), ?limit= (max 100).
+    Returns ranked answers plus facets: the most common other words and the sites among all matches.
+    """
+    with request_duration.labels(method='GET', endpoint='/api/search').time():
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        try:
+            question_id = int(request.args['question_id']) if request.args.get('question_id') else None
+            limit = min(int(request.args.get('limit', 20)), 100)
+            date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+            date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        except ValueError as e:
+            return jsonify({'error': f"Invalid parameter: {e}"}), 400
+        if limit < 1:
+            return jsonify({'error': 'limit must be positive'}), 400
+
+        if not Config.SEARCH_INDEX_ENABLED:
+            return jsonify({'error': 'Search is disabled (SEARCH_INDEX_ENABLED=false)'}), 404
+        if not search_index.ready.is_set():
+            response = jsonify({'error': 'Search index is still loading'})
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+        return jsonify(search_index.search(query, limit, question_id, request.args.get('site') or None,
+                                           date_from, date_to))
+
+@app.route('/api/export', methods=['GET'])
+@admit('export', PRIORITY_BULK_READ)
+def export_survey_responses():
+    """
+    API endpoint to download responses as CSV, NDJSON or Parquet (?format=), one column per question.
+    ?from= and ?to= bound submitted_at; the file is streamed in fixed-size chunks.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format {fmt!r}; choose one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        date_from = parse_export_date(request.args.get('from'))
+        date_to = parse_export_date(request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        survey = metadata_cache.get_survey()
+        if survey is None:
+            return jsonify({'error': 'Survey not found'}), 404
+
+        stream = export_responses(storage.connection, survey, fmt, date_from, date_to, dialect=storage.dialect,
+                                  archive=archive)
+        first_chunk = next(stream, b'')  # Surfaces setup errors before the download starts
+        mimetype, extension = EXPORT_FORMATS[fmt]
+        return Response(chain([first_chunk], stream), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename=survey-responses.{extension}'
+        })
+
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/system-metrics')
 def system_metrics():
-    """Endpoint to update system metrics"""
-    # CPU usage
-    system_cpu_usage.set(psutil.cpu_percent())
-    
-    # Memory usage
-    process = psutil.Process()
-    system_memory_usage.set(process.memory_info().rss)
-    
-    # Uptime
-    system_uptime.set(time.time() - start_time)
-    
-    return jsonify({'status': 'system metrics updated'})
+    """Latest system metrics sample (kept fresh by the background sampler, so this does no work)"""
+    sample = system_sampler.last_sample if system_sampler else {}
+    return jsonify({'status': 'sampled in background', 'interval_seconds': Config.SYSTEM_METRICS_INTERVAL,
+                    'sample': sample})
 
 @app.route('/api/test-metrics', methods=['POST'])
 def test_metrics():
@@ -416,8 +854,6 @@ def test_metrics():
         # Increment all metrics for testing
         survey_counter.inc()
         survey_failures.inc()
-        active_surveys.inc()
-        question_count.inc(7)
         survey_duration.observe(2.5)  # Example duration
         
         return jsonify({'message': 'Metrics incremented for testing'}), 200
@@ -426,37 +862,35 @@ def test_metrics():
 
 @app.route('/health')
 def health_check():
-    """Health check endpoint"""
-    try:
-        conn = get_db_connection(database_name=Config.DB_NAME)
-        active_connections.inc()
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1")
-        conn.close()
-        active_connections.dec()
-        return jsonify({'status': 'healthy', 'database': 'connected'}), 200
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return jsonify({'status': 'unhealthy', 'database': 'disconnected', 'error': str(e)}), 500
+    """Health check endpoint (database connectivity, checked at most once per HEALTH_CHECK_TTL seconds)"""
+    body, status = health()
+    return jsonify(body), status
+
+@app.route('/livez')
+def liveness_check():
+    """Liveness probe: answers as soon as the process serves requests and never touches the database"""
+    return jsonify({'status': 'alive'}), 200
+
+@app.route('/readyz')
+def readiness_check():
+    """Readiness probe: 503 until background initialization has finished or while the database is unreachable"""
+    body, status = readiness()
+    return jsonify(body), status
 
 @app.route('/api/debug-metrics')
 def debug_metrics():
     """Debug endpoint to check current metric values"""
     try:
+        registry = metrics_registry()
+        totals = db_metrics.totals()
         metrics_data = {
-            'survey_counter': survey_counter._value.get(),
-            'survey_failures': survey_failures._value.get(),
-            'active_surveys': active_surveys._value.get(),
-            'question_count': question_count._value.get(),
+            'survey_counter': registry.get_sample_value('patient_survey_submissions_accepted_total'),
+            'survey_failures': registry.get_sample_value('patient_survey_submission_errors_total'),
+            'database_totals': totals.to_dict() if totals else None,
         }
         
         # Get raw metrics for verification
-        import io
-        from prometheus_client import exposition
-        
-        output = io.StringIO()
-        exposition.generate_latest(exposition.REGISTRY, output)
-        raw_metrics = output.getvalue()
+        raw_metrics = generate_latest(registry).decode('utf-8')
         
         return jsonify({
             'current_values': metrics_data,
@@ -468,7 +902,7 @@ def debug_metrics():
 @app.route('/metrics')
 def metrics():
     """Prometheus metrics endpoint"""
-    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    return generate_latest(metrics_registry()), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
 @app.route('/debug-static')
 def debug_static():
@@ -484,12 +918,14 @@ def debug_static():
     
     return files
 
+record_phase('import', time.perf_counter() - _import_started)
+
 if __name__ == "__main__":
-    # Initialize database
     logger.info("Starting Patient Survey Application")
-    initialize_database()
-    initialize_metrics_from_db()  
+    # The database is set up in the background; /readyz turns 200 when it is done
+    start_background_services()
     
+    # Development server; production runs gunicorn with gunicorn.conf.py
     # Run Flask app
     host = os.environ.get('FLASK_HOST', '127.0.0.1')
     port = int(os.environ.get('FLASK_PORT', 8001))
@@ -0,0 +1,59 @@
+-- Tables that create_survey_tables used to create on every start.
+-- Guarded so databases created before migrations existed adopt this version as-is.
+
+IF OBJECT_ID('surveys', 'U') IS NULL
+CREATE TABLE surveys (
+    survey_id INT IDENTITY(1,1) PRIMARY KEY,
+    title NVARCHAR(255) NOT NULL,
+    description NVARCHAR(MAX),
+    created_at DATETIME DEFAULT GETDATE(),
+    is_active BIT DEFAULT 1
+);
+
+IF OBJECT_ID('questions', 'U') IS NULL
+CREATE TABLE questions (
+    question_id INT IDENTITY(1,1) PRIMARY KEY,
+    survey_id INT NOT NULL,
+    question_text NVARCHAR(MAX) NOT NULL,
+    question_type NVARCHAR(50) NOT NULL,
+    is_required BIT DEFAULT 0,
+    options NVARCHAR(MAX),
+    FOREIGN KEY (survey_id) REFERENCES surveys(survey_id) ON DELETE CASCADE
+);
+
+IF OBJECT_ID('responses', 'U') IS NULL
+CREATE TABLE responses (
+    response_id INT IDENTITY(1,1) PRIMARY KEY,
+    survey_id INT NOT NULL,
+    submitted_at DATETIME DEFAULT GETDATE(),
+    FOREIGN KEY (survey_id) REFERENCES surveys(survey_id) ON DELETE CASCADE
+);
+
+IF OBJECT_ID('answers', 'U') IS NULL
+CREATE TABLE answers (
+    answer_id INT IDENTITY(1,1) PRIMARY KEY,
+    response_id INT NOT NULL,
+    question_id INT NOT NULL,
+    answer_value NVARCHAR(MAX),
+    FOREIGN KEY (response_id) REFERENCES responses(response_id) ON DELETE CASCADE,
+    FOREIGN KEY (question_id) REFERENCES questions(question_id) ON DELETE NO ACTION
+);
+
+-- Makes spool replays idempotent
+IF OBJECT_ID('ingest_receipts', 'U') IS NULL
+CREATE TABLE ingest_receipts (
+    receipt_id CHAR(32) PRIMARY KEY,
+    response_id INT NOT NULL,
+    FOREIGN KEY (response_id) REFERENCES responses(response_id) ON DELETE CASCADE
+);
+
+-- Per-day option counts read by /api/stats
+IF OBJECT_ID('answer_rollups', 'U') IS NULL
+CREATE TABLE answer_rollups (
+    survey_id INT NOT NULL,
+    bucket_date DATE NOT NULL,
+    question_id INT NOT NULL,
+    option_value NVARCHAR(255) NOT NULL,
+    answer_count INT NOT NULL,
+    PRIMARY KEY (survey_id, bucket_date, question_id, option_value)
+);
@@ -0,0 +1,24 @@
+-- Default Patient Experience Survey and its questions
+
+IF NOT EXISTS (SELECT 1 FROM surveys WHERE title = N'Patient Experience Survey')
+    INSERT INTO surveys (title, description, is_active)
+    VALUES (N'Patient Experience Survey', N'Survey to collect feedback', 1);
+
+DECLARE @survey_id INT = (
+    SELECT TOP 1 survey_id FROM surveys WHERE title = N'Patient Experience Survey' ORDER BY survey_id
+);
+
+IF NOT EXISTS (SELECT 1 FROM questions WHERE survey_id = @survey_id)
+    INSERT INTO questions (survey_id, question_text, question_type, is_required, options)
+    VALUES
+        (@survey_id, N'Date of visit?', N'text', 1, NULL),
+        (@survey_id, N'Which site did you visit?', N'multiple_choice', 1,
+            N'["Princess Alexandra Hospital", "St Margaret''s Hospital", "Herts & Essex Hospital"]'),
+        (@survey_id, N'Patient name?', N'text', 1, NULL),
+        (@survey_id, N'How easy was it to get an appointment?', N'multiple_choice', 1,
+            N'["Very difficult", "Somewhat difficult", "Neutral", "Easy", "Very easy"]'),
+        (@survey_id, N'Were you properly informed about your procedure?', N'multiple_choice', 1,
+            N'["Yes", "No", "Partially"]'),
+        (@survey_id, N'What went well during your visit?', N'text', 0, NULL),
+        (@survey_id, N'Overall satisfaction (1-5)', N'multiple_choice', 1,
+            N'["1", "2", "3", "4", "5"]');
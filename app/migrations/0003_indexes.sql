@@ -0,0 +1,21 @@
+-- Secondary indexes for the hot queries:
+--   answers(response_id)   /api/responses and export joins
+--   answers(question_id)   joins to questions, FK checks on question deletes
+--   responses(submitted_at) date-range filters (since/from/to)
+--   questions(survey_id)   metadata loads
+--   surveys(title)         survey lookups, now unique
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_answers_response_id' AND object_id = OBJECT_ID('answers'))
+    CREATE INDEX ix_answers_response_id ON answers (response_id, question_id);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_answers_question_id' AND object_id = OBJECT_ID('answers'))
+    CREATE INDEX ix_answers_question_id ON answers (question_id);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_responses_submitted_at' AND object_id = OBJECT_ID('responses'))
+    CREATE INDEX ix_responses_submitted_at ON responses (submitted_at) INCLUDE (survey_id);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_questions_survey_id' AND object_id = OBJECT_ID('questions'))
+    CREATE INDEX ix_questions_survey_id ON questions (survey_id);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'uq_surveys_title' AND object_id = OBJECT_ID('surveys'))
+    ALTER TABLE surveys ADD CONSTRAINT uq_surveys_title UNIQUE (title);
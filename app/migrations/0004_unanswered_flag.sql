@@ -0,0 +1,15 @@
+-- responses.has_unanswered: set when a response is written with a NULL answer, so the
+-- failures total in db_metrics counts a filtered index instead of scanning answers.
+-- The backfill below is the last full answers scan for it.
+
+IF COL_LENGTH('responses', 'has_unanswered') IS NULL
+    ALTER TABLE responses ADD has_unanswered BIT NOT NULL CONSTRAINT df_responses_has_unanswered DEFAULT 0;
+GO
+
+UPDATE responses SET has_unanswered = 1
+WHERE has_unanswered = 0
+  AND response_id IN (SELECT response_id FROM answers WHERE answer_value IS NULL);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_responses_unanswered' AND object_id = OBJECT_ID('responses'))
+    CREATE INDEX ix_responses_unanswered ON responses (response_id) WHERE has_unanswered = 1;
@@ -0,0 +1,48 @@
+-- SQLite equivalent of ../0001_initial_schema.sql (STORAGE_BACKEND=sqlite).
+-- Timestamps are stored as 'YYYY-MM-DD HH:MM:SS' UTC text, like GETDATE() on Azure SQL.
+
+CREATE TABLE surveys (
+    survey_id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    is_active INTEGER DEFAULT 1
+);
+
+CREATE TABLE questions (
+    question_id INTEGER PRIMARY KEY,
+    survey_id INTEGER NOT NULL REFERENCES surveys(survey_id) ON DELETE CASCADE,
+    question_text TEXT NOT NULL,
+    question_type TEXT NOT NULL,
+    is_required INTEGER DEFAULT 0,
+    options TEXT
+);
+
+CREATE TABLE responses (
+    response_id INTEGER PRIMARY KEY,
+    survey_id INTEGER NOT NULL REFERENCES surveys(survey_id) ON DELETE CASCADE,
+    submitted_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE answers (
+    answer_id INTEGER PRIMARY KEY,
+    response_id INTEGER NOT NULL REFERENCES responses(response_id) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES questions(question_id) ON DELETE NO ACTION,
+    answer_value TEXT
+);
+
+-- Makes spool replays idempotent
+CREATE TABLE ingest_receipts (
+    receipt_id TEXT PRIMARY KEY,
+    response_id INTEGER NOT NULL REFERENCES responses(response_id) ON DELETE CASCADE
+);
+
+-- Per-day option counts read by /api/stats
+CREATE TABLE answer_rollups (
+    survey_id INTEGER NOT NULL,
+    bucket_date DATE NOT NULL,
+    question_id INTEGER NOT NULL,
+    option_value TEXT NOT NULL,
+    answer_count INTEGER NOT NULL,
+    PRIMARY KEY (survey_id, bucket_date, question_id, option_value)
+) WITHOUT ROWID;
@@ -0,0 +1,22 @@
+-- Default Patient Experience Survey and its questions
+
+INSERT INTO surveys (title, description, is_active)
+VALUES ('Patient Experience Survey', 'Survey to collect feedback', 1);
+
+INSERT INTO questions (survey_id, question_text, question_type, is_required, options)
+SELECT s.survey_id, v.column1, v.column2, v.column3, v.column4
+FROM surveys s
+CROSS JOIN (VALUES
+    ('Date of visit?', 'text', 1, NULL),
+    ('Which site did you visit?', 'multiple_choice', 1,
+        '["Princess Alexandra Hospital", "St Margaret''s Hospital", "Herts & Essex Hospital"]'),
+    ('Patient name?', 'text', 1, NULL),
+    ('How easy was it to get an appointment?', 'multiple_choice', 1,
+        '["Very difficult", "Somewhat difficult", "Neutral", "Easy", "Very easy"]'),
+    ('Were you properly informed about your procedure?', 'multiple_choice', 1,
+        '["Yes", "No", "Partially"]'),
+    ('What went well during your visit?', 'text', 0, NULL),
+    ('Overall satisfaction (1-5)', 'multiple_choice', 1,
+        '["1", "2", "3", "4", "5"]')
+) v
+WHERE s.title = 'Patient Experience Survey';
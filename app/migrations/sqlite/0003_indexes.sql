@@ -0,0 +1,11 @@
+-- Secondary indexes matching ../0003_indexes.sql
+
+CREATE INDEX ix_answers_response_id ON answers (response_id, question_id);
+
+CREATE INDEX ix_answers_question_id ON answers (question_id);
+
+CREATE INDEX ix_responses_submitted_at ON responses (submitted_at, survey_id);
+
+CREATE INDEX ix_questions_survey_id ON questions (survey_id);
+
+CREATE UNIQUE INDEX uq_surveys_title ON surveys (title);
@@ -0,0 +1,8 @@
+-- responses.has_unanswered, matching ../0004_unanswered_flag.sql
+
+ALTER TABLE responses ADD COLUMN has_unanswered INTEGER NOT NULL DEFAULT 0;
+
+UPDATE responses SET has_unanswered = 1
+WHERE response_id IN (SELECT response_id FROM answers WHERE answer_value IS NULL);
+
+CREATE INDEX ix_responses_unanswered ON responses (response_id) WHERE has_unanswered = 1;
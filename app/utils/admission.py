@@ -0,0 +1,141 @@
+"""
+Admission control for database-bound endpoints.
+
+A worker admits at most `capacity` requests to database work at a time, and
+each endpoint at most its own limit. Requests over that wait in a bounded
+queue, served in priority order (survey submissions before analyst reads),
+for at most max_wait seconds. A request that finds the queue full, or waits
+too long, is shed at once with 503 and Retry-After instead of tying up a
+server thread in the connection pool. Endpoints that need no database
+(/metrics, static files) never queue here, so they keep answering while the
+database is slow.
+"""
+import bisect
+import itertools
+import logging
+import threading
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITY_SUBMISSION = 0
+PRIORITY_READ = 1
+PRIORITY_BULK_READ = 2
+
+admission_in_flight = Gauge('admission_in_flight_requests', 'Requests admitted to database work',
+                            ['endpoint'], multiprocess_mode='livesum')
+admission_queue_depth = Gauge('admission_queue_depth', 'Requests waiting for admission to database work',
+                              multiprocess_mode='livesum')
+admission_shed = Counter('admission_shed_total', 'Requests rejected with 503 by admission control',
+                         ['endpoint', 'reason'])
+admission_wait = Histogram('admission_wait_seconds', 'Time requests waited for admission', ['endpoint'],
+                           buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+
+class AdmissionRejected(Exception):
+    """The request was shed; reason is 'queue_full' or 'timeout'."""
+
+    def __init__(self, endpoint, reason, retry_after):
+        super().__init__(f"{endpoint} shed ({reason})")
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('endpoint', 'event', 'admitted')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.event = threading.Event()
+        self.admitted = False
+
+
+class AdmissionController:
+    """
+    capacity bounds admitted requests across endpoints; limits maps an endpoint
+    name to its own bound. max_queue requests may wait, each at most max_wait
+    seconds; retry_after is the Retry-After sent with a 503.
+    """
+
+    def __init__(self, capacity, max_queue, max_wait, limits=None, retry_after=1):
+        if capacity < 1:
+            raise ValueError("Admission capacity must be at least 1")
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.limits = dict(limits or {})
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._active = 0
+        self._active_by_endpoint = {}
+        # (priority, sequence, waiter), kept sorted; sequences are unique, so waiters are never compared
+        self._queue = []
+        self._sequence = itertools.count()
+
+    def _has_room(self, endpoint):
+        return (self._active < self.capacity
+                and self._active_by_endpoint.get(endpoint, 0) < self.limits.get(endpoint, self.capacity))
+
+    def _admit(self, endpoint):
+        self._active += 1
+        self._active_by_endpoint[endpoint] = self._active_by_endpoint.get(endpoint, 0) + 1
+        admission_in_flight.labels(endpoint=endpoint).inc()
+
+    def _shed(self, endpoint, reason):
+        admission_shed.labels(endpoint=endpoint, reason=reason).inc()
+        logger.warning(f"Shedding {endpoint} request: {reason}")
+        return AdmissionRejected(endpoint, reason, self.retry_after)
+
+    def acquire(self, endpoint, priority=PRIORITY_READ):
+        """Block until the request may run; raises AdmissionRejected when it is shed."""
+        start = time.monotonic()
+        with self._lock:
+            # Anything still queued is blocked by capacity or by its own endpoint limit,
+            # so a newcomer with room is not jumping ahead of a request that could run
+            if self._has_room(endpoint):
+                self._admit(endpoint)
+                admission_wait.labels(endpoint=endpoint).observe(0)
+                return
+            if len(self._queue) >= self.max_queue:
+                raise self._shed(endpoint, 'queue_full')
+            waiter = _Waiter(endpoint)
+            entry = (priority, next(self._sequence), waiter)
+            bisect.insort(self._queue, entry)
+            admission_queue_depth.inc()
+
+        waiter.event.wait(self.max_wait)
+        with self._lock:
+            if not waiter.admitted:
+                self._queue.remove(entry)
+                admission_queue_depth.dec()
+                raise self._shed(endpoint, 'timeout')
+        admission_wait.labels(endpoint=endpoint).observe(time.monotonic() - start)
+
+    def release(self, endpoint):
+        """Return an admitted request's slot and admit the most urgent waiters that now fit."""
+        with self._lock:
+            self._active -= 1
+            self._active_by_endpoint[endpoint] -= 1
+            admission_in_flight.labels(endpoint=endpoint).dec()
+            for entry in list(self._queue):
+                if self._active >= self.capacity:
+                    break
+                waiter = entry[2]
+                if self._has_room(waiter.endpoint):
+                    self._queue.remove(entry)
+                    admission_queue_depth.dec()
+                    self._admit(waiter.endpoint)
+                    waiter.admitted = True
+                    waiter.event.set()
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    @property
+    def in_flight(self):
+        return self._active
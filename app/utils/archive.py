@@ -0,0 +1,374 @@
+"""
+Hot/cold tiering: old responses archived to compressed, immutable files.
+
+`python -m app.utils.archive run` moves responses submitted before the
+horizon (Config.ARCHIVE_AFTER_DAYS ago, at midnight UTC) out of responses,
+answers and ingest_receipts into gzip NDJSON files under Config.ARCHIVE_DIR,
+one per survey and month per run. A file is written and fsynced, recorded in
+manifest.json as pending, then its responses are deleted from the hot tables
+a few hundred at a time and it is marked done. A run interrupted in between
+finishes those deletes first thing next time. Files are never rewritten.
+
+answer_rollups keep their rows, so /api/stats is unaffected. Everything else
+that reads responses (/api/responses, exports, trends, the search index and
+the database totals) goes to the archive only when the range it was asked
+for reaches back into it, which the manifest's per-file submitted_at and
+response_id ranges tell without opening a file.
+
+    python -m app.utils.archive run [--before YYYY-MM-DD]
+    python -m app.utils.archive status
+"""
+import argparse
+import gzip
+import heapq
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+# Responses deleted from the hot tables per transaction, well under SQL Server's 2100 parameters
+DELETE_BATCH = 500
+
+PENDING = 'pending'
+DONE = 'done'
+
+# Filesystems that do not outlive the container or host they are mounted in
+EPHEMERAL_FILESYSTEMS = {'tmpfs', 'ramfs', 'overlay', 'aufs'}
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time())
+    return datetime.fromisoformat(value)
+
+
+class ArchiveStorageError(RuntimeError):
+    """ARCHIVE_DIR would not survive a redeploy."""
+
+
+def _mount_types(mounts_file='/proc/self/mounts'):
+    """Mount point -> filesystem type; empty where /proc is not available."""
+    try:
+        with open(mounts_file, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    types = {}
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 3:
+            types[fields[1].replace('\\040', ' ')] = fields[2]
+    return types
+
+
+def persistent_mount(directory, mounts_file='/proc/self/mounts'):
+    """
+    The mount point holding directory, or raise ArchiveStorageError when that is
+    the container's own root filesystem or a memory filesystem: archived files
+    there are lost with the container, after their rows left the database.
+    """
+    path = os.path.realpath(directory)
+    while not os.path.ismount(path):
+        path = os.path.dirname(path)
+    fstype = _mount_types(mounts_file).get(path)
+    if path == os.path.sep or fstype in EPHEMERAL_FILESYSTEMS:
+        raise ArchiveStorageError(
+            f"ARCHIVE_DIR {directory!r} is on {'the root filesystem' if path == os.path.sep else fstype}, "
+            "not a persistent volume; mount one there (see README) or set ARCHIVE_REQUIRE_PERSISTENT=false"
+        )
+    return path
+
+
+def merge_responses(*streams):
+    """
+    Merge streams of tuples ordered by response_id (their first item) into one,
+    keeping the first of any duplicates: a response whose file is still pending
+    can be in both the archive and the hot tables.
+    """
+    last = None
+    for item in heapq.merge(*streams, key=lambda item: item[0]):
+        if item[0] != last:
+            last = item[0]
+            yield item
+
+
+class _PartWriter:
+    """Writes one archive file: a gzip line of JSON per response, in response_id order."""
+
+    def __init__(self, directory, name, survey_id):
+        self.path = os.path.join(directory, name)
+        self._tmp_path = f"{self.path}.tmp"
+        self._file = gzip.open(self._tmp_path, 'wt', encoding='utf-8')
+        self.entry = {'file': name, 'survey_id': survey_id, 'state': PENDING, 'responses': 0, 'failures': 0}
+
+    def write(self, response_id, submitted_at, answers):
+        """answers is a list of (question_id, answer_value) pairs, kept as they are: legacy rows may repeat a question."""
+        self._file.write(json.dumps({
+            'response_id': response_id,
+            'submitted_at': submitted_at.isoformat(),
+            'answers': [[q, v] for q, v in answers],
+        }, separators=(',', ':')) + '\n')
+        entry, stamp = self.entry, submitted_at.isoformat()
+        if not entry['responses']:
+            entry.update(min_response_id=response_id, first_submitted_at=stamp, last_submitted_at=stamp)
+        entry['max_response_id'] = response_id
+        entry['first_submitted_at'] = min(entry['first_submitted_at'], stamp)
+        entry['last_submitted_at'] = max(entry['last_submitted_at'], stamp)
+        entry['responses'] += 1
+        # Same definition as the failures total: a response with any NULL answer
+        if any(v is None for _, v in answers):
+            entry['failures'] += 1
+
+    def close(self):
+        self._file.close()
+        with open(self._tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(self._tmp_path, self.path)
+        self.entry['bytes'] = os.path.getsize(self.path)
+        return self.entry
+
+
+class ResponseArchive:
+    """
+    The archive files in directory and their manifest, reloaded whenever
+    another process (the archive job) has replaced it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._manifest = self._empty()
+        # Bumped on every reload, so caches built from hot-table reads know when rows moved
+        self.generation = 0
+
+    @staticmethod
+    def _empty():
+        return {'version': MANIFEST_VERSION, 'horizon': None, 'questions': {}, 'parts': []}
+
+    def _current(self):
+        """The manifest, reloaded if the file changed; a stat() per call otherwise."""
+        try:
+            st = os.stat(self.manifest_path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        with self._lock:
+            if stamp != self._stamp:
+                manifest = self._empty()
+                if stamp is not None:
+                    with open(self.manifest_path, encoding='utf-8') as f:
+                        manifest = json.load(f)
+                    if manifest.get('version') != MANIFEST_VERSION:
+                        raise ValueError(f"Unsupported archive manifest version {manifest.get('version')!r}")
+                self._manifest, self._stamp = manifest, stamp
+                self.generation += 1
+            return self._manifest
+
+    def refresh(self):
+        """Reload the manifest if the archive job changed it; returns the generation."""
+        self._current()
+        return self.generation
+
+    def _save(self, manifest):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    @property
+    def horizon(self):
+        """Responses submitted before this date have been archived (late uploads aside); None if never run."""
+        horizon = self._current()['horizon']
+        return date.fromisoformat(horizon) if horizon else None
+
+    def parts(self, include_pending=True):
+        return [p for p in self._current()['parts'] if include_pending or p['state'] == DONE]
+
+    def question_texts(self):
+        """question_id -> question text, as it was when the question's answers were archived."""
+        return {int(q): text for q, text in self._current()['questions'].items()}
+
+    def _matching(self, survey_id=None, after_id=0, date_from=None, date_to=None, include_pending=True):
+        date_from, date_to = _as_datetime(date_from), _as_datetime(date_to)
+        return [
+            p for p in self.parts(include_pending)
+            if p['responses']
+            and (survey_id is None or p['survey_id'] == survey_id)
+            and p['max_response_id'] > after_id
+            and (date_from is None or datetime.fromisoformat(p['last_submitted_at']) >= date_from)
+            and (date_to is None or datetime.fromisoformat(p['first_submitted_at']) < date_to)
+        ]
+
+    def overlaps(self, survey_id=None, after_id=0, date_from=None, date_to=None, include_pending=True):
+        """Whether any archived response is after after_id and in [date_from, date_to); opens no file."""
+        return bool(self._matching(survey_id, after_id, date_from, date_to, include_pending))
+
+    def _read_part(self, part, after_id=0, date_from=None, date_to=None):
+        with gzip.open(os.path.join(self.directory, part['file']), 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record['response_id'] <= after_id:
+                    continue
+                submitted_at = datetime.fromisoformat(record['submitted_at'])
+                if date_from is not None and submitted_at < date_from:
+                    continue
+                if date_to is not None and submitted_at >= date_to:
+                    continue
+                answers = record['answers']
+                if isinstance(answers, dict):  # Files written before answers were kept as a list
+                    answers = answers.items()
+                yield record['response_id'], submitted_at, [(int(q), v) for q, v in answers]
+
+    def iter_responses(self, survey_id=None, after_id=0, date_from=None, date_to=None, include_pending=True):
+        """
+        Yield archived (response_id, submitted_at, [(question_id, answer_value), ...])
+        in response_id order, for responses after after_id submitted in [date_from, date_to).
+        """
+        date_from, date_to = _as_datetime(date_from), _as_datetime(date_to)
+        parts = self._matching(survey_id, after_id, date_from, date_to, include_pending)
+        return merge_responses(*(self._read_part(p, after_id, date_from, date_to) for p in parts))
+
+    def add_totals(self, totals):
+        """Add archived responses and failures to a db_metrics.DatabaseTotals read from the hot tables."""
+        for part in self.parts(include_pending=False):
+            totals.submissions += part['responses']
+            totals.failures += part['failures']
+        return totals
+
+    def _delete_part(self, storage, part):
+        """Delete a written part's responses from the hot tables (idempotent), then mark it done."""
+        ids = [record[0] for record in self._read_part(part)]
+        if len(ids) != part['responses']:
+            raise ValueError(f"Archive file {part['file']} has {len(ids)} responses, expected {part['responses']}")
+        for i in range(0, len(ids), DELETE_BATCH):
+            batch = ids[i:i + DELETE_BATCH]
+            marks = ', '.join(['?'] * len(batch))
+            with storage.connection() as conn:
+                cursor = conn.cursor()
+                for table in ('ingest_receipts', 'answers', 'responses'):
+                    # Constant table names and a ? placeholder list
+                    cursor.execute(f"DELETE FROM {table} WHERE response_id IN ({marks})", batch)  # nosec B608
+                conn.commit()
+        manifest = self._current()
+        next(p for p in manifest['parts'] if p['file'] == part['file'])['state'] = DONE
+        self._save(manifest)
+
+    def archive(self, storage, before, chunk_size=None):
+        """
+        Move every response submitted before `before` (a date) out of the hot
+        tables; returns the number of responses archived by this run.
+        """
+        from app.export import DEFAULT_CHUNK_SIZE, iter_response_chunks
+
+        for part in self.parts():
+            if part['state'] == PENDING:
+                logger.info(f"Finishing interrupted archive of {part['file']}")
+                self._delete_part(storage, part)
+
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT survey_id FROM surveys ORDER BY survey_id")
+            survey_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT question_id, question_text FROM questions")
+            questions = {str(question_id): text for question_id, text in cursor.fetchall()}
+
+        os.makedirs(self.directory, exist_ok=True)
+        run = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        cutoff = datetime.combine(before, time())
+        archived = 0
+        for survey_id in survey_ids:
+            writers = {}
+            try:
+                chunks = iter_response_chunks(storage.connection, survey_id, date_to=cutoff,
+                                              chunk_size=chunk_size or DEFAULT_CHUNK_SIZE, dialect=storage.dialect,
+                                              answer_pairs=True)
+                for chunk in chunks:
+                    for response_id, submitted_at, answers in chunk:
+                        submitted_at = _as_datetime(submitted_at)
+                        month = submitted_at.strftime('%Y-%m')
+                        if month not in writers:
+                            name = f"responses-{survey_id}-{month}-{run}.ndjson.gz"
+                            writers[month] = _PartWriter(self.directory, name, survey_id)
+                        writers[month].write(response_id, submitted_at, answers)
+            finally:
+                entries = [writer.close() for _, writer in sorted(writers.items())]
+            if not entries:
+                continue
+
+            # Recorded before any delete, so a crash leaves the rows in both tiers, never in neither
+            manifest = self._current()
+            manifest['questions'].update(questions)
+            manifest['parts'].extend(entries)
+            self._save(manifest)
+            for entry in entries:
+                self._delete_part(storage, entry)
+                archived += entry['responses']
+                logger.info(f"Archived {entry['responses']} responses to {entry['file']} ({entry['bytes']} bytes)")
+
+        manifest = self._current()
+        if manifest['horizon'] is None or manifest['horizon'] < before.isoformat():
+            manifest['horizon'] = before.isoformat()
+            self._save(manifest)
+        return archived
+
+
+def default_horizon(days, today=None):
+    """The first day that stays hot when responses older than days are archived."""
+    return (today or datetime.now(timezone.utc).date()) - timedelta(days=days)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old survey responses to compressed files")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run = subparsers.add_parser('run', help='move responses older than the horizon into the archive')
+    run.add_argument('--before', type=date.fromisoformat,
+                     help='archive responses submitted before YYYY-MM-DD (default: ARCHIVE_AFTER_DAYS ago)')
+    subparsers.add_parser('status', help='show the archive horizon and files')
+    args = parser.parse_args(argv)
+
+    from app.config import Config
+
+    archive = ResponseArchive(Config.ARCHIVE_DIR)
+    if args.command == 'status':
+        parts = archive.parts()
+        print(f"horizon: {archive.horizon or 'never archived'}")
+        print(f"files: {len(parts)}, responses: {sum(p['responses'] for p in parts)}, "
+              f"bytes: {sum(p.get('bytes', 0) for p in parts)}")
+        for part in parts:
+            print(f"  {part['file']} {part['state']} {part['responses']} responses")
+        return
+
+    from app.utils.storage import get_storage
+
+    # Rows are deleted from the database once archived, so the files must outlive the container
+    if Config.ARCHIVE_REQUIRE_PERSISTENT:
+        try:
+            mount = persistent_mount(Config.ARCHIVE_DIR)
+        except ArchiveStorageError as e:
+            logger.error(f"Refusing to archive: {e}")
+            raise SystemExit(1)
+        logger.info(f"Archiving to {Config.ARCHIVE_DIR} on the volume mounted at {mount}")
+    before = args.before or default_horizon(Config.ARCHIVE_AFTER_DAYS)
+    storage = get_storage()
+    try:
+        archived = archive.archive(storage, before)
+    finally:
+        storage.close()
+    logger.info(f"Archived {archived} responses submitted before {before}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
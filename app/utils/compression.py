@@ -0,0 +1,144 @@
+"""
+Negotiated compression of API responses (zstd, brotli or gzip).
+
+ResponseCompressor is applied to every Flask response after the view ran.
+Responses of a compressible type are encoded with the best encoding the client
+accepts, in the server's preference order when qualities tie. Buffered bodies
+are compressed only from min_size bytes. Streamed bodies (/api/responses
+without a limit, /api/export) are compressed incrementally as they are sent.
+zstd and brotli are used when the zstandard and Brotli packages are installed.
+"""
+import logging
+import zlib
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+compression_input_bytes = Counter('http_compression_input_bytes_total',
+                                  'Response body bytes before compression', ['encoding'])
+compression_output_bytes = Counter('http_compression_output_bytes_total',
+                                   'Response body bytes sent after compression', ['encoding'])
+compression_ratio = Histogram('http_compression_ratio', 'Compressed size as a fraction of the original size',
+                              ['encoding'], buckets=(0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0))
+
+
+def _gzip(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return compressor.compress, compressor.flush
+
+
+def _brotli(quality):
+    compressor = brotli.Compressor(quality=quality)
+    return compressor.process, compressor.finish
+
+
+def _zstd(level):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return compressor.compress, compressor.flush
+
+
+CODECS = {
+    'zstd': (_zstd, lambda: zstandard is not None),
+    'br': (_brotli, lambda: brotli is not None),
+    'gzip': (_gzip, lambda: True),
+}
+
+
+class ResponseCompressor:
+    """
+    encodings is the preference order (a subset of CODECS); levels maps an
+    encoding to its level (zstd 1-22, br 0-11, gzip 1-9).
+    """
+
+    def __init__(self, encodings=('zstd', 'br', 'gzip'), levels=None, min_size=1024,
+                 mimetypes=('application/json', 'application/x-ndjson')):
+        unknown = [e for e in encodings if e not in CODECS]
+        if unknown:
+            raise ValueError(f"Unsupported compression encodings: {unknown}")
+        missing = [e for e in encodings if not CODECS[e][1]()]
+        if missing:
+            logger.info(f"Response compression without {', '.join(missing)} (package not installed)")
+        self.encodings = [e for e in encodings if CODECS[e][1]()]
+        self.levels = {'zstd': 3, 'br': 4, 'gzip': 6, **(levels or {})}
+        self.min_size = min_size
+        self.mimetypes = set(mimetypes)
+
+    def negotiate(self, accept_encodings):
+        """Return the encoding to use for a request's Accept-Encoding, or None."""
+        best, best_quality = None, 0
+        for encoding in self.encodings:
+            quality = accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def _compressor(self, encoding):
+        return CODECS[encoding][0](self.levels[encoding])
+
+    @staticmethod
+    def _observe(encoding, size_in, size_out):
+        compression_input_bytes.labels(encoding=encoding).inc(size_in)
+        compression_output_bytes.labels(encoding=encoding).inc(size_out)
+        if size_in:
+            compression_ratio.labels(encoding=encoding).observe(size_out / size_in)
+
+    def _stream(self, chunks, encoding):
+        compress, finish = self._compressor(encoding)
+        size_in = size_out = 0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                size_in += len(chunk)
+                data = compress(chunk)
+                if data:
+                    size_out += len(data)
+                    yield data
+            data = finish()
+            size_out += len(data)
+            yield data
+        finally:
+            # Ends the wrapped generator (and returns its pooled connection) if the client went away
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            self._observe(encoding, size_in, size_out)
+
+    def compress(self, response, accept_encodings):
+        """Compress a Flask/Werkzeug response in place if it qualifies; returns the response."""
+        if (response.status_code != 200 or response.direct_passthrough or response.mimetype not in self.mimetypes
+                or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate(accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            compress, finish = self._compressor(encoding)
+            compressed = compress(body) + finish()
+            self._observe(encoding, len(body), len(compressed))
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        # The encoded bytes differ from the identity representation
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
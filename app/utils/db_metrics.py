@@ -0,0 +1,126 @@
+"""
+Prometheus collector for totals that live in the database.
+
+The values are read at scrape time with one consolidated query and cached for
+ttl seconds, so frequent scrapes (or several Prometheus servers) cost at most
+one query per ttl per process. Every replica reports the same database totals;
+aggregate them with max(), not sum().
+"""
+import logging
+import threading
+import time
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.utils.db_utils import db_statement
+
+logger = logging.getLogger(__name__)
+
+# Failures come from responses.has_unanswered, set on write, through its filtered index
+TOTALS_QUERY = """
+    SELECT
+        (SELECT COUNT_BIG(*) FROM responses),
+        (SELECT COUNT_BIG(*) FROM responses WHERE has_unanswered = 1),
+        (SELECT COUNT(*) FROM surveys WHERE is_active = 1),
+        (SELECT COUNT(*) FROM questions)
+"""
+
+
+class DatabaseTotals:
+    __slots__ = ('submissions', 'failures', 'active_surveys', 'questions', 'loaded_at')
+
+    def __init__(self, submissions, failures, active_surveys, questions):
+        self.submissions = submissions
+        self.failures = failures
+        self.active_surveys = active_surveys
+        self.questions = questions
+        self.loaded_at = time.monotonic()
+
+    def to_dict(self):
+        return {
+            'submissions': self.submissions,
+            'failures': self.failures,
+            'active_surveys': self.active_surveys,
+            'questions': self.questions,
+        }
+
+
+def load_totals(conn, query=TOTALS_QUERY):
+    cursor = conn.cursor()
+    with db_statement('metrics_totals'):
+        cursor.execute(query)
+    row = cursor.fetchone()
+    return DatabaseTotals(*(value or 0 for value in row))
+
+
+class DatabaseMetricsCollector:
+    """
+    Custom collector exposing submission, failure, active survey and question totals.
+
+    Only one thread refreshes at a time; concurrent scrapes are served the
+    previous values instead of queueing behind the query. If a refresh fails
+    the stale values keep being served and db_metrics_up drops to 0.
+    """
+
+    def __init__(self, connect, ttl=30, loader=load_totals):
+        self._connect = connect
+        self._loader = loader
+        self.ttl = ttl
+        self._totals = None
+        self._up = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fresh(self):
+        return self._totals is not None and time.monotonic() - self._checked_at < self.ttl
+
+    def totals(self):
+        """Return the cached DatabaseTotals, refreshing them if older than ttl (None if never loaded)."""
+        totals = self._totals
+        if self._fresh():
+            return totals
+        if not self._lock.acquire(blocking=totals is None):
+            return totals
+        try:
+            if self._fresh():
+                return self._totals
+            try:
+                with self._connect() as conn:
+                    self._totals = self._loader(conn)
+                self._up = True
+            except Exception as e:
+                self._up = False
+                logger.warning(f"Failed to refresh database metrics: {e}")
+            # A failed refresh also waits a full ttl rather than retrying on every scrape
+            self._checked_at = time.monotonic()
+            return self._totals
+        finally:
+            self._lock.release()
+
+    def collect(self):
+        totals = self.totals()
+        yield GaugeMetricFamily('db_metrics_up', 'Whether the last database metrics refresh succeeded',
+                                value=1 if self._up else 0)
+        if totals is None:
+            return
+        yield CounterMetricFamily('patient_survey_submissions', 'Total number of patient surveys stored',
+                                  value=totals.submissions)
+        yield CounterMetricFamily('patient_survey_failures', 'Total stored surveys with an unanswered question',
+                                  value=totals.failures)
+        yield GaugeMetricFamily('active_surveys_total', 'Number of active surveys',
+                                value=totals.active_surveys)
+        yield GaugeMetricFamily('survey_questions_total', 'Total number of survey questions',
+                                value=totals.questions)
+        yield GaugeMetricFamily('db_metrics_age_seconds', 'Age of the cached database metrics',
+                                value=time.monotonic() - totals.loaded_at)
+
+    def describe(self):
+        # Registering must not trigger a query; the names are fixed
+        return [
+            GaugeMetricFamily('db_metrics_up', ''),
+            CounterMetricFamily('patient_survey_submissions', ''),
+            CounterMetricFamily('patient_survey_failures', ''),
+            GaugeMetricFamily('active_surveys_total', ''),
+            GaugeMetricFamily('survey_questions_total', ''),
+            GaugeMetricFamily('db_metrics_age_seconds', ''),
+        ]
@@ -1,8 +1,181 @@
+import re
+import threading
+import time
+from collections import Counter as TypeCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
 import pyodbc
+from prometheus_client import Counter, Gauge, Histogram
 from app.config import Config
 import logging
 
 logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('app.db.slow')
+
+# Statement metrics - labelled by statement name (see statement_name / db_statement)
+connect_duration = Histogram('db_connect_duration_seconds', 'Time spent opening a database connection')
+connect_errors = Counter('db_connect_errors_total', 'Failed attempts to open a database connection')
+query_duration = Histogram('db_query_duration_seconds', 'Time spent executing a SQL statement', ['statement'],
+                           buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30))
+query_errors = Counter('db_query_errors_total', 'SQL statements that raised an error', ['statement', 'error'])
+rows_fetched = Counter('db_rows_fetched_total', 'Rows fetched from SQL statement results', ['statement'])
+
+# Pool metrics - shared by every pool, so they are adjusted with inc/dec rather than set
+active_connections = Gauge('db_active_connections', 'Number of database connections checked out of the pool',
+                           multiprocess_mode='livesum')
+idle_connections = Gauge('db_idle_connections', 'Number of idle database connections held by the pool',
+                         multiprocess_mode='livesum')
+pool_wait_time = Histogram('db_pool_wait_seconds', 'Time spent waiting to check out a pooled database connection')
+pool_exhausted = Counter('db_pool_exhausted_total', 'Connection checkouts that timed out because the pool was exhausted')
+
+
+_statement_override = ContextVar('db_statement', default=None)
+
+_VERB = re.compile(r'\b(SELECT|INSERT|UPDATE|DELETE|MERGE|EXEC|CREATE|ALTER|DROP)\b', re.IGNORECASE)
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|MERGE|EXEC)\s+\[?(\w+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def statement_name(sql):
+    """Low-cardinality name for a SQL statement: its first verb and table, e.g. insert_responses."""
+    verb = _VERB.search(sql)
+    if not verb:
+        return 'other'
+    table = _TABLE.search(sql, verb.start())
+    return f"{verb.group(1).lower()}_{table.group(1).lower()}" if table else verb.group(1).lower()
+
+
+@contextmanager
+def db_statement(name):
+    """Record statements executed inside the block under an explicit name."""
+    token = _statement_override.set(name)
+    try:
+        yield
+    finally:
+        _statement_override.reset(token)
+
+
+def parameter_shape(params):
+    """Describe bound parameters by type only, so slow-query logs never contain patient data."""
+    if len(params) == 1 and isinstance(params[0], (list, tuple)):
+        params = params[0]
+    types = [type(p).__name__ for p in params]
+    if len(types) <= 12:
+        return f"({', '.join(types)})"
+    counts = TypeCounter(types)
+    return f"({len(types)} params: {', '.join(f'{n} {t}' for t, n in counts.most_common())})"
+
+
+class InstrumentedCursor:
+    """pyodbc cursor proxy that times statements and counts fetched rows and errors."""
+
+    def __init__(self, cursor):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_statement', 'other')
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)  # e.g. fast_executemany
+
+    def _run(self, method, sql, args, describe):
+        name = _statement_override.get() or statement_name(sql)
+        object.__setattr__(self, '_statement', name)
+        start = time.perf_counter()
+        try:
+            method(sql, *args)
+        except Exception as e:
+            query_errors.labels(statement=name, error=type(e).__name__).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            query_duration.labels(statement=name).observe(elapsed)
+            if elapsed * 1000 >= Config.DB_SLOW_QUERY_MS:
+                slow_query_logger.warning(
+                    f"Slow query {name}: {elapsed * 1000:.0f}ms params={describe()} "
+                    f"sql={' '.join(sql.split())[:500]}"
+                )
+        return self
+
+    def execute(self, sql, *params):
+        return self._run(self._cursor.execute, sql, params, lambda: parameter_shape(params))
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        return self._run(self._cursor.executemany, sql, (seq_of_params,), lambda: (
+            f"{len(seq_of_params)} x {parameter_shape((seq_of_params[0],))}" if seq_of_params else "0 rows"
+        ))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            rows_fetched.labels(statement=self._statement).inc()
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        rows_fetched.labels(statement=self._statement).inc(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        rows_fetched.labels(statement=self._statement).inc(len(rows))
+        return rows
+
+    def __iter__(self):
+        count = 0
+        try:
+            for row in self._cursor:
+                count += 1
+                yield row
+        finally:
+            rows_fetched.labels(statement=self._statement).inc(count)
+
+
+class InstrumentedConnection:
+    """pyodbc connection proxy whose cursors are instrumented."""
+
+    def __init__(self, connection):
+        object.__setattr__(self, '_connection', connection)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)  # e.g. autocommit
+
+    def cursor(self):
+        return InstrumentedCursor(self._connection.cursor())
+
+    def __enter__(self):
+        self._connection.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._connection.__exit__(*exc_info)
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+def _resolve_database_name(database_name):
+    """Pick the test or main database when no explicit name is given."""
+    if database_name is not None:
+        return database_name
+    # Check if we're in testing mode and use test database if no specific database is provided
+    try:
+        from flask import current_app
+        if current_app and current_app.config.get('TESTING'):
+            return Config.DB_TEST_NAME
+        return Config.DB_NAME
+    except RuntimeError:
+        # No app context, use production database
+        return Config.DB_NAME
+
 
 def get_db_connection(database_name=None):
     """
@@ -12,60 +185,280 @@ def get_db_connection(database_name=None):
     which is useful for DDL operations like CREATE/DROP DATABASE.
     """
     try:
-        # Check if we're in testing mode and use test database if no specific database is provided
-        if database_name is None:
-            try:
-                from flask import current_app
-                if current_app and current_app.config.get('TESTING'):
-                    database_name = Config.DB_TEST_NAME
-                else:
-                    database_name = Config.DB_NAME
-            except RuntimeError:
-                # No app context, use production database
-                database_name = Config.DB_NAME
-        
+        database_name = _resolve_database_name(database_name)
+
         conn_string = Config.DB_CONNECTION_STRING
         if database_name:
             conn_string += f"DATABASE={database_name};"
 
         # pyodbc connections default to autocommit=False.
         # We will manage commits explicitly in the decorated functions.
-        connection = pyodbc.connect(conn_string)
-        return connection
+        with connect_duration.time():
+            connection = pyodbc.connect(conn_string)
+        return InstrumentedConnection(connection)
     except pyodbc.Error as ex:
+        connect_errors.inc()
         sqlstate = ex.args[0]
         logger.error(f"Database connection error: {sqlstate} - {ex}")
         raise
 
+
+class _PoolEntry:
+    """A pooled connection plus the timestamps used for recycling and validation."""
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded pool of pyodbc connections to a single database.
+
+    Connections are opened lazily up to max_size, handed out LIFO so the
+    warmest connection is reused first, validated with SELECT 1 when they have
+    sat idle longer than ping_interval, and recycled once older than max_lifetime.
+    """
+
+    def __init__(self, database_name, max_size=None, min_idle=None, timeout=None,
+                 max_lifetime=None, ping_interval=None, connect=None):
+        self.database_name = database_name
+        self.max_size = max_size if max_size is not None else Config.DB_POOL_SIZE
+        self.min_idle = min(min_idle if min_idle is not None else Config.DB_POOL_MIN_IDLE, self.max_size)
+        self.timeout = timeout if timeout is not None else Config.DB_POOL_TIMEOUT
+        self.max_lifetime = max_lifetime if max_lifetime is not None else Config.DB_POOL_MAX_LIFETIME
+        self.ping_interval = ping_interval if ping_interval is not None else Config.DB_POOL_PING_INTERVAL
+        self._connect = connect or get_db_connection
+
+        self._cond = threading.Condition()
+        self._idle = []  # LIFO stack of _PoolEntry
+        self._checked_out = {}  # id(connection) -> _PoolEntry
+        self._size = 0  # idle + checked out + being opened
+        self._closed = False
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle_count(self):
+        return len(self._idle)
+
+    @property
+    def checked_out_count(self):
+        return len(self._checked_out)
+
+    def _open_entry(self):
+        return _PoolEntry(self._connect(database_name=self.database_name))
+
+    def _is_usable(self, entry):
+        """Return False if the entry is past its lifetime or fails a liveness ping."""
+        now = time.monotonic()
+        if now - entry.created_at > self.max_lifetime:
+            return False
+        if now - entry.last_used > self.ping_interval:
+            try:
+                with db_statement('pool_ping'):
+                    cursor = entry.connection.cursor()
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                    cursor.close()
+            except pyodbc.Error as e:
+                logger.warning(f"Discarding dead pooled connection to {self.database_name}: {e}")
+                return False
+        return True
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _forget(self, entry=None):
+        """Release a slot after a connection was closed or failed to open."""
+        with self._cond:
+            if entry is not None:
+                self._checked_out.pop(id(entry.connection), None)
+            self._size -= 1
+            active_connections.dec()
+            self._cond.notify()
+
+    def acquire(self):
+        """Check out a connection, waiting up to timeout seconds for one to be free."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolExhaustedError(f"Connection pool for {self.database_name} is closed")
+                if self._idle:
+                    entry = self._idle.pop()
+                    idle_connections.dec()
+                    break
+                if self._size < self.max_size:
+                    entry = None
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    pool_exhausted.inc()
+                    pool_wait_time.observe(time.monotonic() - start)
+                    raise PoolExhaustedError(
+                        f"No database connection available for {self.database_name} "
+                        f"after {self.timeout}s (pool size {self.max_size})"
+                    )
+                self._cond.wait(remaining)
+            active_connections.inc()
+        pool_wait_time.observe(time.monotonic() - start)
+
+        # Validation and connecting happen outside the lock so other threads are not blocked
+        if entry is not None and not self._is_usable(entry):
+            self._close_quietly(entry.connection)
+            entry = None
+        if entry is None:
+            try:
+                entry = self._open_entry()
+            except Exception:
+                self._forget()
+                raise
+
+        with self._cond:
+            self._checked_out[id(entry.connection)] = entry
+        return entry.connection
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, rolling back any open transaction."""
+        with self._cond:
+            entry = self._checked_out.get(id(connection))
+        if entry is None:
+            # Not one of ours (or already released) - just close it
+            self._close_quietly(connection)
+            return
+
+        if not discard:
+            try:
+                connection.rollback()
+            except pyodbc.Error as e:
+                logger.warning(f"Discarding pooled connection that failed to reset: {e}")
+                discard = True
+        if not discard and time.monotonic() - entry.created_at > self.max_lifetime:
+            discard = True
+
+        if discard or self._closed:
+            self._close_quietly(connection)
+            self._forget(entry)
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._checked_out.pop(id(connection), None)
+            self._idle.append(entry)
+            idle_connections.inc()
+            active_connections.dec()
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def warm(self):
+        """Open connections until min_idle warm connections are available."""
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle) >= self.min_idle or self._size >= self.max_size:
+                    break
+                self._size += 1
+                active_connections.inc()
+            try:
+                entry = self._open_entry()
+            except Exception as e:
+                self._forget()
+                logger.warning(f"Failed to warm connection pool for {self.database_name}: {e}")
+                break
+            with self._cond:
+                self._idle.append(entry)
+                idle_connections.inc()
+                active_connections.dec()
+                self._cond.notify()
+            opened += 1
+        if opened:
+            logger.info(f"Warmed {opened} pooled connection(s) to {self.database_name}")
+        return opened
+
+    def close(self):
+        """Close idle connections; checked-out ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            idle_connections.dec(len(idle))
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_quietly(entry.connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database_name=None):
+    """Return the process-wide connection pool for a database, creating it on first use."""
+    database_name = _resolve_database_name(database_name)
+    with _pools_lock:
+        pool = _pools.get(database_name)
+        if pool is None:
+            pool = _pools[database_name] = ConnectionPool(database_name)
+        return pool
+
+
+def close_pools():
+    """Close every pool (used on shutdown and between tests)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+@contextmanager
+def pooled_connection(database_name=None):
+    """Borrow a connection from the pool for the given database for the duration of a with block."""
+    pool = get_pool(database_name)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
 def with_db_connection(func):
     """
     Decorator to manage database connections for functions.
-    It passes a database connection object to the decorated function.
-    Handles connection opening, closing, and error rollback/commit.
+    It passes a pooled database connection object to the decorated function.
+    Handles connection checkout/return, and error rollback/commit.
     """
     def wrapper(*args, **kwargs):
-        conn = None
-        try:
-            # If the function needs to connect to the test database for DDL,
-            # it should pass database_name=Config.DB_TEST_NAME or None for master
-            # The create_survey_tables function will handle database switching.
-            # For other functions, we typically connect to the main app database.
-            db_name_for_func = kwargs.pop('db_name', Config.DB_NAME)
-            conn = get_db_connection(database_name=db_name_for_func)
-
-            # Set row_factory for dictionary-like access if needed
-            # For pyodbc, you can't set row_factory on the connection, but on the cursor
-            # The decorated function will create its own cursor.
-
-            result = func(conn, *args, **kwargs)
-            conn.commit() # Commit changes if no exception
-            return result
-        except Exception as e:
-            if conn:
+        # If the function needs to connect to the test database for DDL,
+        # it should pass database_name=Config.DB_TEST_NAME or None for master
+        # Schema migrations (app.utils.migrations) open their own connection.
+        # For other functions, we typically connect to the main app database.
+        db_name_for_func = kwargs.pop('db_name', Config.DB_NAME)
+        with pooled_connection(db_name_for_func) as conn:
+            try:
+                result = func(conn, *args, **kwargs)
+                conn.commit() # Commit changes if no exception
+                return result
+            except Exception as e:
                 conn.rollback() # Rollback on exception
-            logger.error(f"Database operation failed: {e}")
-            raise # Re-raise the exception after rollback
-        finally:
-            if conn:
-                conn.close() # Ensure connection is closed
+                logger.error(f"Database operation failed: {e}")
+                raise # Re-raise the exception after rollback
     return wrapper
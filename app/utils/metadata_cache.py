@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from app.utils.validation import SubmissionValidator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SURVEY_TITLE = 'Patient Experience Survey'
+
+
+class QuestionDefinition:
+    """A survey question with its options already parsed from JSON."""
+    __slots__ = ('question_id', 'question_text', 'question_type', 'is_required', 'options')
+
+    def __init__(self, question_id, question_text, question_type, is_required, options):
+        self.question_id = question_id
+        self.question_text = question_text
+        self.question_type = question_type
+        self.is_required = is_required
+        self.options = options
+
+    def to_dict(self):
+        return {
+            'question_id': self.question_id,
+            'question_text': self.question_text,
+            'question_type': self.question_type,
+            'is_required': self.is_required,
+            'options': list(self.options)
+        }
+
+
+class SurveyDefinition:
+    """A survey, its questions, their compiled validator and the pre-serialized /api/questions body."""
+
+    def __init__(self, survey_id, title, description, is_active, questions):
+        self.survey_id = survey_id
+        self.title = title
+        self.description = description
+        self.is_active = is_active
+        self.questions = questions
+        self.questions_by_id = {q.question_id: q for q in questions}
+        self.validator = SubmissionValidator(questions)
+        self.questions_json = json.dumps([q.to_dict() for q in questions], separators=(',', ':')).encode('utf-8')
+        # Content hash, so every process and replica derives the same version and ETag
+        self.version = hashlib.sha256(self.questions_json).hexdigest()[:16]
+
+    @property
+    def etag(self):
+        return self.version
+
+
+class MetadataSnapshot:
+    """Immutable view of all surveys, indexed by id and title."""
+
+    def __init__(self, surveys):
+        self.by_id = {s.survey_id: s for s in surveys}
+        self.by_title = {}
+        for survey in sorted(surveys, key=lambda s: s.survey_id):
+            # Lowest id wins for duplicate titles, matching the old unordered lookup in practice
+            self.by_title.setdefault(survey.title, survey)
+        self.version = hashlib.sha256(
+            ''.join(f"{s.survey_id}:{s.version};" for s in sorted(surveys, key=lambda s: s.survey_id)).encode()
+        ).hexdigest()[:16]
+
+
+def load_metadata(conn):
+    """Read every survey and question in two queries."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT survey_id, title, description, is_active FROM surveys")
+    survey_rows = cursor.fetchall()
+
+    cursor.execute("""
+        SELECT question_id, survey_id, question_text, question_type, is_required, options
+        FROM questions ORDER BY survey_id, question_id
+    """)
+    questions = {}
+    for q in cursor.fetchall():
+        questions.setdefault(q[1], []).append(QuestionDefinition(
+            question_id=q[0],
+            question_text=q[2],
+            question_type=q[3],
+            is_required=bool(q[4]),
+            options=tuple(json.loads(q[5])) if q[5] else ()
+        ))
+
+    return MetadataSnapshot([
+        SurveyDefinition(row[0], row[1], row[2], bool(row[3]), questions.get(row[0], []))
+        for row in survey_rows
+    ])
+
+
+class MetadataCache:
+    """
+    Process-wide cache of survey and question definitions.
+
+    Entries are reloaded after ttl seconds or when invalidate() is called. If a
+    reload fails, the previous snapshot keeps being served and the reload is
+    retried on the next access.
+    """
+
+    def __init__(self, connect, ttl=300, loader=load_metadata):
+        self._connect = connect
+        self._loader = loader
+        self.ttl = ttl
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return snapshot
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if self._snapshot is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._snapshot
+            try:
+                with self._connect() as conn:
+                    snapshot = self._loader(conn)
+            except Exception as e:
+                if self._snapshot is None:
+                    raise
+                logger.warning(f"Metadata reload failed, serving cached copy: {e}")
+                return self._snapshot
+            changed = self._snapshot is None or self._snapshot.version != snapshot.version
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+        if changed:
+            logger.info(f"Survey metadata loaded (version {snapshot.version})")
+            for listener in self._listeners:
+                listener(snapshot)
+        return snapshot
+
+    def get_survey(self, title=DEFAULT_SURVEY_TITLE):
+        """Return the SurveyDefinition for a title, or None if there is no such survey."""
+        return self._current().by_title.get(title)
+
+    def get_survey_by_id(self, survey_id):
+        return self._current().by_id.get(survey_id)
+
+    @property
+    def version(self):
+        return self._current().version
+
+    def invalidate(self):
+        """Force the next access to reload from the database."""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def add_listener(self, callback):
+        """Call callback(snapshot) whenever a reload produces a different version."""
+        self._listeners.append(callback)
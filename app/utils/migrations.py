@@ -0,0 +1,139 @@
+"""
+Versioned schema migrations.
+
+Migrations are numbered .sql files in app/migrations (NNNN_description.sql),
+applied in order, each in its own transaction, and recorded in schema_version.
+A file may contain several batches separated by lines holding only GO.
+The embedded SQLite backend keeps its own files, with the same version
+numbers, in app/migrations/sqlite (applied by app.utils.sqlite_storage).
+
+    python -m app.utils.migrations status
+    python -m app.utils.migrations upgrade
+"""
+import argparse
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+_FILENAME = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+_BATCH_SEPARATOR = re.compile(r'^\s*GO\s*$', re.IGNORECASE | re.MULTILINE)
+
+# Creates the version table on first use and reads the current version in one round trip
+_VERSION_QUERY = """
+    SET NOCOUNT ON;
+    IF OBJECT_ID('schema_version', 'U') IS NULL
+    CREATE TABLE schema_version (
+        version INT PRIMARY KEY,
+        name NVARCHAR(255) NOT NULL,
+        applied_at DATETIME NOT NULL DEFAULT GETDATE()
+    );
+    SELECT ISNULL(MAX(version), 0) FROM schema_version;
+"""
+
+
+class Migration:
+    __slots__ = ('version', 'name', 'batches')
+
+    def __init__(self, version, name, batches):
+        self.version = version
+        self.name = name
+        self.batches = batches
+
+    def __repr__(self):
+        return f"Migration({self.version}, {self.name!r})"
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Read and order the migration files; duplicate version numbers are an error."""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {filename}")
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            batches = [b.strip() for b in _BATCH_SEPARATOR.split(f.read()) if b.strip()]
+        migrations[version] = Migration(version, match.group(2), batches)
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def current_version(conn):
+    cursor = conn.cursor()
+    cursor.execute(_VERSION_QUERY)
+    version = cursor.fetchone()[0]
+    conn.commit()
+    return version
+
+
+def migrate(conn, migrations=None):
+    """
+    Bring the schema up to date and return the migrations that were applied.
+
+    When the schema is already current this costs a single query. Otherwise an
+    exclusive application lock serialises replicas that boot at the same time.
+    """
+    migrations = load_migrations() if migrations is None else migrations
+    latest = migrations[-1].version if migrations else 0
+    conn.autocommit = False
+
+    version = current_version(conn)
+    if version >= latest:
+        logger.info(f"Database schema is current (version {version})")
+        return []
+
+    cursor = conn.cursor()
+    applied = []
+    for migration in [m for m in migrations if m.version > version]:
+        try:
+            cursor.execute("EXEC sp_getapplock @Resource = 'schema_migrations', @LockMode = 'Exclusive', "
+                           "@LockOwner = 'Transaction', @LockTimeout = 60000")
+            # Another process may have applied it while we waited for the lock
+            cursor.execute("SELECT 1 FROM schema_version WHERE version = ?", (migration.version,))
+            if cursor.fetchone():
+                conn.rollback()
+                continue
+            for batch in migration.batches:
+                cursor.execute(batch)
+            cursor.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                           (migration.version, migration.name))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Migration {migration.version}_{migration.name} failed: {e}")
+            raise
+        logger.info(f"Applied migration {migration.version}_{migration.name}")
+        applied.append(migration)
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage database schema migrations")
+    parser.add_argument('command', choices=['status', 'upgrade'])
+    args = parser.parse_args(argv)
+
+    from app.config import Config
+    from app.utils.db_utils import get_db_connection
+
+    conn = get_db_connection(database_name=Config.DB_NAME)
+    try:
+        if args.command == 'status':
+            version = current_version(conn)
+            pending = [m for m in load_migrations() if m.version > version]
+            print(f"Current version: {version}")
+            for migration in pending:
+                print(f"Pending: {migration.version}_{migration.name}")
+        else:
+            migrate(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,164 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from itertools import islice
+
+from app.utils.archive import merge_responses
+from app.utils.sql_dialects import SQL_SERVER
+
+# Rows pulled from the driver per fetchmany call when streaming
+STREAM_FETCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(response_id):
+    """Opaque resume token for the keyset position after response_id."""
+    return base64.urlsafe_b64encode(f"r:{response_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the response_id encoded in a cursor token (0 when no token is given)."""
+    if not token:
+        return 0
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded.encode()).decode().partition(':')
+        if prefix != 'r':
+            raise ValueError
+        return int(value)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {token!r}")
+
+
+def parse_since(value):
+    """Parse an ISO-8601 date or datetime watermark for submitted_at."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid since value (expected ISO-8601): {value!r}")
+
+
+def parse_limit(value):
+    """Parse and clamp a page size; None means no paging was requested."""
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid limit: {value!r}")
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def execute_responses_query(cursor, after_id=0, since=None, limit=None, dialect=SQL_SERVER):
+    """
+    Run the responses/answers/questions join for responses after a keyset position.
+
+    The TOP/WHERE are applied to responses before the join, so SQL Server seeks on the
+    response_id primary key instead of joining the full history.
+    """
+    filters = "response_id > ?"
+    params = [after_id]
+    if since is not None:
+        filters += " AND submitted_at >= ?"
+        params.append(since)
+    responses, params = dialect.select_first(
+        "response_id, submitted_at", "responses", filters, params, "response_id", limit
+    )
+
+    cursor.execute(f"""
+        SELECT
+            r.response_id,
+            {dialect.minute_text('r.submitted_at')} as date,
+            q.question_text,
+            a.answer_value
+        FROM ({responses}) r
+        JOIN answers a ON r.response_id = a.response_id
+        JOIN questions q ON a.question_id = q.question_id
+        ORDER BY r.response_id, q.question_id
+    """, params)  # nosec B608 # select_first derived table and dialect SQL from constants
+
+
+def iter_rows(cursor, fetch_size=STREAM_FETCH_SIZE):
+    """Yield rows with fetchmany so only fetch_size rows are held at once."""
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def group_responses(rows):
+    """Fold ordered join rows into (response_id, date, answers) tuples, one response at a time."""
+    current_id = None
+    date = None
+    answers = []
+    for row in rows:
+        if row[0] != current_id:
+            if current_id is not None:
+                yield current_id, date, answers
+            current_id, date, answers = row[0], row[1], []
+        answers.append({
+            'question': row[2],
+            'answer': row[3]
+        })
+    if current_id is not None:
+        yield current_id, date, answers
+
+
+def archived_responses(archive, after_id=0, since=None):
+    """Yield archived responses after after_id as (response_id, date, answers), like group_responses()."""
+    questions = archive.question_texts()
+    for response_id, submitted_at, answers in archive.iter_responses(after_id=after_id, date_from=since):
+        yield response_id, submitted_at.strftime('%Y-%m-%d %H:%M'), [
+            {'question': questions[question_id], 'answer': value}
+            for question_id, value in answers if question_id in questions
+        ]
+
+
+def fetch_responses_page(cursor, after_id=0, since=None, limit=DEFAULT_PAGE_SIZE, dialect=SQL_SERVER,
+                         archived=None):
+    """
+    Return one keyset page with a resume cursor usable as an incremental-sync watermark.
+    archived, if given, is a stream from archived_responses() merged in by response_id.
+    """
+    execute_responses_query(cursor, after_id, since, limit, dialect)
+    grouped = group_responses(iter_rows(cursor))
+    if archived is not None:
+        grouped = islice(merge_responses(grouped, archived), limit)
+    responses = [
+        {'response_id': response_id, 'date': date, 'answers': answers}
+        for response_id, date, answers in grouped
+    ]
+    last_id = responses[-1]['response_id'] if responses else after_id
+    return {
+        'responses': responses,
+        'next_cursor': encode_cursor(last_id) if last_id else None,
+        'has_more': len(responses) == limit,
+    }
+
+
+def stream_responses_json(cursor, after_id=0, since=None, fetch_size=STREAM_FETCH_SIZE, dialect=SQL_SERVER,
+                          archived=None):
+    """
+    Yield the legacy {response_id: {date, answers}} document in chunks,
+    merging in the archived stream, if given, by response_id.
+
+    The query runs before the first chunk is produced, so callers can pull that
+    chunk eagerly to surface database errors before the response starts.
+    """
+    execute_responses_query(cursor, after_id, since, dialect=dialect)
+    grouped = group_responses(iter_rows(cursor, fetch_size))
+    if archived is not None:
+        grouped = merge_responses(grouped, archived)
+    yield '{'
+    separator = ''
+    for response_id, date, answers in grouped:
+        yield f'{separator}"{response_id}":{json.dumps({"date": date, "answers": answers})}'
+        separator = ','
+    yield '}'
@@ -0,0 +1,220 @@
+"""
+Per-question answer distribution rollups.
+
+answer_rollups holds one count per (survey, day, question, option) for
+multiple-choice answers. Submissions bump it in the same transaction that
+writes the answers, so /api/stats only ever reads this small table.
+
+Rebuild (or backfill from a date) with:
+
+    python -m app.utils.rollups rebuild [--since YYYY-MM-DD]
+
+Days before the archive horizon (app.utils.archive) are never rebuilt, since
+their answers have left the answers table.
+"""
+import argparse
+import logging
+from collections import Counter
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# Longest option text that is rolled up (matches the option_value column)
+MAX_OPTION_LENGTH = 255
+
+
+def rollup_rows(survey, answers):
+    """
+    Pre-aggregate a submission into (question_id, option_value, count) rows.
+
+    Only answers to multiple-choice questions whose value is one of the
+    question's options are counted, which keeps the rollup cardinality bounded.
+    """
+    counts = Counter()
+    for answer in answers:
+        question = survey.questions_by_id.get(answer['question_id'])
+        if question is None or question.question_type != 'multiple_choice':
+            continue
+        value = answer['answer_value']
+        if value in question.options and len(value) <= MAX_OPTION_LENGTH:
+            counts[(question.question_id, value)] += 1
+    return [(question_id, value, count) for (question_id, value), count in counts.items()]
+
+
+def rollup_merge_sql(row_count):
+    """
+    MERGE that adds row_count pre-aggregated rows for @response_id to the rollups.
+    The bucket day comes from the stored response, so spooled and backdated
+    submissions land on the day they were submitted.
+    """
+    return f"""
+    MERGE answer_rollups WITH (HOLDLOCK) AS t
+    USING (
+        SELECT r.survey_id, CAST(r.submitted_at AS DATE) AS bucket_date,
+               v.question_id, v.option_value, v.answer_count
+        FROM responses r
+        CROSS JOIN (VALUES {", ".join(["(?, ?, ?)"] * row_count)}) AS v(question_id, option_value, answer_count)
+        WHERE r.response_id = @response_id
+    ) AS s
+    ON t.survey_id = s.survey_id AND t.bucket_date = s.bucket_date
+       AND t.question_id = s.question_id AND t.option_value = s.option_value
+    WHEN MATCHED THEN UPDATE SET answer_count = t.answer_count + s.answer_count
+    WHEN NOT MATCHED THEN INSERT (survey_id, bucket_date, question_id, option_value, answer_count)
+        VALUES (s.survey_id, s.bucket_date, s.question_id, s.option_value, s.answer_count);
+"""  # nosec B608 # ? placeholder rows only
+
+
+def rollup_batch_merge_sql(row_count):
+    """
+    MERGE that adds row_count (response_id, question_id, option_value, count)
+    rows spanning many responses, summed per day first so each rollup row is
+    touched once per batch.
+    """
+    return f"""
+    MERGE answer_rollups WITH (HOLDLOCK) AS t
+    USING (
+        SELECT r.survey_id, CAST(r.submitted_at AS DATE) AS bucket_date,
+               v.question_id, v.option_value, SUM(v.answer_count) AS answer_count
+        FROM (VALUES {", ".join(["(?, ?, ?, ?)"] * row_count)}) AS v(response_id, question_id, option_value, answer_count)
+        JOIN responses r ON r.response_id = v.response_id
+        GROUP BY r.survey_id, CAST(r.submitted_at AS DATE), v.question_id, v.option_value
+    ) AS s
+    ON t.survey_id = s.survey_id AND t.bucket_date = s.bucket_date
+       AND t.question_id = s.question_id AND t.option_value = s.option_value
+    WHEN MATCHED THEN UPDATE SET answer_count = t.answer_count + s.answer_count
+    WHEN NOT MATCHED THEN INSERT (survey_id, bucket_date, question_id, option_value, answer_count)
+        VALUES (s.survey_id, s.bucket_date, s.question_id, s.option_value, s.answer_count);
+"""  # nosec B608 # ? placeholder rows only
+
+
+def rollup_params(rows):
+    params = []
+    for question_id, option_value, count in rows:
+        params.extend((question_id, option_value, count))
+    return params
+
+
+def rebuild_rollups(conn, since=None):
+    """
+    Recompute rollups from the answers table, for all days or from since onwards.
+    Runs as a single transaction; returns the number of rollup rows written.
+    """
+    cursor = conn.cursor()
+    # Live submissions win any deadlock against a rebuild
+    cursor.execute("SET DEADLOCK_PRIORITY LOW")
+    if since is None:
+        cursor.execute("DELETE FROM answer_rollups")
+        date_filter, params = "", []
+    else:
+        cursor.execute("DELETE FROM answer_rollups WHERE bucket_date >= ?", (since,))
+        date_filter, params = "AND r.submitted_at >= ?", [since]
+
+    cursor.execute(f"""
+        INSERT INTO answer_rollups (survey_id, bucket_date, question_id, option_value, answer_count)
+        SELECT r.survey_id, CAST(r.submitted_at AS DATE), a.question_id,
+               CAST(a.answer_value AS NVARCHAR({MAX_OPTION_LENGTH})), COUNT(*)
+        FROM answers a
+        JOIN responses r ON r.response_id = a.response_id
+        JOIN questions q ON q.question_id = a.question_id
+        WHERE q.question_type = 'multiple_choice'
+          AND LEN(a.answer_value) <= {MAX_OPTION_LENGTH}
+          AND a.answer_value IN (SELECT value FROM OPENJSON(q.options))
+          {date_filter}
+        GROUP BY r.survey_id, CAST(r.submitted_at AS DATE), a.question_id,
+                 CAST(a.answer_value AS NVARCHAR({MAX_OPTION_LENGTH}))
+    """, params)  # nosec B608 # integer constant and a fixed date filter
+    written = cursor.rowcount
+    conn.commit()
+    logger.info(f"Rebuilt {written} answer rollup rows" + (f" since {since}" if since else ""))
+    return written
+
+
+def fetch_distribution(cursor, survey_id, date_from=None, date_to=None, by_day=False):
+    """Read option counts from the rollups only, optionally split by day."""
+    filters = "survey_id = ?"
+    params = [survey_id]
+    if date_from is not None:
+        filters += " AND bucket_date >= ?"
+        params.append(date_from)
+    if date_to is not None:
+        filters += " AND bucket_date <= ?"
+        params.append(date_to)
+    day_column = "bucket_date, " if by_day else ""
+
+    cursor.execute(f"""
+        SELECT {day_column}question_id, option_value, SUM(answer_count)
+        FROM answer_rollups
+        WHERE {filters}
+        GROUP BY {day_column}question_id, option_value
+    """, params)  # nosec B608 # fixed column and ? filters
+    return cursor.fetchall()
+
+
+def build_stats(survey, rows, by_day=False):
+    """Shape rollup rows into per-question distributions, including zero counts."""
+    counts = {}
+    days = {}
+    for row in rows:
+        if by_day:
+            bucket, question_id, option_value, count = row
+            day_counts = days.setdefault(question_id, {}).setdefault(bucket.isoformat(), {})
+            day_counts[option_value] = day_counts.get(option_value, 0) + count
+        else:
+            question_id, option_value, count = row
+        per_question = counts.setdefault(question_id, {})
+        per_question[option_value] = per_question.get(option_value, 0) + count
+
+    questions = []
+    for question in survey.questions:
+        if question.question_type != 'multiple_choice':
+            continue
+        option_counts = counts.get(question.question_id, {})
+        total = sum(option_counts.values())
+        entry = {
+            'question_id': question.question_id,
+            'question_text': question.question_text,
+            'total': total,
+            'options': [
+                {
+                    'option': option,
+                    'count': option_counts.get(option, 0),
+                    'percent': round(100.0 * option_counts.get(option, 0) / total, 1) if total else 0.0
+                }
+                for option in question.options
+            ]
+        }
+        if by_day:
+            entry['days'] = days.get(question.question_id, {})
+        questions.append(entry)
+    return {'survey_id': survey.survey_id, 'questions': questions}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the answer distribution rollups")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    rebuild = subparsers.add_parser('rebuild', help='recompute rollups from the answers table')
+    rebuild.add_argument('--since', type=date.fromisoformat, help='only rebuild days on or after YYYY-MM-DD')
+    args = parser.parse_args(argv)
+
+    from app.config import Config
+    from app.utils.archive import ResponseArchive
+    from app.utils.storage import get_storage
+
+    # Archived days have no answers left to count, so their rollups are kept as they are
+    since = args.since
+    horizon = ResponseArchive(Config.ARCHIVE_DIR).horizon
+    if horizon is not None and (since is None or since < horizon):
+        logger.info(f"Keeping the rollups of days before the archive horizon {horizon}")
+        since = horizon
+
+    storage = get_storage()
+    try:
+        with storage.connection() as conn:
+            storage.rebuild_rollups(conn, since=since)
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
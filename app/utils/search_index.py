@@ -0,0 +1,334 @@
+"""
+In-process inverted index over free-text answers.
+
+Each process keeps a TextIndex of the answers to the survey's text questions
+(minus excluded ones such as the patient's name), so /api/search never scans
+answers.answer_value. A SearchIndexer thread loads the last snapshot (or
+builds from scratch), then catches up with new responses every interval
+seconds by response_id. Submissions stored by this process are added at once.
+Results are ranked with BM25 and can be filtered by question, site and date.
+"""
+import gzip
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Bumped when tokenization changes, so older snapshots are rebuilt rather than loaded
+SNAPSHOT_VERSION = 1
+# Ids below the high-water mark that are re-read on every sync, for transactions
+# that took their response_id before, but committed after, the previous sync
+SYNC_OVERLAP = 1000
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+    a about all am an and any are as at be been but by can could did do does for from had has have he her his
+    how i if in into is it its me my of on or our she so than that the their them then there these they this
+    to us was we were what when where which who will with would you your
+""".split())
+
+search_index_documents = Gauge('search_index_documents', 'Text answers in the in-process search index',
+                               multiprocess_mode='max')
+search_duration = Histogram('search_duration_seconds', 'Time spent answering /api/search from the index',
+                            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+
+
+def tokenize(text):
+    """Lower-cased words of two or more characters, without stopwords."""
+    return [t for t in TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def indexable_fields(survey, excluded_questions=(), site_question=None):
+    """
+    Return (question_ids, site_question_id): the survey's text questions minus
+    those whose text is in excluded_questions, and the question giving the site.
+    """
+    question_ids = tuple(sorted(
+        q.question_id for q in survey.questions
+        if q.question_type == 'text' and q.question_text not in excluded_questions
+    ))
+    site_question_id = next((q.question_id for q in survey.questions if q.question_text == site_question), None)
+    return question_ids, site_question_id
+
+
+class IndexedAnswer:
+    """One indexed text answer."""
+    __slots__ = ('response_id', 'question_id', 'submitted_at', 'site', 'text', 'terms', 'length')
+
+    def __init__(self, response_id, question_id, submitted_at, site, text, terms):
+        self.response_id = response_id
+        self.question_id = question_id
+        self.submitted_at = submitted_at
+        self.site = site
+        self.text = text
+        self.terms = terms
+        self.length = sum(terms.values())
+
+
+class TextIndex:
+    """Postings of term -> {document number: term frequency}; documents are IndexedAnswers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = threading.Event()
+        self._reset(None)
+
+    def _reset(self, fields):
+        self.fields = fields
+        self.high_water = 0
+        self._docs = []
+        self._postings = {}
+        self._responses = set()
+        self._total_length = 0
+        search_index_documents.set(0)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _add(self, response_id, submitted_at, site, texts):
+        self._responses.add(response_id)
+        for question_id, text in texts:
+            terms = Counter(tokenize(text or ''))
+            if not terms:
+                continue
+            doc = len(self._docs)
+            self._docs.append(IndexedAnswer(response_id, question_id, submitted_at, site, text, terms))
+            self._total_length += sum(terms.values())
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[doc] = count
+        search_index_documents.set(len(self._docs))
+
+    def add_response(self, response_id, submitted_at, answers):
+        """Index a just-stored submission's answers (dicts with question_id and answer_value)."""
+        with self._lock:
+            if self.fields is None or response_id in self._responses:
+                return
+            question_ids, site_question_id = self.fields
+            site = next((a['answer_value'] for a in answers if a['question_id'] == site_question_id), None)
+            self._add(response_id, submitted_at, site,
+                      [(a['question_id'], a['answer_value']) for a in answers if a['question_id'] in question_ids])
+
+    def sync(self, connect, survey_id, question_ids, site_question_id, archive=None):
+        """
+        Index responses stored since the last sync; rebuilds when the indexed questions changed.
+        A build from scratch starts with the archived responses, if an archive is given.
+        """
+        fields = (tuple(question_ids), site_question_id)
+        with self._lock:
+            if fields != self.fields:
+                if self.fields is not None:
+                    logger.info("Indexed questions changed; rebuilding the search index")
+                self._reset(fields)
+            from_scratch = self.high_water == 0
+            after = max(self.high_water - SYNC_OVERLAP, 0)
+        if not question_ids:
+            return 0
+        wanted = list(question_ids) + ([site_question_id] if site_question_id is not None else [])
+
+        added = 0
+        if from_scratch and archive is not None:
+            for response_id, submitted_at, answers in archive.iter_responses(survey_id):
+                with self._lock:
+                    self.high_water = max(self.high_water, response_id)
+                    if response_id in self._responses:
+                        continue
+                    site = next((v for q, v in answers if q == site_question_id), None)
+                    self._add(response_id, submitted_at, site, [(q, v) for q, v in answers if q in question_ids])
+                added += 1
+
+        with connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT r.response_id, r.submitted_at, a.question_id, a.answer_value
+                FROM responses r
+                JOIN answers a ON a.response_id = r.response_id
+                WHERE r.survey_id = ? AND r.response_id > ? AND a.question_id IN ({', '.join(['?'] * len(wanted))})
+                ORDER BY r.response_id
+            """, [survey_id, after] + wanted)  # nosec B608 # ? placeholder list only
+            current, submitted_at, site, texts = None, None, None, []
+
+            def flush():
+                nonlocal added
+                if current is None:
+                    return
+                with self._lock:
+                    self.high_water = max(self.high_water, current)
+                    if current in self._responses:
+                        return  # Added by this process when it was stored
+                    self._add(current, submitted_at, site, texts)
+                added += 1
+
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for response_id, row_submitted_at, question_id, answer_value in rows:
+                    if response_id != current:
+                        flush()
+                        current, submitted_at, site, texts = response_id, row_submitted_at, None, []
+                    if question_id == site_question_id:
+                        site = answer_value
+                    else:
+                        texts.append((question_id, answer_value))
+            flush()
+        return added
+
+    def search(self, query, limit=20, question_id=None, site=None, date_from=None, date_to=None, facet_size=10):
+        """
+        Answers containing every query term, best BM25 score first, with facet
+        counts (top other terms and sites) over all matches. date_from and
+        date_to are inclusive dates.
+        """
+        start = time.perf_counter()
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not terms or not all(postings):
+                matches = []
+            else:
+                postings.sort(key=len)
+                matches = [doc for doc in postings[0] if all(doc in p for p in postings[1:])]
+            docs = self._docs
+            matches = [
+                doc for doc in matches
+                if (question_id is None or docs[doc].question_id == question_id)
+                and (site is None or docs[doc].site == site)
+                and (date_from is None or docs[doc].submitted_at.date() >= date_from)
+                and (date_to is None or docs[doc].submitted_at.date() <= date_to)
+            ]
+
+            count = len(docs)
+            average_length = self._total_length / count if count else 0
+            idf = {term: math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5)) for term, p in zip(terms, postings)}
+
+            def score(doc):
+                answer = docs[doc]
+                norm = K1 * (1 - B + B * answer.length / average_length)
+                return sum(idf[t] * answer.terms[t] * (K1 + 1) / (answer.terms[t] + norm) for t in terms)
+
+            scored = heapq.nlargest(limit, ((score(doc), doc) for doc in matches),
+                                    key=lambda item: (item[0], docs[item[1]].submitted_at))
+            term_counts, site_counts = Counter(), Counter()
+            for doc in matches:
+                term_counts.update(t for t in docs[doc].terms if t not in idf)
+                site_counts[docs[doc].site] += 1
+            results = [{
+                'response_id': docs[doc].response_id,
+                'question_id': docs[doc].question_id,
+                'submitted_at': docs[doc].submitted_at.isoformat(sep=' ', timespec='seconds'),
+                'site': docs[doc].site,
+                'score': round(value, 3),
+                'text': docs[doc].text,
+            } for value, doc in scored]
+
+        elapsed = time.perf_counter() - start
+        search_duration.observe(elapsed)
+        return {
+            'query': query,
+            'terms': terms,
+            'total': len(matches),
+            'took_ms': round(elapsed * 1000, 3),
+            'results': results,
+            'facets': {
+                'terms': [{'term': t, 'count': c} for t, c in term_counts.most_common(facet_size)],
+                'sites': [{'site': s, 'count': c} for s, c in site_counts.most_common()],
+            },
+        }
+
+    def save(self, path):
+        """Write a snapshot atomically (gzip JSON of every indexed answer)."""
+        with self._lock:
+            snapshot = {
+                'version': SNAPSHOT_VERSION,
+                'fields': [list(self.fields[0]), self.fields[1]] if self.fields else None,
+                'high_water': self.high_water,
+                'answers': [[d.response_id, d.question_id, d.submitted_at.isoformat(), d.site, d.text]
+                            for d in self._docs],
+            }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        logger.info(f"Saved search index snapshot of {len(snapshot['answers'])} answers to {path}")
+
+    def load(self, path):
+        """Replace the index with a snapshot; returns False if there is none or it is outdated."""
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return False
+        if snapshot.get('version') != SNAPSHOT_VERSION or not snapshot.get('fields'):
+            logger.info(f"Ignoring outdated search index snapshot {path}")
+            return False
+        question_ids, site_question_id = snapshot['fields']
+        with self._lock:
+            self._reset((tuple(question_ids), site_question_id))
+            by_response = {}
+            for response_id, question_id, submitted_at, site, text in snapshot['answers']:
+                entry = by_response.setdefault(response_id, (datetime.fromisoformat(submitted_at), site, []))
+                entry[2].append((question_id, text))
+            for response_id, (submitted_at, site, texts) in by_response.items():
+                self._add(response_id, submitted_at, site, texts)
+            self.high_water = snapshot['high_water']
+        logger.info(f"Loaded search index snapshot of {len(self._docs)} answers from {path}")
+        return True
+
+
+class SearchIndexer(threading.Thread):
+    """
+    Daemon thread that loads the snapshot, catches up with sync() every
+    interval seconds and saves a snapshot after the first catch-up and on stop.
+    """
+
+    def __init__(self, index, sync, snapshot_path=None, interval=5.0):
+        super().__init__(name='search-indexer', daemon=True)
+        self.index = index
+        self.sync = sync
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self._stopping = threading.Event()
+
+    def _save(self):
+        if self.snapshot_path and self.index.fields is not None:
+            try:
+                self.index.save(self.snapshot_path)
+            except Exception as e:
+                logger.warning(f"Saving the search index snapshot failed: {e}")
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self.join(timeout)
+        if self.index.ready.is_set():
+            self._save()
+
+    def run(self):
+        if self.snapshot_path:
+            try:
+                self.index.load(self.snapshot_path)
+            except Exception as e:
+                logger.warning(f"Loading the search index snapshot failed, rebuilding: {e}")
+        while not self._stopping.is_set():
+            try:
+                added = self.sync()
+                if not self.index.ready.is_set():
+                    logger.info(f"Search index ready: {len(self.index)} answers ({added} read from the database)")
+                    self.index.ready.set()
+                    self._save()
+            except Exception as e:
+                logger.warning(f"Search index sync failed: {e}")
+            self._stopping.wait(self.interval)
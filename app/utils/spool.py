@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class SpoolItem:
+    """A claimed submission waiting to be written to SQL Server."""
+    __slots__ = ('receipt_id', 'answers', 'received_at')
+
+    def __init__(self, receipt_id, answers, received_at):
+        self.receipt_id = receipt_id
+        self.answers = answers
+        self.received_at = received_at
+
+    @property
+    def submitted_at(self):
+        """Acceptance time as a naive UTC datetime (Azure SQL's GETDATE() runs in UTC)."""
+        return datetime.fromtimestamp(self.received_at, timezone.utc).replace(tzinfo=None)
+
+
+class SubmissionSpool:
+    """
+    Durable local queue of accepted survey submissions, backed by SQLite in WAL mode.
+
+    Every append is fsynced before it returns, so an acknowledged submission
+    survives a process crash. Writers claim rows with a lease; rows whose lease
+    expires (because the writer died mid-batch) become claimable again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                receipt_id TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                received_at REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                lease_until REAL NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_spool_status_seq ON spool (status, seq)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: transactions are managed explicitly below
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, answers):
+        """Durably store a submission and return its receipt id."""
+        receipt_id = uuid.uuid4().hex
+        self._connection().execute(
+            "INSERT INTO spool (receipt_id, payload, received_at) VALUES (?, ?, ?)",
+            (receipt_id, json.dumps(answers), time.time())
+        )
+        return receipt_id
+
+    def claim(self, limit, lease_seconds=300):
+        """Lease up to limit of the oldest pending submissions to the caller."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("""
+                SELECT receipt_id, payload, received_at FROM spool
+                WHERE status = 'pending' AND lease_until < ?
+                ORDER BY seq LIMIT ?
+            """, (now, limit)).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE spool SET lease_until = ? WHERE receipt_id = ?",
+                    [(now + lease_seconds, row[0]) for row in rows]
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [SpoolItem(row[0], json.loads(row[1]), row[2]) for row in rows]
+
+    def complete(self, receipt_ids):
+        """Remove submissions that are now stored in SQL Server."""
+        self._connection().executemany("DELETE FROM spool WHERE receipt_id = ?", [(r,) for r in receipt_ids])
+
+    def release(self, receipt_ids, error=None):
+        """Give claimed submissions back to the queue after a failed drain attempt."""
+        self._connection().executemany(
+            "UPDATE spool SET lease_until = 0, attempts = attempts + 1, last_error = ? WHERE receipt_id = ?",
+            [(error, r) for r in receipt_ids]
+        )
+
+    def mark_failed(self, receipt_id, error):
+        """Park a submission that can never be written (kept for inspection, not retried)."""
+        self._connection().execute(
+            "UPDATE spool SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE receipt_id = ?",
+            (error, receipt_id)
+        )
+
+    def depth(self):
+        return self._connection().execute("SELECT COUNT(*) FROM spool WHERE status = 'pending'").fetchone()[0]
+
+    def failed_count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM spool WHERE status = 'failed'").fetchone()[0]
+
+    def oldest_pending_age(self):
+        """Seconds since the oldest pending submission was accepted (0 when empty)."""
+        row = self._connection().execute(
+            "SELECT MIN(received_at) FROM spool WHERE status = 'pending'"
+        ).fetchone()
+        return max(0.0, time.time() - row[0]) if row[0] is not None else 0.0
+
+    def status(self, receipt_id):
+        """Return (status, last_error) for a spooled receipt, or None if it has left the spool."""
+        row = self._connection().execute(
+            "SELECT status, last_error FROM spool WHERE receipt_id = ?", (receipt_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+
+class SpoolWriter(threading.Thread):
+    """
+    Background thread that drains the spool into the database in batches.
+
+    sink(items) must write all items in one transaction and be idempotent per
+    receipt_id. Errors for which is_permanent_error returns True are isolated to
+    the offending submission, which is parked as failed; any other error (an
+    outage) leaves the batch in the spool and retries with exponential backoff.
+    """
+
+    def __init__(self, spool, sink, batch_size=100, flush_interval=0.5, lease_seconds=300,
+                 retry_initial=1.0, retry_max=60.0, is_permanent_error=None, on_batch=None):
+        super().__init__(name='spool-writer', daemon=True)
+        self.spool = spool
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lease_seconds = lease_seconds
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self.is_permanent_error = is_permanent_error or (lambda e: False)
+        self.on_batch = on_batch
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def notify(self):
+        """Wake the writer early because new submissions were appended."""
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        self.join(timeout)
+
+    def run(self):
+        backoff = self.retry_initial
+        while not self._stopping.is_set():
+            try:
+                drained = self.drain_once()
+                backoff = self.retry_initial
+            except Exception as e:
+                logger.warning(f"Spool drain failed, retrying in {backoff:.1f}s: {e}")
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, self.retry_max)
+                continue
+            if not drained:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+
+    def drain_once(self):
+        """Claim and write one batch. Returns the number of submissions handled."""
+        items = self.spool.claim(self.batch_size, self.lease_seconds)
+        if not items:
+            return 0
+        try:
+            self.sink(items)
+        except Exception as e:
+            if not self.is_permanent_error(e):
+                self.spool.release([item.receipt_id for item in items], str(e))
+                raise
+            # A bad submission poisoned the batch: write the rest one at a time
+            written = self._drain_individually(items)
+        else:
+            self.spool.complete([item.receipt_id for item in items])
+            written = items
+        if self.on_batch and written:
+            self.on_batch(written)
+        return len(items)
+
+    def _drain_individually(self, items):
+        written = []
+        for index, item in enumerate(items):
+            try:
+                self.sink([item])
+            except Exception as e:
+                if not self.is_permanent_error(e):
+                    self.spool.release([i.receipt_id for i in items[index:]], str(e))
+                    if written and self.on_batch:
+                        self.on_batch(written)
+                    raise
+                logger.error(f"Spooled submission {item.receipt_id} rejected by database: {e}")
+                self.spool.mark_failed(item.receipt_id, str(e))
+            else:
+                self.spool.complete([item.receipt_id])
+                written.append(item)
+        return written
+
+
+class SpoolMetricsCollector:
+    """
+    Reports spool depth, drain lag and parked failures when /metrics is scraped.
+
+    The spool file is shared by every worker process, so reading it at scrape
+    time gives the same answer from any of them (callback gauges are not
+    supported by the multiprocess registry).
+    """
+
+    def __init__(self, get_spool):
+        self._get_spool = get_spool
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        spool = self._get_spool()
+        yield GaugeMetricFamily('patient_survey_spool_depth',
+                                'Survey submissions accepted but not yet written to the database',
+                                value=spool.depth() if spool else 0)
+        yield GaugeMetricFamily('patient_survey_spool_drain_lag_seconds',
+                                'Age of the oldest survey submission waiting in the spool',
+                                value=spool.oldest_pending_age() if spool else 0)
+        yield GaugeMetricFamily('patient_survey_spool_failed',
+                                'Spooled survey submissions parked as failed, never written to the database',
+                                value=spool.failed_count() if spool else 0)
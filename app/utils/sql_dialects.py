@@ -0,0 +1,72 @@
+"""
+The few SQL fragments that differ between the storage backends' otherwise shared queries.
+"""
+
+
+class SqlServerDialect:
+    name = 'sqlserver'
+
+    def select_first(self, columns, source, where, params, order_by, limit=None):
+        """
+        SELECT the first limit rows in order_by order, or every matching row when
+        limit is None. Used as a derived table, so the unlimited form has no ORDER BY
+        (SQL Server rejects one there without TOP). Returns (sql, params).
+        """
+        # Callers pass constant names and expressions; every value is a ? parameter
+        if limit is None:
+            return f"SELECT {columns} FROM {source} WHERE {where}", list(params)  # nosec B608
+        return (f"SELECT TOP (?) {columns} FROM {source} WHERE {where} ORDER BY {order_by}",  # nosec B608
+                [limit] + list(params))
+
+    def minute_text(self, column):
+        """Render a datetime column as 'YYYY-MM-DD HH:MM' text."""
+        return f"FORMAT({column}, 'yyyy-MM-dd HH:mm')"
+
+    def bucket_start(self, column, granularity):
+        """
+        First day of the day, week (ISO, starting Monday) or month containing a
+        datetime column, as a DATE. 1900-01-01 was a Monday, so weeks do not
+        depend on the session's DATEFIRST.
+        """
+        if granularity == 'day':
+            return f"CAST({column} AS DATE)"
+        if granularity == 'week':
+            return f"DATEADD(DAY, -(DATEDIFF(DAY, '19000101', {column}) % 7), CAST({column} AS DATE))"
+        if granularity == 'month':
+            return f"DATEFROMPARTS(YEAR({column}), MONTH({column}), 1)"
+        raise ValueError(f"Unknown granularity {granularity!r}")
+
+    def to_number(self, column):
+        """A text column as a float, NULL when it is not numeric."""
+        return f"TRY_CAST({column} AS FLOAT)"
+
+
+class SqliteDialect:
+    name = 'sqlite'
+
+    def select_first(self, columns, source, where, params, order_by, limit=None):
+        # Callers pass constant names and expressions; every value is a ? parameter
+        if limit is None:
+            return f"SELECT {columns} FROM {source} WHERE {where}", list(params)  # nosec B608
+        return (f"SELECT {columns} FROM {source} WHERE {where} ORDER BY {order_by} LIMIT ?",  # nosec B608
+                list(params) + [limit])
+
+    def minute_text(self, column):
+        return f"strftime('%Y-%m-%d %H:%M', {column})"
+
+    def bucket_start(self, column, granularity):
+        # Text 'YYYY-MM-DD'; 'weekday 0' moves on to the Sunday ending the week
+        if granularity == 'day':
+            return f"date({column})"
+        if granularity == 'week':
+            return f"date({column}, 'weekday 0', '-6 days')"
+        if granularity == 'month':
+            return f"date({column}, 'start of month')"
+        raise ValueError(f"Unknown granularity {granularity!r}")
+
+    def to_number(self, column):
+        return f"CASE WHEN {column} GLOB '[0-9]*' THEN CAST({column} AS REAL) END"
+
+
+SQL_SERVER = SqlServerDialect()
+SQLITE = SqliteDialect()
@@ -0,0 +1,221 @@
+"""
+Embedded SQLite storage backend (STORAGE_BACKEND=sqlite).
+
+One database file at SQLITE_PATH, opened in WAL mode so readers never block
+the writer, with synchronous=NORMAL (a commit is durable once it reaches the
+WAL, without an fsync per transaction). Connections are pooled and
+instrumented exactly like pyodbc ones, so the app code and the db_* metrics
+are the same for both backends.
+
+The schema comes from app/migrations/sqlite, versioned in step with the
+SQL Server migrations and recorded in the same schema_version table.
+"""
+import logging
+import os
+import sqlite3
+from datetime import date, datetime
+
+from app.config import Config
+from app.utils import db_metrics
+from app.utils.db_utils import ConnectionPool, InstrumentedConnection, connect_duration
+from app.utils.migrations import MIGRATIONS_DIR as SQLSERVER_MIGRATIONS_DIR, load_migrations
+from app.utils.rollups import MAX_OPTION_LENGTH
+from app.utils.sql_dialects import SQLITE
+from app.utils.storage import Storage
+from app.utils.submissions import has_unanswered
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(SQLSERVER_MIGRATIONS_DIR, 'sqlite')
+
+# Per-connection settings; journal_mode is persistent but cheap to reassert
+PRAGMAS = (
+    'journal_mode = WAL',
+    'foreign_keys = ON',
+    'cache_size = -16000',  # 16 MB page cache per connection
+    'temp_store = MEMORY',
+    'mmap_size = 268435456',  # Read through a 256 MB memory map instead of read() calls
+)
+
+TOTALS_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM responses),
+        (SELECT COUNT(*) FROM responses WHERE has_unanswered = 1),
+        (SELECT COUNT(*) FROM surveys WHERE is_active = 1),
+        (SELECT COUNT(*) FROM questions)
+"""
+
+# Adds one submission's count to its day; the bucket comes from the stored response
+ROLLUP_UPSERT = """
+    INSERT INTO answer_rollups (survey_id, bucket_date, question_id, option_value, answer_count)
+    SELECT survey_id, date(submitted_at), ?, ?, ? FROM responses WHERE response_id = ?
+    ON CONFLICT (survey_id, bucket_date, question_id, option_value)
+    DO UPDATE SET answer_count = answer_count + excluded.answer_count
+"""
+
+# DATETIME and DATE columns round-trip as datetime and date, like pyodbc returns them
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+
+
+def open_database(path, isolation_level='IMMEDIATE'):
+    """
+    Open path with the tuned pragmas.
+
+    The default isolation_level starts write transactions with BEGIN IMMEDIATE,
+    so concurrent writers queue on busy_timeout instead of failing to upgrade.
+    """
+    conn = sqlite3.connect(path, timeout=Config.SQLITE_BUSY_TIMEOUT, isolation_level=isolation_level,
+                           detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    for pragma in PRAGMAS + (f'synchronous = {Config.SQLITE_SYNCHRONOUS}',):
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
+
+
+def split_statements(script):
+    """Split a migration script into the statements sqlite3 executes one at a time."""
+    statements, pending = [], ''
+    for line in script.splitlines(keepends=True):
+        pending += line
+        if sqlite3.complete_statement(pending):
+            statements.append(pending.strip())
+            pending = ''
+    if pending.strip():
+        statements.append(pending.strip())
+    return statements
+
+
+def migrate(conn, migrations=None):
+    """
+    Apply pending migrations and return those applied.
+
+    conn must be in autocommit mode (isolation_level=None). Each migration runs
+    in its own BEGIN IMMEDIATE transaction, which also serialises processes
+    that start at the same time.
+    """
+    migrations = load_migrations(MIGRATIONS_DIR) if migrations is None else migrations
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    version = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+    applied = []
+    for migration in [m for m in migrations if m.version > version]:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have applied it while we waited for the lock
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (migration.version,)).fetchone():
+                conn.execute("ROLLBACK")
+                continue
+            for batch in migration.batches:
+                for statement in split_statements(batch):
+                    conn.execute(statement)
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                         (migration.version, migration.name))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.error(f"Migration {migration.version}_{migration.name} failed: {e}")
+            raise
+        logger.info(f"Applied migration {migration.version}_{migration.name}")
+        applied.append(migration)
+    if not applied:
+        logger.info(f"Database schema is current (version {version})")
+    return applied
+
+
+class SqliteStorage(Storage):
+    """SQLite file at path, with up to pool_size (default DB_POOL_SIZE) pooled connections."""
+
+    name = 'sqlite'
+    dialect = SQLITE
+    integrity_errors = (sqlite3.IntegrityError,)
+    rejected_errors = (sqlite3.IntegrityError, sqlite3.DataError)
+
+    def __init__(self, path, pool_size=None):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return ConnectionPool(self.path, max_size=self.pool_size, connect=self._connect)
+
+    def _connect(self, database_name=None):
+        with connect_duration.time():
+            return InstrumentedConnection(open_database(self.path))
+
+    def connection(self):
+        return self._pool.connection()
+
+    def initialize(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = open_database(self.path, isolation_level=None)
+        try:
+            return migrate(conn)
+        finally:
+            conn.close()
+
+    def warm(self):
+        self._pool.warm()
+
+    def close(self):
+        pool, self._pool = self._pool, self._new_pool()
+        pool.close()
+
+    def write_survey_response(self, cursor, answers, survey_id, submitted_at=None, receipt_id=None, rollups=None):
+        # No batching needed: every statement is an in-process call, not a network round trip
+        unanswered = has_unanswered(answers)
+        if submitted_at is None:
+            cursor.execute("INSERT INTO responses (survey_id, has_unanswered) VALUES (?, ?)", (survey_id, unanswered))
+        else:
+            cursor.execute("INSERT INTO responses (survey_id, has_unanswered, submitted_at) VALUES (?, ?, ?)",
+                           (survey_id, unanswered, submitted_at))
+        response_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO answers (response_id, question_id, answer_value) VALUES (?, ?, ?)",
+            [(response_id, answer['question_id'], answer['answer_value']) for answer in answers]
+        )
+        if receipt_id is not None:
+            cursor.execute("INSERT INTO ingest_receipts (receipt_id, response_id) VALUES (?, ?)",
+                           (receipt_id, response_id))
+        if rollups:
+            cursor.executemany(ROLLUP_UPSERT, [
+                (question_id, option_value, count, response_id) for question_id, option_value, count in rollups
+            ])
+        return response_id
+
+    def load_totals(self, conn):
+        return db_metrics.load_totals(conn, TOTALS_QUERY)
+
+    def rebuild_rollups(self, conn, since=None):
+        cursor = conn.cursor()
+        if since is None:
+            cursor.execute("DELETE FROM answer_rollups")
+            date_filter, params = "", []
+        else:
+            cursor.execute("DELETE FROM answer_rollups WHERE bucket_date >= ?", (since,))
+            date_filter, params = "AND r.submitted_at >= ?", [since]
+
+        cursor.execute(f"""
+            INSERT INTO answer_rollups (survey_id, bucket_date, question_id, option_value, answer_count)
+            SELECT r.survey_id, date(r.submitted_at), a.question_id, a.answer_value, COUNT(*)
+            FROM answers a
+            JOIN responses r ON r.response_id = a.response_id
+            JOIN questions q ON q.question_id = a.question_id
+            WHERE q.question_type = 'multiple_choice'
+              AND length(a.answer_value) <= {MAX_OPTION_LENGTH}
+              AND a.answer_value IN (SELECT value FROM json_each(q.options))
+              {date_filter}
+            GROUP BY r.survey_id, date(r.submitted_at), a.question_id, a.answer_value
+        """, params)  # nosec B608 # integer constant and a fixed date filter
+        written = cursor.rowcount
+        conn.commit()
+        logger.info(f"Rebuilt {written} answer rollup rows" + (f" since {since}" if since else ""))
+        return written
@@ -0,0 +1,135 @@
+"""
+Background initialization and the probes that report on it.
+
+A process answers /livez as soon as it accepts connections. The database work
+that used to hold up startup (creating the database, applying migrations,
+opening warm connections, loading the survey definitions) runs on a Startup
+thread instead, one timed phase after another, and /readyz answers 200 once
+every phase has completed. A phase that fails is retried with backoff, so a
+worker started before the database is reachable turns ready when it is.
+
+Probes share a CachedCheck, so the database round trip behind /readyz and
+/health runs at most once per ttl seconds per process however often they are
+polled.
+"""
+import logging
+import threading
+import time
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+startup_phase_seconds = Gauge('app_startup_phase_seconds', 'Seconds spent in each startup phase', ['phase'],
+                              multiprocess_mode='max')
+app_ready = Gauge('app_ready', 'Whether background initialization has completed', multiprocess_mode='livemin')
+
+
+def record_phase(name, seconds):
+    """Report a startup phase timed outside a Startup thread (such as the import)."""
+    startup_phase_seconds.labels(phase=name).set(seconds)
+
+
+class Startup(threading.Thread):
+    """
+    Daemon thread running phases, (name, function) pairs, in order and then
+    setting ready. A failing phase is retried after retry_interval seconds,
+    doubling up to max_retry_interval; phases that succeeded are not rerun.
+    """
+
+    def __init__(self, phases, retry_interval=1.0, max_retry_interval=30.0):
+        super().__init__(name='startup', daemon=True)
+        self.phases = list(phases)
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.started_at = time.perf_counter()
+        self.ready = threading.Event()
+        self.durations = {}
+        self.error = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()  # Guards durations and error, read by request threads
+
+    def status(self):
+        with self._lock:
+            ready, durations, error = self.ready.is_set(), dict(self.durations), self.error
+        return {
+            'ready': ready,
+            'phases': {name: round(seconds, 3) for name, seconds in durations.items()},
+            'pending': [name for name, _ in self.phases if name not in durations],
+            'error': error,
+        }
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self.join(timeout)
+
+    def run(self):
+        delay = self.retry_interval
+        for name, phase in self.phases:
+            while True:
+                start = time.perf_counter()
+                try:
+                    phase()
+                    break
+                except Exception as e:
+                    with self._lock:
+                        self.error = f"{name}: {e}"
+                    logger.warning(f"Startup phase {name} failed, retrying in {delay:.0f}s: {e}")
+                if self._stopping.wait(delay):
+                    return
+                delay = min(delay * 2, self.max_retry_interval)
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.durations[name] = seconds
+            record_phase(name, seconds)
+            delay = self.retry_interval
+
+        total = time.perf_counter() - self.started_at
+        record_phase('total', total)
+        app_ready.set(1)
+        with self._lock:
+            self.error = None
+            self.ready.set()
+        logger.info(f"Ready in {total:.2f}s ("
+                    + ', '.join(f"{name} {seconds:.2f}s" for name, seconds in self.durations.items()) + ")")
+
+
+class CachedCheck:
+    """
+    The outcome of check() as (ok, error), reused for ttl seconds. One caller
+    at a time runs the check; callers arriving meanwhile get the previous
+    outcome instead of queueing behind it.
+    """
+
+    def __init__(self, check, ttl=5.0):
+        self._check = check
+        self.ttl = ttl
+        self._outcome = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fresh(self):
+        return self._outcome is not None and time.monotonic() - self._checked_at < self.ttl
+
+    def result(self):
+        outcome = self._outcome
+        if self._fresh():
+            return outcome
+        if not self._lock.acquire(blocking=outcome is None):
+            return outcome
+        try:
+            if self._fresh():
+                return self._outcome
+            try:
+                self._check()
+                self._outcome = (True, None)
+            except Exception as e:
+                logger.error(f"Health check failed: {e}")
+                self._outcome = (False, str(e))
+            self._checked_at = time.monotonic()
+            return self._outcome
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        self._outcome = None
@@ -0,0 +1,161 @@
+"""
+Storage backends.
+
+The app talks to its database through one Storage object, selected by
+Config.STORAGE_BACKEND:
+
+    sqlserver  Azure SQL / SQL Server through pyodbc and the connection pool (default)
+    sqlite     an embedded SQLite file in WAL mode (app.utils.sqlite_storage), for
+               edge kiosks, local runs, tests and hermetic benchmarks
+
+Queries that are portable (metadata loads, receipts, rollup reads) are shared;
+a backend supplies its write path, schema setup, totals and rollup rebuild,
+plus a dialect (app.utils.sql_dialects) for the few fragments that differ.
+"""
+import logging
+import threading
+
+import pyodbc
+
+from app.config import Config
+from app.utils import db_metrics, migrations, rollups, submissions
+from app.utils.db_utils import get_db_connection, get_pool, pooled_connection, close_pools
+from app.utils.sql_dialects import SQL_SERVER
+
+logger = logging.getLogger(__name__)
+
+
+class Storage:
+    """Base class: operations shared by every backend, built on the backend's primitives."""
+
+    name = None
+    dialect = None
+    # Exceptions meaning the submission refers to a survey or question that does not exist
+    integrity_errors = ()
+    # Exceptions caused by the submission itself, which retrying will never fix
+    rejected_errors = ()
+
+    def connection(self):
+        """Context manager lending a connection; uncommitted work is rolled back when it is returned."""
+        raise NotImplementedError
+
+    def initialize(self):
+        """Create the database if needed and apply pending migrations; returns the migrations applied."""
+        raise NotImplementedError
+
+    def warm(self):
+        """Open idle connections ahead of the first request."""
+
+    def close(self):
+        """Close every connection held by this backend."""
+
+    def write_survey_response(self, cursor, answers, survey_id, submitted_at=None, receipt_id=None, rollups=None):
+        """Write a response, its answers, receipt and rollups without committing; returns the response_id."""
+        raise NotImplementedError
+
+    def write_survey_responses(self, cursor, items, survey_id, rollups_for=None):
+        """Write many submissions.BatchItems without committing; returns their response_ids in order."""
+        return [
+            self.write_survey_response(cursor, item.answers, survey_id, submitted_at=item.submitted_at,
+                                       receipt_id=item.receipt_id,
+                                       rollups=rollups_for(item.answers) if rollups_for else None)
+            for item in items
+        ]
+
+    def load_totals(self, conn):
+        """Return the db_metrics.DatabaseTotals."""
+        raise NotImplementedError
+
+    def rebuild_rollups(self, conn, since=None):
+        """Recompute answer_rollups from the answers table; returns the number of rows written."""
+        raise NotImplementedError
+
+    def insert_survey_response(self, conn, answers, survey_id, rollups=None):
+        return submissions.insert_survey_response(conn, answers, survey_id, rollups,
+                                                  write=self.write_survey_response)
+
+    def insert_spooled_responses(self, conn, items, survey_id, rollups_for=None):
+        return submissions.insert_spooled_responses(conn, items, survey_id, rollups_for,
+                                                    write=self.write_survey_response)
+
+    def insert_response_batch(self, conn, items, survey_id, rollups_for=None):
+        return submissions.insert_response_batch(conn, items, survey_id, rollups_for,
+                                                 write_many=self.write_survey_responses)
+
+
+class SqlServerStorage(Storage):
+    """SQL Server through pyodbc, using the process-wide pool for database_name."""
+
+    name = 'sqlserver'
+    dialect = SQL_SERVER
+    integrity_errors = (pyodbc.IntegrityError,)
+    rejected_errors = (pyodbc.IntegrityError, pyodbc.DataError)
+
+    def __init__(self, database_name):
+        self.database_name = database_name
+
+    def connection(self):
+        return pooled_connection(self.database_name)
+
+    def initialize(self):
+        # Get connection for DDL operations
+        conn = get_db_connection(database_name=None)
+        conn.autocommit = True
+        cursor = conn.cursor()
+
+        # Check if database exists
+        cursor.execute("SELECT name FROM sys.databases WHERE name = ?", (self.database_name,))
+        if not cursor.fetchone():
+            cursor.execute(f"CREATE DATABASE [{self.database_name}]")
+            logger.info(f"Created database: {self.database_name}")
+        cursor.close()
+        conn.close()
+
+        # Now bring the schema up to date (a single version query when it already is)
+        conn = get_db_connection(database_name=self.database_name)
+        try:
+            return migrations.migrate(conn)
+        finally:
+            conn.close()
+
+    def warm(self):
+        get_pool(self.database_name).warm()
+
+    def close(self):
+        close_pools()
+
+    def write_survey_response(self, cursor, answers, survey_id, submitted_at=None, receipt_id=None, rollups=None):
+        return submissions.write_survey_response(cursor, answers, survey_id, submitted_at, receipt_id, rollups)
+
+    def write_survey_responses(self, cursor, items, survey_id, rollups_for=None):
+        return submissions.write_survey_responses(cursor, items, survey_id, rollups_for)
+
+    def load_totals(self, conn):
+        return db_metrics.load_totals(conn)
+
+    def rebuild_rollups(self, conn, since=None):
+        return rollups.rebuild_rollups(conn, since)
+
+
+def create_storage(backend=None):
+    """Build the backend named by backend (default Config.STORAGE_BACKEND)."""
+    backend = backend or Config.STORAGE_BACKEND
+    if backend == 'sqlserver':
+        return SqlServerStorage(Config.DB_NAME)
+    if backend == 'sqlite':
+        from app.utils.sqlite_storage import SqliteStorage
+        return SqliteStorage(Config.SQLITE_PATH)
+    raise ValueError(f"Unknown storage backend {backend!r}")
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Return the process-wide storage backend, creating it on first use."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = create_storage()
+        return _storage
@@ -0,0 +1,242 @@
+import logging
+
+from app.utils.rollups import rollup_batch_merge_sql, rollup_merge_sql, rollup_params
+
+logger = logging.getLogger(__name__)
+
+# Each inline answer uses two parameters; this keeps a batch well under
+# SQL Server's 2100 parameter limit. Larger submissions use fast_executemany.
+MAX_INLINE_ANSWERS = 500
+MAX_INLINE_ROLLUPS = 300
+# Bulk uploads: a table value constructor takes at most 1000 rows (two
+# parameters per response, 2001 in all), and each rollup row uses four parameters
+MAX_BULK_RESPONSES = 1000
+MAX_BULK_ROLLUPS = 500
+
+
+class BatchItem:
+    """One response of a bulk upload, with its client-side timestamp and optional receipt."""
+    __slots__ = ('answers', 'submitted_at', 'receipt_id')
+
+    def __init__(self, answers, submitted_at=None, receipt_id=None):
+        self.answers = answers
+        self.submitted_at = submitted_at
+        self.receipt_id = receipt_id
+
+
+def _answer_rows(answers):
+    return [(answer['question_id'], answer['answer_value']) for answer in answers]
+
+
+def has_unanswered(answers):
+    """responses.has_unanswered for a submission: the failures total counts these responses."""
+    return any(answer['answer_value'] is None for answer in answers)
+
+
+def _response_insert(survey_id, submitted_at, unanswered, into_ids):
+    """INSERT for the response row (optionally with a client-side timestamp) and its parameters."""
+    columns = "survey_id, has_unanswered, submitted_at" if submitted_at is not None else "survey_id, has_unanswered"
+    values = "?, ?, ?" if submitted_at is not None else "?, ?"
+    output = "OUTPUT INSERTED.response_id INTO @ids" if into_ids else "OUTPUT INSERTED.response_id"
+    params = [survey_id, unanswered, submitted_at] if submitted_at is not None else [survey_id, unanswered]
+    return f"""
+    INSERT INTO responses ({columns})
+    {output}
+    VALUES ({values});
+""", params  # nosec B608 # constant columns and OUTPUT clause
+
+
+def _inline_batch(survey_id, rows, submitted_at=None, receipt_id=None, rollups=None):
+    """Build one T-SQL batch that inserts the response, its answers, rollups and receipt."""
+    unanswered = any(answer_value is None for _, answer_value in rows)
+    insert_sql, params = _response_insert(survey_id, submitted_at, unanswered, into_ids=True)
+    sql = """
+    SET NOCOUNT ON;
+    DECLARE @ids TABLE (response_id INT);
+""" + insert_sql
+    if rows:
+        sql += f"""
+    INSERT INTO answers (response_id, question_id, answer_value)
+    SELECT i.response_id, v.question_id, v.answer_value
+    FROM @ids i CROSS JOIN (VALUES {", ".join(["(?, ?)"] * len(rows))}) AS v(question_id, answer_value);
+"""  # nosec B608 # ? placeholder rows only
+        for question_id, answer_value in rows:
+            params.extend((question_id, answer_value))
+    if receipt_id is not None:
+        sql += """
+    INSERT INTO ingest_receipts (receipt_id, response_id) SELECT ?, response_id FROM @ids;
+"""
+        params.append(receipt_id)
+    if rollups:
+        sql += """
+    DECLARE @response_id INT = (SELECT response_id FROM @ids);
+""" + rollup_merge_sql(len(rollups))  # nosec B608 # rollup_merge_sql builds ? placeholders only
+        params.extend(rollup_params(rollups))
+    sql += """
+    SELECT response_id FROM @ids;
+"""
+    return sql, params
+
+
+def write_survey_response(cursor, answers, survey_id, submitted_at=None, receipt_id=None, rollups=None):
+    """
+    Write a response, its answers and its rollup increments on an open cursor
+    without committing. rollups are (question_id, option_value, count) rows
+    from app.utils.rollups.rollup_rows. Returns the new response_id.
+    """
+    rows = _answer_rows(answers)
+
+    if len(rows) <= MAX_INLINE_ANSWERS and len(rollups or ()) <= MAX_INLINE_ROLLUPS:
+        sql, params = _inline_batch(survey_id, rows, submitted_at, receipt_id, rollups)
+        cursor.execute(sql, params)
+        return int(cursor.fetchone()[0])
+
+    sql, params = _response_insert(survey_id, submitted_at, has_unanswered(answers), into_ids=False)
+    cursor.execute(sql, params)
+    response_id = int(cursor.fetchone()[0])
+    cursor.fast_executemany = True
+    cursor.executemany("""
+        INSERT INTO answers (response_id, question_id, answer_value)
+        VALUES (?, ?, ?)
+    """, [(response_id, question_id, answer_value) for question_id, answer_value in rows])
+    if receipt_id is not None:
+        cursor.execute("INSERT INTO ingest_receipts (receipt_id, response_id) VALUES (?, ?)", (receipt_id, response_id))
+    for start in range(0, len(rollups or ()), MAX_INLINE_ROLLUPS):
+        chunk = rollups[start:start + MAX_INLINE_ROLLUPS]
+        cursor.execute("DECLARE @response_id INT = ?;" + rollup_merge_sql(len(chunk)),
+                       [response_id] + rollup_params(chunk))
+    return response_id
+
+
+def insert_survey_response(conn, answers, survey_id, rollups=None, write=write_survey_response):
+    """
+    Insert a response, all of its answers and its rollups in a single transaction.
+
+    Typical submissions are sent as one batch (one round trip plus the commit).
+    write is the backend's write_survey_response (see app.utils.storage).
+    Returns the new response_id.
+    """
+    response_id = write(conn.cursor(), answers, survey_id, rollups=rollups)
+    conn.commit()
+    return response_id
+
+
+def insert_spooled_responses(conn, items, survey_id, rollups_for=None, write=write_survey_response):
+    """
+    Group-commit a batch of spooled submissions in one transaction.
+    rollups_for(answers), if given, returns the rollup rows for a submission.
+
+    Receipts that are already in ingest_receipts (written before a crash, but
+    never removed from the spool) are skipped, so replays never duplicate rows.
+    Returns a dict of receipt_id -> response_id for the rows written now.
+    """
+    cursor = conn.cursor()
+    receipt_ids = [item.receipt_id for item in items]
+    marks = ', '.join(['?'] * len(receipt_ids))
+    cursor.execute(
+        f"SELECT receipt_id FROM ingest_receipts WHERE receipt_id IN ({marks})",  # nosec B608 # ? placeholders only
+        receipt_ids
+    )
+    already_stored = {row[0] for row in cursor.fetchall()}
+
+    written = {}
+    for item in items:
+        if item.receipt_id in already_stored:
+            logger.info(f"Skipping spooled submission {item.receipt_id}: already stored")
+            continue
+        response_id = write(
+            cursor, item.answers, survey_id,
+            submitted_at=item.submitted_at, receipt_id=item.receipt_id,
+            rollups=rollups_for(item.answers) if rollups_for else None
+        )
+        written[item.receipt_id] = response_id
+
+    conn.commit()
+    return written
+
+
+def _bulk_response_insert(row_count):
+    """
+    Insert row_count responses in one statement. MERGE (unlike INSERT) can
+    OUTPUT a source column, so each new response_id comes back with the index
+    of its row; responses without a timestamp get the server time.
+    """
+    return f"""
+    SET NOCOUNT ON;
+    MERGE responses AS t
+    USING (VALUES {", ".join(f"({i}, ?, ?)" for i in range(row_count))}) AS s(row_index, submitted_at, has_unanswered)
+    ON 1 = 0
+    WHEN NOT MATCHED THEN INSERT (survey_id, submitted_at, has_unanswered)
+        VALUES (?, COALESCE(s.submitted_at, GETDATE()), s.has_unanswered)
+    OUTPUT s.row_index, INSERTED.response_id;
+"""
+
+
+def write_survey_responses(cursor, items, survey_id, rollups_for=None):
+    """
+    Write many responses (BatchItems) without committing: one statement per
+    1000 responses, then every answer and receipt through fast_executemany and
+    the rollups summed into a few MERGEs. Returns the response_ids in item order.
+    """
+    response_ids = []
+    for start in range(0, len(items), MAX_BULK_RESPONSES):
+        chunk = items[start:start + MAX_BULK_RESPONSES]
+        params = [value for item in chunk for value in (item.submitted_at, has_unanswered(item.answers))]
+        cursor.execute(_bulk_response_insert(len(chunk)), params + [survey_id])
+        # OUTPUT rows come back in no particular order
+        response_ids.extend(int(response_id) for _, response_id in sorted(cursor.fetchall()))
+
+    cursor.fast_executemany = True
+    answer_rows = [
+        (response_id, answer['question_id'], answer['answer_value'])
+        for response_id, item in zip(response_ids, items) for answer in item.answers
+    ]
+    if answer_rows:
+        cursor.executemany("""
+            INSERT INTO answers (response_id, question_id, answer_value)
+            VALUES (?, ?, ?)
+        """, answer_rows)
+    receipt_rows = [(item.receipt_id, response_id) for response_id, item in zip(response_ids, items) if item.receipt_id]
+    if receipt_rows:
+        cursor.executemany("INSERT INTO ingest_receipts (receipt_id, response_id) VALUES (?, ?)", receipt_rows)
+
+    if rollups_for:
+        rollup_rows = [
+            (response_id, question_id, option_value, count)
+            for response_id, item in zip(response_ids, items)
+            for question_id, option_value, count in rollups_for(item.answers)
+        ]
+        for start in range(0, len(rollup_rows), MAX_BULK_ROLLUPS):
+            chunk = rollup_rows[start:start + MAX_BULK_ROLLUPS]
+            cursor.execute(rollup_batch_merge_sql(len(chunk)), [value for row in chunk for value in row])
+    return response_ids
+
+
+def insert_response_batch(conn, items, survey_id, rollups_for=None, write_many=write_survey_responses):
+    """
+    Insert a bulk upload (a list of BatchItems) in a single transaction.
+
+    Items whose receipt_id is already in ingest_receipts (a batch replayed
+    after a lost reply) are not written again. write_many is the backend's
+    write_survey_responses (see app.utils.storage). Returns one
+    (response_id, created) pair per item, in order.
+    """
+    cursor = conn.cursor()
+    receipt_ids = [item.receipt_id for item in items if item.receipt_id]
+    already_stored = {}
+    for start in range(0, len(receipt_ids), MAX_BULK_RESPONSES):
+        chunk = receipt_ids[start:start + MAX_BULK_RESPONSES]
+        marks = ', '.join(['?'] * len(chunk))  # ? placeholders only
+        cursor.execute(
+            f"SELECT receipt_id, response_id FROM ingest_receipts WHERE receipt_id IN ({marks})",  # nosec B608
+            chunk
+        )
+        already_stored.update((receipt_id, response_id) for receipt_id, response_id in cursor.fetchall())
+
+    new_items = [item for item in items if item.receipt_id not in already_stored]
+    new_ids = iter(write_many(cursor, new_items, survey_id, rollups_for) if new_items else ())
+    conn.commit()
+    return [
+        (already_stored[item.receipt_id], False) if item.receipt_id in already_stored else (next(new_ids), True)
+        for item in items
+    ]
@@ -0,0 +1,88 @@
+"""
+Process resource metrics, sampled on a background thread.
+
+A SystemMetricsSampler per process refreshes the gauges every interval seconds
+with one reused psutil.Process handle, so serving requests never calls psutil.
+Under gunicorn each worker samples itself and the multiprocess registry
+combines them as declared by multiprocess_mode.
+"""
+import gc
+import logging
+import threading
+import time
+
+import psutil
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+system_cpu_usage = Gauge('app_cpu_usage_percent', 'Application CPU usage percentage', multiprocess_mode='livesum')
+system_memory_usage = Gauge('app_memory_usage_bytes', 'Application memory usage in bytes', multiprocess_mode='livesum')
+system_memory_growth = Gauge('app_memory_growth_bytes', 'Resident memory gained since the process started sampling',
+                             multiprocess_mode='livesum')
+system_uptime = Gauge('app_uptime_seconds', 'Application uptime in seconds', multiprocess_mode='livemax')
+system_threads = Gauge('app_threads', 'Threads running in the application', multiprocess_mode='livesum')
+system_open_fds = Gauge('app_open_fds', 'File descriptors open in the application', multiprocess_mode='livesum')
+gc_collections = Counter('app_gc_collections_total', 'Garbage collector runs', ['generation'])
+gc_collected = Counter('app_gc_collected_objects_total', 'Objects freed by the garbage collector', ['generation'])
+
+
+class SystemMetricsSampler(threading.Thread):
+    """Daemon thread that samples this process every interval seconds until stopped."""
+
+    def __init__(self, interval=15.0, start_time=None):
+        super().__init__(name='system-metrics', daemon=True)
+        self.interval = interval
+        self.start_time = start_time if start_time is not None else time.time()
+        self._process = psutil.Process()
+        self._process.cpu_percent(None)  # Primes the counter; later calls measure since the previous one
+        self._baseline_rss = None
+        self._gc_seen = [(s['collections'], s['collected']) for s in gc.get_stats()]
+        self._stopping = threading.Event()
+        self.last_sample = {}
+
+    def sample(self):
+        """Refresh every gauge once and return the values"""
+        with self._process.oneshot():
+            cpu = self._process.cpu_percent(None)
+            rss = self._process.memory_info().rss
+            threads = self._process.num_threads()
+            fds = self._process.num_fds() if hasattr(self._process, 'num_fds') else self._process.num_handles()
+        if self._baseline_rss is None:
+            self._baseline_rss = rss
+        uptime = time.time() - self.start_time
+
+        system_cpu_usage.set(cpu)
+        system_memory_usage.set(rss)
+        system_memory_growth.set(rss - self._baseline_rss)
+        system_uptime.set(uptime)
+        system_threads.set(threads)
+        system_open_fds.set(fds)
+
+        for generation, stats in enumerate(gc.get_stats()):
+            runs, freed = self._gc_seen[generation]
+            gc_collections.labels(generation=str(generation)).inc(stats['collections'] - runs)
+            gc_collected.labels(generation=str(generation)).inc(stats['collected'] - freed)
+            self._gc_seen[generation] = (stats['collections'], stats['collected'])
+
+        self.last_sample = {
+            'cpu_percent': cpu,
+            'memory_bytes': rss,
+            'memory_growth_bytes': rss - self._baseline_rss,
+            'uptime_seconds': uptime,
+            'threads': threads,
+            'open_fds': fds,
+        }
+        return self.last_sample
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"System metrics sample failed: {e}")
+            self._stopping.wait(self.interval)
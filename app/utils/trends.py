@@ -0,0 +1,287 @@
+"""
+Response volume and satisfaction trends per site, by day, week or month.
+
+Buckets are computed in SQL from a half-open range on responses.submitted_at
+(an index range scan), grouped by bucket and site. The site and the
+satisfaction score are the answers to the questions named by
+Config.TREND_SITE_QUESTION and Config.TREND_RATING_QUESTION. Times are UTC,
+like submitted_at.
+
+A bucket is closed once it ended more than settle ago. Its result can no
+longer change (short of a late upload, which invalidates it), so TrendCache
+keeps it for good and a request only queries the buckets that are still open.
+Late uploads are found by any process: each cache remembers the highest
+response_id it has seen and, per request, looks up the few responses stored
+since then for any submitted before the settle cutoff.
+Buckets reaching back past the archive horizon add up the archived responses
+too; the cache is emptied whenever the archive changes.
+"""
+import logging
+import math
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+
+from app.utils.sql_dialects import SQL_SERVER
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('day', 'week', 'month')
+# Buckets returned when no ?from= is given
+DEFAULT_BUCKETS = {'day': 30, 'week': 12, 'month': 12}
+MAX_BUCKETS = 400
+
+
+def floor_bucket(day, granularity):
+    """First day of the bucket containing day."""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity {granularity!r}")
+
+
+def next_bucket(start, granularity):
+    """First day of the bucket after the one starting at start."""
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def bucket_range(first, last, granularity):
+    """Start days of every bucket from the one containing first to the one containing last."""
+    start = floor_bucket(first, granularity)
+    starts = []
+    while start <= last:
+        starts.append(start)
+        if len(starts) > MAX_BUCKETS:
+            raise ValueError(f"At most {MAX_BUCKETS} buckets per request")
+        start = next_bucket(start, granularity)
+    return starts
+
+
+def default_first_day(last, granularity):
+    start = floor_bucket(last, granularity)
+    for _ in range(DEFAULT_BUCKETS[granularity] - 1):
+        start = floor_bucket(start - timedelta(days=1), granularity)
+    return start
+
+
+def find_question(survey, question_text):
+    """The survey's question with this text, or None."""
+    return next((q for q in survey.questions if q.question_text == question_text), None)
+
+
+def fetch_trend_rows(cursor, survey_id, site_question_id, rating_question_id, granularity, start, end,
+                     site=None, dialect=SQL_SERVER):
+    """
+    Return (bucket_start, site, responses, rating_total, rated) rows for
+    responses submitted in [start, end). site, if given, keeps only that site.
+    """
+    bucket = dialect.bucket_start('r.submitted_at', granularity)
+    joins, params = [], []
+    if site_question_id is not None:
+        # Filtering on the site makes the join an inner one
+        join = "JOIN" if site is not None else "LEFT JOIN"
+        joins.append(f"{join} answers s ON s.response_id = r.response_id AND s.question_id = ?"
+                     + (" AND s.answer_value = ?" if site is not None else ""))
+        params.append(site_question_id)
+        if site is not None:
+            params.append(site)
+        site_column, group_by = "s.answer_value", f"{bucket}, s.answer_value"
+    else:
+        site_column, group_by = "NULL", bucket
+    if rating_question_id is not None:
+        joins.append("LEFT JOIN answers v ON v.response_id = r.response_id AND v.question_id = ?")
+        params.append(rating_question_id)
+        rating = dialect.to_number('v.answer_value')
+    else:
+        rating = "NULL"
+    params.extend((survey_id, start, end))
+
+    cursor.execute(f"""
+        SELECT {bucket}, {site_column}, COUNT(*), SUM({rating}), COUNT({rating})
+        FROM responses r
+        {' '.join(joins)}
+        WHERE r.survey_id = ? AND r.submitted_at >= ? AND r.submitted_at < ?
+        GROUP BY {group_by}
+    """, params)  # nosec B608 # dialect expressions, constant joins and ? filters
+    return [
+        (bucket_day if isinstance(bucket_day, date) else date.fromisoformat(bucket_day),
+         site_value, responses, rating_total or 0, rated)
+        for bucket_day, site_value, responses, rating_total, rated in cursor.fetchall()
+    ]
+
+
+def _number(value):
+    """An answer as a float, None when it is not numeric (like the dialects' to_number)."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def archived_trend_rows(archive, survey_id, site_question_id, rating_question_id, granularity, start, end,
+                        site=None):
+    """fetch_trend_rows() over the archived responses submitted in [start, end)."""
+    totals = {}
+    for _, submitted_at, answers in archive.iter_responses(survey_id, date_from=start, date_to=end,
+                                                           include_pending=False):
+        answers = dict(answers)
+        site_value = answers.get(site_question_id) if site_question_id is not None else None
+        if site is not None and site_value != site:
+            continue
+        rating = _number(answers.get(rating_question_id)) if rating_question_id is not None else None
+        row = totals.setdefault((floor_bucket(submitted_at.date(), granularity), site_value), [0, 0, 0])
+        row[0] += 1
+        if rating is not None:
+            row[1] += rating
+            row[2] += 1
+    return [(bucket, site_value, *row) for (bucket, site_value), row in totals.items()]
+
+
+def combine_rows(*row_sets):
+    """Sum (bucket_start, site, responses, rating_total, rated) rows sharing a bucket and site."""
+    totals = {}
+    for rows in row_sets:
+        for bucket, site_value, responses, rating_total, rated in rows:
+            row = totals.setdefault((bucket, site_value), [0, 0, 0])
+            row[0] += responses
+            row[1] += rating_total
+            row[2] += rated
+    return [(bucket, site_value, *row) for (bucket, site_value), row in totals.items()]
+
+
+class TrendCache:
+    """Rows of closed buckets, by (survey_id, granularity, site filter, bucket start)."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._archive_generation = None
+        self._seen_response_id = None
+
+    def check_archive(self, generation):
+        """Forget every bucket when the archive changed, since its rows moved between tiers."""
+        with self._lock:
+            if generation != self._archive_generation:
+                self._buckets.clear()
+                self._archive_generation = generation
+
+    def check_late_uploads(self, cursor, settled):
+        """
+        Drop buckets holding responses that any process stored since the last
+        check with submitted_at before settled (spool backlogs, kiosk batches).
+        Both lookups seek the responses primary key from the last response_id seen.
+        """
+        with self._lock:
+            seen = self._seen_response_id
+        cursor.execute("SELECT MAX(response_id) FROM responses")
+        latest = cursor.fetchone()[0] or 0
+        if seen is not None and latest > seen:
+            cursor.execute(
+                "SELECT submitted_at FROM responses WHERE response_id > ? AND response_id <= ? AND submitted_at < ?",
+                (seen, latest, settled)
+            )
+            self.invalidate({row[0].date() for row in cursor.fetchall()})
+        with self._lock:
+            self._seen_response_id = max(latest, self._seen_response_id or 0)
+
+    def get(self, key):
+        return self._buckets.get(key)
+
+    def put(self, key, rows):
+        with self._lock:
+            self._buckets[key] = rows
+
+    def invalidate(self, days):
+        """Drop cached buckets containing any of days (late uploads landing in closed buckets)."""
+        days = set(days)
+        if not days:
+            return
+        with self._lock:
+            stale = [key for key in self._buckets
+                     if any(key[3] <= day < next_bucket(key[3], key[1]) for day in days)]
+            for key in stale:
+                del self._buckets[key]
+        if stale:
+            logger.info(f"Invalidated {len(stale)} cached trend buckets after a late upload")
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def _summary(rows):
+    responses = sum(row[2] for row in rows)
+    rating_total = sum(row[3] for row in rows)
+    rated = sum(row[4] for row in rows)
+    return {
+        'responses': responses,
+        'satisfaction': round(rating_total / rated, 2) if rated else None,
+        'rated': rated,
+    }
+
+
+def load_trend(connect, survey, site_question_id, rating_question_id, granularity, first, last, site=None,
+               cache=None, now=None, settle=timedelta(hours=48), dialect=SQL_SERVER, archive=None):
+    """
+    Return one dict per bucket from the one containing first to the one
+    containing last, with totals and a per-site breakdown. Closed buckets come
+    from cache when present; the rest are read in a single range query, plus
+    the archive (app.utils.archive) where the range reaches into it.
+    """
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    if cache is not None and archive is not None:
+        cache.check_archive(archive.refresh())
+    starts = bucket_range(first, last, granularity)
+    rows_by_bucket, closed, missing = {}, {}, []
+    with connect() as conn:
+        cursor = conn.cursor()
+        if cache is not None:
+            cache.check_late_uploads(cursor, now - settle)
+        for start in starts:
+            closed[start] = datetime.combine(next_bucket(start, granularity), time()) + settle <= now
+            cached = None
+            if cache is not None and closed[start]:
+                cached = cache.get((survey.survey_id, granularity, site, start))
+            if cached is None:
+                missing.append(start)
+            else:
+                rows_by_bucket[start] = cached
+
+        if missing:
+            # One range covering every bucket still needed, normally just the newest few
+            query_start = datetime.combine(missing[0], time())
+            query_end = datetime.combine(next_bucket(missing[-1], granularity), time())
+            rows = fetch_trend_rows(cursor, survey.survey_id, site_question_id, rating_question_id,
+                                    granularity, query_start, query_end, site, dialect)
+
+    if missing:
+        if archive is not None and archive.overlaps(survey.survey_id, date_from=query_start, date_to=query_end,
+                                                    include_pending=False):
+            rows = combine_rows(rows, archived_trend_rows(archive, survey.survey_id, site_question_id,
+                                                          rating_question_id, granularity, query_start,
+                                                          query_end, site))
+        fetched = {start: [] for start in missing}
+        for row in rows:
+            if row[0] in fetched:
+                fetched[row[0]].append(row)
+        for start, bucket_rows in fetched.items():
+            rows_by_bucket[start] = bucket_rows
+            if cache is not None and closed[start]:
+                cache.put((survey.survey_id, granularity, site, start), bucket_rows)
+
+    buckets = []
+    for start in starts:
+        rows = rows_by_bucket[start]
+        bucket = {'start': start.isoformat(), 'end': next_bucket(start, granularity).isoformat(),
+                  'closed': closed[start], **_summary(rows)}
+        bucket['sites'] = [
+            {'site': row[1], **_summary([row])} for row in sorted(rows, key=lambda row: (row[1] is None, row[1] or ''))
+        ]
+        buckets.append(bucket)
+    return buckets
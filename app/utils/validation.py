@@ -0,0 +1,85 @@
+"""
+Validation of submitted answers against the cached question definitions.
+
+Every SurveyDefinition compiles a SubmissionValidator from its questions when
+it is loaded, so checking a submission is a handful of dict and set lookups
+in memory: a bad payload is rejected before a connection is borrowed or a
+transaction begun. Errors are reported per field:
+
+    {"field": "answers[1].answer_value", "question_id": 5, "code": "invalid_option",
+     "message": "Must be one of: Yes, No, Partially"}
+"""
+
+# Error codes
+MALFORMED = 'malformed'
+UNKNOWN_QUESTION = 'unknown_question'
+INVALID_TYPE = 'invalid_type'
+INVALID_OPTION = 'invalid_option'
+REQUIRED = 'required'
+DUPLICATE = 'duplicate'
+
+
+def field_error(field, code, message, question_id=None):
+    return {'field': field, 'question_id': question_id, 'code': code, 'message': message}
+
+
+class SubmissionValidator:
+    """
+    Checks a submission's answers against one question set: every question id
+    must exist and be answered at most once, values must be strings (or null
+    for a skipped optional question), multiple-choice values must be one of the
+    question's options, and every required question needs a non-blank answer.
+    A question id sent as a numeric string ("5") is accepted and replaced by
+    the integer in the answer. Each question gets at most one error.
+    """
+
+    def __init__(self, questions):
+        # question_id -> allowed values, or None for free text
+        self._options = {
+            q.question_id: frozenset(q.options) if q.question_type == 'multiple_choice' and q.options else None
+            for q in questions
+        }
+        self._option_lists = {q.question_id: ', '.join(q.options) for q in questions if q.options}
+        self._required = tuple(q.question_id for q in questions if q.is_required)
+
+    def validate(self, answers):
+        """Return a list of field errors for a list of answers; empty when the answers are valid."""
+        errors = []
+        seen, answered, invalid = set(), set(), set()
+        for index, answer in enumerate(answers):
+            field = f"answers[{index}]"
+            if not isinstance(answer, dict) or 'question_id' not in answer or 'answer_value' not in answer:
+                errors.append(field_error(field, MALFORMED, 'Each answer must have question_id and answer_value'))
+                continue
+            question_id, value = answer['question_id'], answer['answer_value']
+            if isinstance(question_id, str) and question_id.isascii() and question_id.isdigit():
+                question_id = answer['question_id'] = int(question_id)
+            if not isinstance(question_id, int) or isinstance(question_id, bool) or question_id not in self._options:
+                errors.append(field_error(f"{field}.question_id", UNKNOWN_QUESTION,
+                                          f"Unknown question_id {question_id!r}"))
+                continue
+            if question_id in seen:
+                # Stored twice it would be counted twice by rollups, trends and search
+                errors.append(field_error(f"{field}.question_id", DUPLICATE,
+                                          f"question_id {question_id} is answered more than once", question_id))
+                continue
+            seen.add(question_id)
+            if value is None:
+                continue  # Skipped; stored as NULL and flagged by responses.has_unanswered
+            if not isinstance(value, str):
+                errors.append(field_error(f"{field}.answer_value", INVALID_TYPE, 'Must be a string', question_id))
+                invalid.add(question_id)
+                continue
+            options = self._options[question_id]
+            if options is not None and value not in options:
+                errors.append(field_error(f"{field}.answer_value", INVALID_OPTION,
+                                          f"Must be one of: {self._option_lists[question_id]}", question_id))
+                invalid.add(question_id)
+                continue
+            if value.strip():
+                answered.add(question_id)
+
+        for question_id in self._required:
+            if question_id not in answered and question_id not in invalid:
+                errors.append(field_error('answers', REQUIRED, 'An answer is required', question_id))
+        return errors
@@ -0,0 +1,126 @@
+"""
+Compare kiosk uploads through the bulk write path (POST /api/survey/batch) with
+replaying the same responses one POST /api/survey submission at a time.
+
+Each path is timed against a simulated SQL Server connection, which charges
+--latency-ms per round trip like bench_submission, and against a temporary
+SQLite database through the embedded backend.
+
+    python -m benchmarks.bench_batch --batch 50 200 500 --latency-ms 2
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.utils import submissions
+from app.utils.metadata_cache import MetadataCache
+from app.utils.rollups import rollup_rows
+from app.utils.sqlite_storage import SqliteStorage
+from app.utils.submissions import BatchItem
+from benchmarks.bench_endpoints import SUBMISSION
+from benchmarks.bench_submission import SimulatedConnection, SimulatedCursor
+
+
+class BulkSimulatedConnection(SimulatedConnection):
+    def cursor(self):
+        return BulkSimulatedCursor(self)
+
+
+class BulkSimulatedCursor(SimulatedCursor):
+    def execute(self, sql, params=()):
+        super().execute(sql, params)
+        # What the bulk response insert returns: (row index, response_id) per row
+        self._rows = [(i, self.conn._next_id * 1000 + i) for i in range(len(params) - 1)]
+
+    def fetchall(self):
+        return self._rows
+
+
+def build_items(count):
+    answers = json.loads(SUBMISSION)['answers']
+    start = datetime(2025, 1, 1, 8)
+    return [BatchItem(answers, start + timedelta(minutes=i)) for i in range(count)]
+
+
+def run_path(upload, items):
+    """Upload items; returns responses/s, elapsed ms and round trips per response (if counted)."""
+    start = time.perf_counter()
+    round_trips = upload(items)
+    elapsed = time.perf_counter() - start
+    return {
+        'responses_per_second': len(items) / elapsed,
+        'elapsed_ms': elapsed * 1000,
+        'round_trips_per_response': round_trips / len(items) if round_trips else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch', type=int, nargs='+', default=[50, 200, 500], help='responses per upload')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated round-trip latency')
+    parser.add_argument('--json', action='store_true', help='also print the results as JSON')
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix='bench-batch-')
+    sqlite = SqliteStorage(os.path.join(tmpdir, 'survey.db'))
+    sqlite.initialize()
+    survey = MetadataCache(sqlite.connection).get_survey()
+
+    def rollups_for(answers):
+        return rollup_rows(survey, answers)
+
+    def simulated(path):
+        def upload(items):
+            conn = BulkSimulatedConnection(args.latency_ms / 1000)
+            path(conn, items)
+            return conn.round_trips
+        return upload
+
+    def simulated_single(conn, items):
+        for item in items:
+            submissions.insert_survey_response(conn, item.answers, survey.survey_id, rollups_for(item.answers))
+
+    def simulated_batch(conn, items):
+        submissions.insert_response_batch(conn, items, survey.survey_id, rollups_for)
+
+    def sqlite_single(items):
+        for item in items:
+            with sqlite.connection() as conn:
+                sqlite.insert_survey_response(conn, item.answers, survey.survey_id, rollups_for(item.answers))
+
+    def sqlite_batch(items):
+        with sqlite.connection() as conn:
+            sqlite.insert_response_batch(conn, items, survey.survey_id, rollups_for)
+
+    paths = [
+        ('sqlserver', 'single', simulated(simulated_single)),
+        ('sqlserver', 'batch', simulated(simulated_batch)),
+        ('sqlite', 'single', sqlite_single),
+        ('sqlite', 'batch', sqlite_batch),
+    ]
+    results = []
+    try:
+        for count in args.batch:
+            items = build_items(count)
+            for backend, name, upload in paths:
+                result = run_path(upload, items)
+                result.update({'backend': backend, 'path': name, 'responses': count})
+                results.append(result)
+                round_trips = result['round_trips_per_response']
+                print(f"{backend:9} {name:6} responses={count:4} {result['responses_per_second']:9.0f}/s "
+                      f"elapsed={result['elapsed_ms']:8.1f}ms"
+                      + (f" round_trips/response={round_trips:.2f}" if round_trips else ""))
+    finally:
+        sqlite.close()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
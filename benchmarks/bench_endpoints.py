@@ -0,0 +1,340 @@
+"""
+Load-test every API endpoint against a stand-in database and guard against regressions.
+
+The server runs in a child process under gunicorn (gthread, like production)
+with the connection pool pointed at benchmarks.standin_db, seeded with
+--responses synthetic responses and --latency-ms of injected round-trip time.
+Each scenario is driven by --clients keep-alive clients for --duration seconds;
+the report has requests/s, p50/p95/p99 latency, the server's peak RSS and the
+requests that failed or were shed with 503 by admission control.
+With --storage sqlite the same synthetic data is written to a temporary SQLite
+database and served by the embedded backend instead, real SQL end to end.
+
+    python -m benchmarks.bench_endpoints --responses 1000000 --latency-ms 2 --save-baseline baseline.json
+    python -m benchmarks.bench_endpoints --responses 1000000 --latency-ms 2 --baseline baseline.json
+    python -m benchmarks.bench_endpoints --storage sqlite --responses 100000
+
+With --baseline the run exits non-zero when any scenario's throughput drops, or
+its p95 latency or peak RSS grows, by more than --max-regression (default 15%).
+Any run also exits non-zero when more than --max-error-rate (default 0) of a
+scenario's requests fail or are shed, since those are left out of the figures.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+import psutil
+
+from benchmarks.bench_serving import free_port
+
+SCENARIOS = ['survey', 'questions', 'responses', 'metrics']
+SUBMISSION = json.dumps({'answers': [
+    {'question_id': 1, 'answer_value': '2025-01-01'},
+    {'question_id': 2, 'answer_value': 'Princess Alexandra Hospital'},
+    {'question_id': 3, 'answer_value': 'Benchmark Patient'},
+    {'question_id': 4, 'answer_value': 'Easy'},
+    {'question_id': 5, 'answer_value': 'Yes'},
+    {'question_id': 6, 'answer_value': 'Short wait and friendly staff'},
+    {'question_id': 7, 'answer_value': '5'},
+]})
+
+
+def serve(args):
+    """Child process: gunicorn serving app.main with the stand-in or SQLite database."""
+    os.environ.setdefault('DB_USER', 'benchmark')
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='bench-metrics-')
+    os.environ['WEB_THREADS'] = str(args.threads)  # Admission defaults are sized from it, as in production
+
+    import logging
+    from gunicorn.app.base import BaseApplication
+
+    from app.main import app
+    from app.config import Config
+    from app.utils import db_utils
+    from benchmarks.standin_db import StandInDatabase
+
+    logging.getLogger().setLevel(logging.WARNING)  # Per-request INFO lines would dominate the profile
+
+    database = StandInDatabase(responses=args.responses, latency=args.latency_ms / 1000)
+
+    def post_fork(server, worker):
+        if args.storage == 'sqlite':
+            return  # SQLITE_PATH was seeded by the parent
+        # Same pool and instrumentation as production, different driver
+        db_utils._pools[Config.DB_NAME] = db_utils.ConnectionPool(
+            Config.DB_NAME, connect=lambda database_name: db_utils.InstrumentedConnection(database.connect())
+        )
+
+    class StandInServer(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                'bind': f"127.0.0.1:{args.port}", 'workers': args.workers, 'threads': args.threads,
+                'worker_class': 'gthread', 'preload_app': True, 'post_fork': post_fork,
+                'accesslog': None, 'loglevel': 'warning',
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    StandInServer().run()
+
+
+class Scenario:
+    def __init__(self, name, responses):
+        self.name = name
+        self.responses = responses
+
+    def request(self, conn):
+        if self.name == 'survey':
+            conn.request('POST', '/api/survey', SUBMISSION, {'Content-Type': 'application/json'})
+            return 201
+        if self.name == 'questions':
+            conn.request('GET', '/api/questions')
+            return 200
+        if self.name == 'responses':
+            from app.utils.response_reader import encode_cursor
+            after = random.randint(0, max(self.responses - 100, 0))
+            conn.request('GET', f"/api/responses?limit=100&after={encode_cursor(after)}")
+            return 200
+        conn.request('GET', '/metrics')
+        return 200
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)] * 1000, 2)
+
+
+def drive(port, scenario, clients, duration):
+    latencies, errors, shed = [], [0], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                expected = scenario.request(conn)
+                response = conn.getresponse()
+                response.read()
+                if response.status == 503:
+                    with lock:
+                        shed[0] += 1  # Admission control turned it away; the connection stays usable
+                    continue
+                if response.status != expected:
+                    raise http.client.HTTPException(response.status)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'shed': shed[0],
+        'requests_per_second': round(len(latencies) / duration, 1),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+class PeakRss(threading.Thread):
+    """Samples the summed RSS of the server process tree."""
+
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                rss = sum(p.memory_info().rss for p in [self.process] + self.process.children(recursive=True))
+                self.peak = max(self.peak, rss)
+            except psutil.Error:
+                pass
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+
+def run_scenario(name, args):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_endpoints', '--serve', '--port', str(port),
+         '--responses', str(args.responses), '--latency-ms', str(args.latency_ms),
+         '--workers', str(args.workers), '--threads', str(args.threads), '--storage', args.storage],
+        stdout=subprocess.DEVNULL
+    )
+    rss = PeakRss(server.pid)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"Benchmark server exited with status {server.returncode}")
+            try:
+                socket_check = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+                socket_check.request('GET', '/metrics')
+                socket_check.getresponse().read()
+                socket_check.close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Benchmark server did not start within 30s")
+                time.sleep(0.1)
+        rss.start()
+        drive(port, Scenario(name, args.responses), args.clients, min(args.duration, 1.0))  # warm-up
+        result = drive(port, Scenario(name, args.responses), args.clients, args.duration)
+    finally:
+        rss.stop()
+        server.send_signal(signal.SIGTERM)
+        server.wait(30)
+    result.update({'scenario': name, 'peak_rss_mb': round(rss.peak / 2**20, 1)})
+    return result
+
+
+def seed_sqlite(path, responses):
+    """Write the stand-in's synthetic responses to a new SQLite database at path."""
+    from app.utils.sqlite_storage import SqliteStorage, open_database
+    from benchmarks.standin_db import QUESTIONS, FIRST_SUBMISSION, synthetic_answer
+
+    SqliteStorage(path).initialize()
+    conn = open_database(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO responses (response_id, survey_id, submitted_at) VALUES (?, 1, ?)",
+            ((i, FIRST_SUBMISSION + timedelta(minutes=i)) for i in range(1, responses + 1))
+        )
+        conn.executemany(
+            "INSERT INTO answers (response_id, question_id, answer_value) VALUES (?, ?, ?)",
+            ((i, q[0], synthetic_answer(i, q)) for i in range(1, responses + 1) for q in QUESTIONS)
+        )
+    conn.close()
+
+
+def find_failures(results, max_error_rate):
+    """Scenarios whose failed or shed requests exceed max_error_rate of those sent."""
+    failures = []
+    for result in results:
+        failed = result['errors'] + result.get('shed', 0)
+        sent = result['requests'] + failed
+        if failed and failed > sent * max_error_rate:
+            failures.append(f"{result['scenario']}: {result['errors']} errors and {result.get('shed', 0)} "
+                            f"shed of {sent} requests")
+    return failures
+
+
+def find_regressions(results, baseline, max_regression, max_error_rate=0.0):
+    """Compare against a saved baseline; returns human-readable regressions."""
+    previous = {r['scenario']: r for r in baseline['results']}
+    # Throughput and latency only count successful requests, so a failing run could otherwise pass
+    regressions = find_failures(results, max_error_rate)
+    for result in results:
+        old = previous.get(result['scenario'])
+        if not old:
+            continue
+        name = result['scenario']
+        if result['requests_per_second'] < old['requests_per_second'] * (1 - max_regression):
+            regressions.append(f"{name}: {result['requests_per_second']} req/s vs {old['requests_per_second']}")
+        for key in ('p95_ms', 'peak_rss_mb'):
+            if old.get(key) and result.get(key) and result[key] > old[key] * (1 + max_regression):
+                regressions.append(f"{name}: {key} {result[key]} vs {old[key]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every endpoint against a stand-in database")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--responses', type=int, default=100000, help='synthetic responses in the stand-in database')
+    parser.add_argument('--latency-ms', type=float, default=1.0, help='injected latency per database round trip')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--storage', choices=['standin', 'sqlite'], default='standin',
+                        help='serve from the in-memory stand-in or a seeded SQLite database')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the results as a JSON baseline')
+    parser.add_argument('--baseline', metavar='PATH', help='fail if results regress against this baseline')
+    parser.add_argument('--max-regression', type=float, default=0.15, help='allowed fractional regression')
+    parser.add_argument('--max-error-rate', type=float, default=0.0,
+                        help='allowed fraction of failed or shed requests per scenario')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        return serve(args)
+
+    if args.storage == 'sqlite':
+        # Inherited by the server processes
+        os.environ['STORAGE_BACKEND'] = 'sqlite'
+        os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench-sqlite-'), 'survey.db')
+        start = time.perf_counter()
+        seed_sqlite(os.environ['SQLITE_PATH'], args.responses)
+        print(f"Seeded {args.responses} responses into SQLite in {time.perf_counter() - start:.1f}s")
+
+    results = []
+    for name in args.scenarios:
+        result = run_scenario(name, args)
+        results.append(result)
+        print(f"{name:10} rps={result['requests_per_second']:8.1f} p50={result['p50_ms']}ms "
+              f"p95={result['p95_ms']}ms p99={result['p99_ms']}ms rss={result['peak_rss_mb']}MB "
+              f"errors={result['errors']} shed={result['shed']}")
+
+    report = {
+        'settings': {key: getattr(args, key) for key in
+                     ('storage', 'responses', 'latency_ms', 'workers', 'threads', 'clients', 'duration')},
+        'results': results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('settings') != report['settings']:
+            print(f"Warning: baseline settings differ: {baseline.get('settings')}")
+        regressions = find_regressions(results, baseline, args.max_regression, args.max_error_rate)
+    else:
+        regressions = find_failures(results, args.max_error_rate)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        raise SystemExit(1)
+    return report
+
+
+if __name__ == "__main__":
+    main()
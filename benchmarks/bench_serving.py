@@ -0,0 +1,140 @@
+"""
+Measure request throughput of the production server as the worker count grows.
+
+For each worker count the benchmark starts gunicorn (gunicorn.conf.py settings,
+MIGRATE_ON_START disabled) on a free local port, drives it with --clients
+keep-alive HTTP clients for --duration seconds, and reports requests/s and
+latency percentiles. The default path renders the survey page, which needs no
+database; point --path at a database-backed route to include SQL Server.
+The load generator shares the machine, so scaling flattens out as workers plus
+clients saturate the available cores.
+
+    python -m benchmarks.bench_serving --workers 1 2 4 --threads 4 --clients 32 --duration 10
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, threads, port):
+    env = dict(os.environ,
+               WEB_BIND=f"127.0.0.1:{port}",
+               WEB_WORKERS=str(workers),
+               WEB_THREADS=str(threads),
+               MIGRATE_ON_START='false',
+               PROMETHEUS_MULTIPROC_DIR=tempfile.mkdtemp(prefix='bench-metrics-'))
+    env.setdefault('DB_USER', 'benchmark')  # Config validation only; the default path never connects
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--access-logfile', os.devnull, 'app.main:app'],
+        env=env, stdout=subprocess.DEVNULL
+    )
+
+
+def wait_until_ready(server, port, path, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', path)
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not become ready within {timeout}s")
+
+
+def run_clients(port, path, clients, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        local = []
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    raise http.client.HTTPException(response.status)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_second': round(len(latencies) / duration, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark server throughput against the worker count")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker')
+    parser.add_argument('--clients', type=int, default=32, help='concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per worker count')
+    parser.add_argument('--path', default='/', help='request path to hit')
+    parser.add_argument('--json', action='store_true', help='also print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    for workers in args.workers:
+        port = free_port()
+        server = start_server(workers, args.threads, port)
+        try:
+            wait_until_ready(server, port, args.path)
+            result = run_clients(port, args.path, args.clients, args.duration)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(30)
+        result.update({'workers': workers, 'threads': args.threads})
+        if results and results[0]['requests_per_second']:
+            result['speedup'] = round(result['requests_per_second'] / results[0]['requests_per_second'], 2)
+        results.append(result)
+        print(f"workers={workers:2} threads={args.threads} rps={result['requests_per_second']:8.1f} "
+              f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms errors={result['errors']}")
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
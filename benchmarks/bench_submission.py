@@ -0,0 +1,158 @@
+"""
+Compare the legacy per-answer survey submission path with the batched one.
+
+By default the benchmark runs against a simulated connection that counts
+round trips and sleeps --latency-ms for each one, so it needs no database.
+Pass --live to run both paths against the test database instead.
+
+    python -m benchmarks.bench_submission --questions 7 --iterations 200 --latency-ms 2
+"""
+import argparse
+import json
+import statistics
+import time
+
+from app.utils.metadata_cache import DEFAULT_SURVEY_TITLE
+from app.utils.submissions import insert_survey_response
+
+
+def legacy_insert_survey_response(conn, answers, survey_title=DEFAULT_SURVEY_TITLE):
+    """The original conduct_survey_api write path: two commits and N+2 statements."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT survey_id FROM surveys WHERE title = ?", (survey_title,))
+    survey = cursor.fetchone()
+    if not survey:
+        return None
+    cursor.execute("INSERT INTO responses (survey_id) OUTPUT INSERTED.response_id VALUES (?)", (survey[0],))
+    response_id = int(cursor.fetchone()[0])
+    conn.commit()
+    for answer in answers:
+        cursor.execute("""
+            INSERT INTO answers (response_id, question_id, answer_value)
+            VALUES (?, ?, ?)
+        """, (response_id, answer['question_id'], answer['answer_value']))
+    conn.commit()
+    return response_id
+
+
+class SimulatedConnection:
+    """Connection stand-in that charges a fixed latency per network round trip."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.round_trips = 0
+        self._next_id = 0
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def cursor(self):
+        return SimulatedCursor(self)
+
+    def commit(self):
+        self._round_trip()
+
+    def rollback(self):
+        self._round_trip()
+
+
+class SimulatedCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.fast_executemany = False
+
+    def execute(self, sql, params=()):
+        self.conn._round_trip()
+        self.conn._next_id += 1
+
+    def executemany(self, sql, seq):
+        # Without fast_executemany pyodbc sends one statement per parameter set
+        for _ in (range(1) if self.fast_executemany else seq):
+            self.conn._round_trip()
+
+    def fetchone(self):
+        return (self.conn._next_id,)
+
+
+def build_answers(question_count, question_ids=None):
+    """Build a submission, cycling through real question ids when they are known."""
+    question_ids = question_ids or list(range(1, question_count + 1))
+    return [
+        {'question_id': question_ids[i % len(question_ids)], 'answer_value': f"Answer {i + 1}"}
+        for i in range(question_count)
+    ]
+
+
+def run_path(insert, connect, answers, iterations):
+    latencies = []
+    round_trips = 0
+    for _ in range(iterations):
+        with connect() as conn:
+            before = getattr(conn, 'round_trips', 0)
+            start = time.perf_counter()
+            insert(conn, answers)
+            latencies.append(time.perf_counter() - start)
+            round_trips += getattr(conn, 'round_trips', 0) - before
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'round_trips_per_submission': round_trips / iterations if round_trips else None,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--questions', type=int, nargs='+', default=[7, 25, 100])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated round-trip latency')
+    parser.add_argument('--live', action='store_true', help='run against Config.DB_TEST_NAME')
+    parser.add_argument('--json', action='store_true', help='also print the results as JSON')
+    args = parser.parse_args(argv)
+
+    if args.live:
+        from app.config import Config
+        from app.utils.db_utils import pooled_connection
+
+        def connect():
+            return pooled_connection(Config.DB_TEST_NAME)
+
+        with connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT question_id FROM questions ORDER BY question_id")
+            question_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT survey_id FROM surveys WHERE title = ?", (DEFAULT_SURVEY_TITLE,))
+            survey_id = cursor.fetchone()[0]
+    else:
+        from contextlib import nullcontext
+
+        def connect():
+            return nullcontext(SimulatedConnection(args.latency_ms / 1000))
+
+        question_ids = None
+        survey_id = 1
+
+    def batched_insert(conn, answers):
+        # The app resolves survey_id from the metadata cache, so no lookup is charged here
+        return insert_survey_response(conn, answers, survey_id)
+
+    results = []
+    for question_count in args.questions:
+        answers = build_answers(question_count, question_ids)
+        for name, insert in (('legacy', legacy_insert_survey_response), ('batched', batched_insert)):
+            result = run_path(insert, connect, answers, args.iterations)
+            result.update({'path': name, 'questions': question_count})
+            results.append(result)
+            print(f"{name:8} questions={question_count:4} round_trips={result['round_trips_per_submission']} "
+                  f"p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms")
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
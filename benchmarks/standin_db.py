@@ -0,0 +1,151 @@
+"""
+In-memory stand-in for SQL Server used by the endpoint benchmarks.
+
+It answers the statements the app issues (metadata loads, submission batches,
+keyset response pages, metric totals, health checks) from a synthetic data set
+of any size: response N is generated on demand from its id, so 5M responses
+cost no memory. Every execute and commit sleeps latency seconds to stand in
+for the network round trip.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.utils.metadata_cache import DEFAULT_SURVEY_TITLE
+
+# The questions seeded by app/migrations/0002_seed_default_survey.sql
+QUESTIONS = [
+    (1, 'Date of visit?', 'text', 1, None),
+    (2, 'Which site did you visit?', 'multiple_choice', 1,
+     ["Princess Alexandra Hospital", "St Margaret's Hospital", "Herts & Essex Hospital"]),
+    (3, 'Patient name?', 'text', 1, None),
+    (4, 'How easy was it to get an appointment?', 'multiple_choice', 1,
+     ["Very difficult", "Somewhat difficult", "Neutral", "Easy", "Very easy"]),
+    (5, 'Were you properly informed about your procedure?', 'multiple_choice', 1, ["Yes", "No", "Partially"]),
+    (6, 'What went well during your visit?', 'text', 0, None),
+    (7, 'Overall satisfaction (1-5)', 'multiple_choice', 1, ["1", "2", "3", "4", "5"]),
+]
+FIRST_SUBMISSION = datetime(2024, 1, 1)
+
+_TOP_PAGE = re.compile(r'SELECT\s+TOP\s*\(\?\)\s+response_id', re.IGNORECASE)
+
+
+def synthetic_answer(response_id, question):
+    question_id, _, question_type, _, options = question
+    if question_type == 'multiple_choice':
+        return options[(response_id * 7 + question_id) % len(options)]
+    if question_id == 1:
+        return (FIRST_SUBMISSION + timedelta(minutes=response_id)).strftime('%Y-%m-%d')
+    return f"Synthetic answer {response_id}-{question_id}"
+
+
+class StandInDatabase:
+    def __init__(self, responses=100000, latency=0.0):
+        self.responses = responses
+        self.latency = latency
+        self._last_id = responses
+        self._lock = threading.Lock()
+
+    def connect(self, database_name=None):
+        return StandInConnection(self)
+
+    def next_response_id(self):
+        with self._lock:
+            self._last_id += 1
+            return self._last_id
+
+    @property
+    def total_responses(self):
+        return self._last_id
+
+    def round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def submitted_at(self, response_id):
+        return FIRST_SUBMISSION + timedelta(minutes=response_id)
+
+    def response_rows(self, after_id, since, limit):
+        """Join rows (response_id, date, question_text, answer_value) for a keyset page, generated lazily."""
+        first = after_id + 1
+        if since is not None:
+            first = max(first, int((since - FIRST_SUBMISSION).total_seconds() // 60))
+        last = self.responses if limit is None else min(self.responses, first + limit - 1)
+        for response_id in range(first, last + 1):
+            date = self.submitted_at(response_id).strftime('%Y-%m-%d %H:%M')
+            for question in QUESTIONS:
+                yield (response_id, date, question[1], synthetic_answer(response_id, question))
+
+
+class StandInConnection:
+    def __init__(self, database):
+        self.database = database
+        self.autocommit = False
+
+    def cursor(self):
+        return StandInCursor(self.database)
+
+    def commit(self):
+        self.database.round_trip()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StandInCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = -1
+        self.fast_executemany = False
+        self._rows = iter(())
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        self.database.round_trip()
+        self._rows = iter(self._answer(sql, list(params)))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self.database.round_trip()
+        self._rows = iter(())
+
+    def _answer(self, sql, params):
+        db = self.database
+        if 'INSERT INTO responses' in sql:
+            return [(db.next_response_id(),)]
+        if 'COUNT_BIG(*) FROM responses' in sql:
+            return [(db.total_responses, 0, 1, len(QUESTIONS))]
+        if 'FROM surveys' in sql:
+            return [(1, DEFAULT_SURVEY_TITLE, 'Survey to collect feedback', 1)]
+        if 'FROM questions' in sql and 'JOIN' not in sql:
+            return [(q[0], 1, q[1], q[2], q[3], json.dumps(q[4]) if q[4] else None) for q in QUESTIONS]
+        if 'FROM responses' in sql and 'JOIN answers' in sql:
+            limit = params.pop(0) if _TOP_PAGE.search(sql) else None
+            after_id = params.pop(0)
+            since = params.pop(0) if params else None
+            return db.response_rows(after_id, since, limit)
+        if sql.strip().upper() == 'SELECT 1':
+            return [(1,)]
+        return []
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size=1):
+        return list(itertools.islice(self._rows, size))
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def __iter__(self):
+        return self._rows
+
+    def close(self):
+        pass
@@ -0,0 +1,55 @@
+"""
+Production server settings: gunicorn.conf.py is picked up automatically by
+
+    gunicorn app.main:app
+
+Tune with the WEB_* settings in app/config.py. `kill -HUP <master>` starts fresh
+workers and retires the old ones gracefully (with WEB_PRELOAD the application
+code itself is only re-imported on a full restart).
+"""
+import os
+import tempfile
+
+# Must be set before prometheus_client is imported so every worker writes its
+# metric values to files that /metrics aggregates
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'patient-survey-metrics'))
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+from app.config import Config  # noqa: E402
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = 'gthread'
+keepalive = Config.WEB_KEEPALIVE
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = Config.WEB_MAX_REQUESTS // 10
+preload_app = Config.WEB_PRELOAD
+accesslog = '-'
+
+
+def on_starting(server):
+    # Drop metric files left by a previous run so their counters are not added in
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    for name in os.listdir(metrics_dir):
+        if not name.endswith(f"_{os.getpid()}.db"):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def post_fork(server, worker):
+    # Connections, threads and SQLite handles are never shared across a fork. Workers serve /livez at once
+    # and set up the database in the background; concurrent migrations are serialised by a database lock
+    from app.main import start_background_services
+    start_background_services()
+
+
+def worker_exit(server, worker):
+    from app.main import stop_background_services
+    stop_background_services()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -23,6 +23,23 @@ variable "app_image_tag" {
 }
 
 
+# Archived responses (python -m app.utils.archive) leave Azure SQL for good, so they live on an
+# Azure Files share that outlives the container group; the job refuses to write anywhere else
+resource "azurerm_storage_account" "survey_data" {
+  name                     = "mypatientsurveydata"
+  resource_group_name      = data.azurerm_resource_group.existing.name
+  location                 = data.azurerm_resource_group.existing.location
+  account_tier             = "Standard"
+  account_replication_type = "ZRS"
+  min_tls_version          = "TLS1_2"
+}
+
+resource "azurerm_storage_share" "survey_archive" {
+  name               = "survey-archive"
+  storage_account_id = azurerm_storage_account.survey_data.id
+  quota              = 100
+}
+
 resource "azurerm_container_group" "survey_app" {
   name                = "survey-app-cg"
   resource_group_name = data.azurerm_resource_group.existing.name
@@ -50,6 +67,33 @@ resource "azurerm_container_group" "survey_app" {
       protocol = "TCP"
     }
 
+    liveness_probe {
+      http_get {
+        path   = "/livez"
+        port   = 8001
+        scheme = "Http"
+      }
+      period_seconds = 30
+    }
+
+    readiness_probe {
+      http_get {
+        path   = "/readyz"
+        port   = 8001
+        scheme = "Http"
+      }
+      period_seconds = 10
+    }
+
+    volume {
+      name                 = "survey-archive"
+      mount_path           = "/app/data/archive" # ARCHIVE_DIR
+      read_only            = false
+      storage_account_name = azurerm_storage_account.survey_data.name
+      storage_account_key  = azurerm_storage_account.survey_data.primary_access_key
+      share_name           = azurerm_storage_share.survey_archive.name
+    }
+
     environment_variables = {
       FLASK_HOST = "0.0.0.0"
       FLASK_PORT = "8001"
@@ -57,6 +101,7 @@ resource "azurerm_container_group" "survey_app" {
       DB_NAME     = "patient_survey_db"
       DB_USER     = var.db_user
       DB_PASSWORD = var.db_password
+      ARCHIVE_DIR = "/app/data/archive"
     }
   }
 
@@ -0,0 +1,151 @@
+// Load questions from API
+async function loadQuestions() {
+    try {
+        // Served with an ETag, so repeat visits revalidate with a cheap 304
+        const response = await fetch('/api/questions');
+
+        const questions = await response.json();
+
+        const container = document.getElementById('questionsContainer');
+        const form = document.getElementById('surveyForm');
+        const loading = document.getElementById('loading');
+
+        questions.forEach((question, index) => {
+            const questionDiv = document.createElement('div');
+            questionDiv.style.marginBottom = '32px';
+            questionDiv.style.padding = '24px';
+            questionDiv.style.border = '2px solid #E8EDEE';
+            questionDiv.style.borderRadius = '4px';
+            questionDiv.style.background = '#ffffff';
+
+            const questionText = document.createElement('div');
+            questionText.style.fontWeight = 'bold';
+            questionText.style.marginBottom = '16px';
+            questionText.style.color = '#231f20';
+            questionText.style.fontSize = '19px';
+            questionText.innerHTML = `${index + 1}. ${question.question_text}${question.is_required ? '<span style="color: #8A1538;">*</span>' : ''}`;
+
+            questionDiv.appendChild(questionText);
+
+            if (question.question_type === 'multiple_choice' && question.options.length > 0) {
+                const radioGroup = document.createElement('div');
+                radioGroup.style.marginBottom = '24px';
+
+                // Create radio buttons for ALL options
+                question.options.forEach(option => {
+                    const radioItem = document.createElement('div');
+                    radioItem.className = 'nhs-radio-item';
+
+                    const radioInput = document.createElement('input');
+                    radioInput.className = 'nhs-radio-input';
+                    radioInput.type = 'radio';
+                    radioInput.name = `question_${question.question_id}`;
+                    radioInput.value = option;
+                    radioInput.id = `question_${question.question_id}_${option.replace(/\s+/g, '_')}`;
+                    radioInput.required = question.is_required;
+
+                    const radioLabel = document.createElement('label');
+                    radioLabel.className = 'nhs-radio-label';
+                    radioLabel.htmlFor = radioInput.id;
+                    radioLabel.textContent = option;
+
+                    radioItem.appendChild(radioInput);
+                    radioItem.appendChild(radioLabel);
+                    radioGroup.appendChild(radioItem);
+                });
+
+                questionDiv.appendChild(radioGroup);
+            } else {
+                const formGroup = document.createElement('div');
+                formGroup.style.marginBottom = '24px';
+
+                const input = document.createElement('input');
+                input.style.fontFamily = "'Frutiger W01', Arial, sans-serif";
+                input.style.fontSize = '14pt';
+                input.style.padding = '8px';
+                input.style.border = '2px solid #425563';
+                input.style.borderRadius = '4px';
+                input.style.width = '100%';
+                input.style.boxSizing = 'border-box';
+                input.type = 'text';
+                input.name = `question_${question.question_id}`;
+                input.placeholder = 'Enter your answer here...';
+                input.required = question.is_required;
+                input.onfocus = function() {
+                    this.style.borderColor = '#005eb8';
+                    this.style.boxShadow = 'inset 0 1px 1px rgba(0,0,0,.075), 0 0 8px rgba(0, 94, 184, .6)';
+                };
+                input.onblur = function() {
+                    this.style.borderColor = '#425563';
+                    this.style.boxShadow = 'none';
+                };
+
+                formGroup.appendChild(input);
+                questionDiv.appendChild(formGroup);
+            }
+
+            container.appendChild(questionDiv);
+        });
+
+        loading.style.display = 'none';
+        form.style.display = 'block';
+
+    } catch (error) {
+        console.error('Error loading questions:', error);
+        document.getElementById('loading').textContent = 'Error loading questions. Please refresh the page.';
+        document.getElementById('loading').style.backgroundColor = '#8A1538';
+        document.getElementById('loading').style.color = '#ffffff';
+        document.getElementById('loading').style.padding = '16px';
+        document.getElementById('loading').style.borderRadius = '4px';
+        document.getElementById('loading').style.fontWeight = 'bold';
+    }
+}
+
+// Handle form submission
+document.getElementById('surveyForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    const formData = new FormData(this);
+    const answers = [];
+
+    // Collect all answers
+    for (let [name, value] of formData.entries()) {
+        if (value.trim() !== '') {
+            const questionId = name.replace('question_', '');
+            answers.push({
+                question_id: parseInt(questionId),
+                answer_value: value
+            });
+        }
+    }
+
+    try {
+        const response = await fetch('/api/survey', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ answers: answers })
+        });
+
+        if (response.ok) {
+            const result = await response.json();
+            document.getElementById('surveyForm').style.display = 'none';
+            document.getElementById('successMessage').style.display = 'block';
+            console.log('Survey submitted successfully:', result);
+        } else {
+            throw new Error('Server error: ' + response.status);
+        }
+    } catch (error) {
+        console.error('Error submitting survey:', error);
+        document.getElementById('errorMessage').style.display = 'block';
+        document.getElementById('errorMessage').textContent = 'Error submitting survey: ' + error.message;
+    }
+});
+
+// The server normally renders the questions; fetch them only for a page served without them
+document.addEventListener('DOMContentLoaded', function() {
+    if (!document.getElementById('surveyForm').dataset.rendered) {
+        loadQuestions();
+    }
+});
@@ -0,0 +1,136 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app import main
+from app.utils.admission import AdmissionController, AdmissionRejected, PRIORITY_SUBMISSION, PRIORITY_READ
+
+
+class TestAdmissionController(unittest.TestCase):
+    def acquire_in_thread(self, controller, endpoint, priority, order):
+        def run():
+            try:
+                controller.acquire(endpoint, priority)
+                order.append(endpoint)
+            except AdmissionRejected as e:
+                order.append(e.reason)
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def wait_for_queue(self, controller, depth):
+        deadline = time.monotonic() + 2
+        while controller.queue_depth < depth and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def test_waiters_are_admitted_by_priority(self):
+        controller = AdmissionController(capacity=1, max_queue=2, max_wait=2)
+        controller.acquire('stats')
+        order = []
+        read = self.acquire_in_thread(controller, 'responses', PRIORITY_READ, order)
+        self.wait_for_queue(controller, 1)
+        submit = self.acquire_in_thread(controller, 'survey', PRIORITY_SUBMISSION, order)
+        self.wait_for_queue(controller, 2)
+
+        with self.assertRaises(AdmissionRejected) as shed:
+            controller.acquire('stats')
+        self.assertEqual(shed.exception.reason, 'queue_full')
+
+        controller.release('stats')
+        submit.join(1)
+        self.assertEqual(order, ['survey'])
+        controller.release('survey')
+        read.join(1)
+        self.assertEqual(order, ['survey', 'responses'])
+
+    def test_full_queue_is_served_by_priority_then_arrival(self):
+        controller = AdmissionController(capacity=1, max_queue=4, max_wait=2)
+        controller.acquire('stats')
+        order, threads = [], []
+        for endpoint, priority in [('responses', PRIORITY_READ), ('survey', PRIORITY_SUBMISSION),
+                                   ('stats', PRIORITY_READ), ('batch', PRIORITY_SUBMISSION)]:
+            threads.append(self.acquire_in_thread(controller, endpoint, priority, order))
+            self.wait_for_queue(controller, len(threads))
+        self.assertEqual(controller.queue_depth, 4)
+        with self.assertRaises(AdmissionRejected) as shed:
+            controller.acquire('survey', PRIORITY_SUBMISSION)
+        self.assertEqual(shed.exception.reason, 'queue_full')
+
+        released = 'stats'
+        for expected in range(1, 5):
+            controller.release(released)
+            deadline = time.monotonic() + 1
+            while len(order) < expected and time.monotonic() < deadline:
+                time.sleep(0.001)
+            released = order[-1]
+        for thread in threads:
+            thread.join(1)
+        self.assertEqual(order, ['survey', 'batch', 'responses', 'stats'])
+        self.assertEqual((controller.in_flight, controller.queue_depth), (1, 0))
+
+    def test_endpoint_limit_and_timeout(self):
+        controller = AdmissionController(capacity=3, max_queue=5, max_wait=0.05, limits={'export': 1})
+        controller.acquire('export')
+        with self.assertRaises(AdmissionRejected) as shed:
+            controller.acquire('export')
+        self.assertEqual(shed.exception.reason, 'timeout')
+        controller.acquire('survey')  # Other endpoints still have room
+        self.assertEqual((controller.in_flight, controller.queue_depth), (2, 0))
+
+
+class TestAdmissionMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.controller = AdmissionController(capacity=1, max_queue=0, max_wait=0, retry_after=3)
+        patcher = patch.object(main, 'admission', self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = main.app.test_client()
+
+    def test_saturated_endpoint_sheds_with_retry_after(self):
+        self.controller.acquire('survey')
+        response = self.client.get('/api/stats')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '3')
+        # Endpoints without database work are not admission controlled
+        self.assertNotEqual(self.client.get('/system-metrics').status_code, 503)
+
+    def test_unadmitted_endpoints_are_served_while_capacity_is_saturated(self):
+        controller = AdmissionController(capacity=2, max_queue=0, max_wait=0)
+        database = threading.Event()
+
+        def slow_read(after_id, since):
+            database.wait(2)
+            return iter([b'{}'])
+
+        def read():
+            main.app.test_client().get('/api/responses').close()
+
+        with patch.object(main, 'admission', controller), patch.object(main, 'stream_responses', slow_read):
+            readers = [threading.Thread(target=read) for _ in range(2)]
+            for reader in readers:
+                reader.start()
+            deadline = time.monotonic() + 2
+            while controller.in_flight < 2 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            try:
+                self.assertEqual(controller.in_flight, 2)
+                self.assertEqual(self.client.get('/api/stats').status_code, 503)
+                self.assertEqual(self.client.get('/metrics').status_code, 200)
+                self.assertEqual(self.client.get('/livez').status_code, 200)
+            finally:
+                database.set()
+                for reader in readers:
+                    reader.join(2)
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_streamed_response_holds_its_slot_until_closed(self):
+        with patch.object(main, 'stream_responses', return_value=iter([b'{', b'}'])):
+            response = self.client.get('/api/responses')
+            self.assertEqual(self.controller.in_flight, 1)
+            response.close()
+        self.assertEqual(self.controller.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from app.export import iter_response_chunks
+from app.utils import archive as archive_module
+from app.utils.archive import ArchiveStorageError, ResponseArchive, persistent_mount
+from app.utils.metadata_cache import MetadataCache
+from app.utils.response_reader import archived_responses, fetch_responses_page
+from app.utils.rollups import rollup_rows
+from app.utils.sqlite_storage import SqliteStorage
+from app.utils.trends import TrendCache, find_question, load_trend
+
+SITE_A = 'Princess Alexandra Hospital'
+SITE_B = "St Margaret's Hospital"
+
+
+class TestResponseArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = SqliteStorage(os.path.join(self.tmpdir, 'survey.db'), pool_size=2)
+        self.storage.initialize()
+        self.survey = MetadataCache(self.storage.connection).get_survey()
+        self.site_question = find_question(self.survey, 'Which site did you visit?').question_id
+        self.rating_question = find_question(self.survey, 'Overall satisfaction (1-5)').question_id
+        self.archive = ResponseArchive(os.path.join(self.tmpdir, 'archive'))
+        for submitted_at, site, rating in [
+            (datetime(2024, 1, 10, 9), SITE_A, '5'),
+            (datetime(2024, 1, 20, 9), SITE_B, '2'),
+            (datetime(2024, 2, 5, 9), SITE_A, '4'),
+            (datetime(2024, 3, 1, 9), SITE_B, '3'),  # Stays hot
+            (datetime(2023, 12, 31, 9), SITE_B, '1'),  # Late upload: a higher response_id than newer responses
+        ]:
+            self.store(submitted_at, site, rating)
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def store(self, submitted_at, site, rating):
+        answers = [{'question_id': self.site_question, 'answer_value': site},
+                   {'question_id': self.rating_question, 'answer_value': rating}]
+        with self.storage.connection() as conn:
+            self.storage.write_survey_response(conn.cursor(), answers, self.survey.survey_id, submitted_at,
+                                               receipt_id=f"{submitted_at:%Y%m%d%H}".ljust(32, '0'),
+                                               rollups=rollup_rows(self.survey, answers))
+            conn.commit()
+
+    def hot_response_ids(self):
+        with self.storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT response_id FROM responses ORDER BY response_id")
+            return [row[0] for row in cursor.fetchall()]
+
+    def export(self, **kwargs):
+        return [row for chunk in iter_response_chunks(self.storage.connection, self.survey.survey_id, chunk_size=2,
+                                                      dialect=self.storage.dialect, archive=self.archive, **kwargs)
+                for row in chunk]
+
+    def trend(self, cache=None):
+        return load_trend(self.storage.connection, self.survey, self.site_question, self.rating_question, 'month',
+                          date(2023, 12, 1), date(2024, 3, 31), cache=cache, now=datetime(2024, 6, 1),
+                          dialect=self.storage.dialect, archive=self.archive)
+
+    def page(self, after_id=0, since=None, limit=10):
+        with self.storage.connection() as conn:
+            return fetch_responses_page(conn.cursor(), after_id, since, limit, self.storage.dialect,
+                                        archived_responses(self.archive, after_id, since))
+
+    def test_archived_responses_leave_the_hot_tables_but_not_the_reads(self):
+        everything, trend, page = self.export(), self.trend(), self.page()
+        with self.storage.connection() as conn:
+            totals = self.storage.load_totals(conn)
+
+        self.assertEqual(self.archive.archive(self.storage, date(2024, 3, 1)), 4)
+        self.assertEqual(self.hot_response_ids(), [4])
+        self.assertEqual(self.archive.horizon, date(2024, 3, 1))
+        self.assertEqual(sorted(p['first_submitted_at'][:7] for p in self.archive.parts()),
+                         ['2023-12', '2024-01', '2024-02'])  # One file per month
+        self.assertEqual({p['state'] for p in self.archive.parts()}, {'done'})
+        with self.storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM ingest_receipts")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("SELECT SUM(answer_count) FROM answer_rollups")
+            self.assertEqual(cursor.fetchone()[0], 10)  # Rollups are kept for /api/stats
+            self.assertEqual(self.archive.add_totals(self.storage.load_totals(conn)).submissions, totals.submissions)
+
+        self.assertEqual(self.export(), everything)
+        self.assertEqual([r[0] for r in self.export(date_from=datetime(2024, 1, 15), date_to=datetime(2024, 3, 2))],
+                         [2, 3, 4])
+        self.assertEqual(self.trend(), trend)
+        self.assertEqual(self.page(), page)
+        self.assertEqual([r['response_id'] for r in self.page(after_id=1, limit=2)['responses']], [2, 3])
+        self.assertFalse(self.archive.overlaps(date_from=datetime(2024, 3, 1)))
+
+    def test_interrupted_run_finishes_its_deletes(self):
+        with patch.object(ResponseArchive, '_delete_part', side_effect=RuntimeError('killed')):
+            with self.assertRaises(RuntimeError):
+                self.archive.archive(self.storage, date(2024, 2, 1))
+        self.assertEqual({p['state'] for p in self.archive.parts()}, {'pending'})
+        self.assertEqual(len(self.hot_response_ids()), 5)
+        self.assertEqual(len(self.export()), 5)  # Responses in both tiers are read once
+
+        self.assertEqual(self.archive.archive(self.storage, date(2024, 2, 1)), 0)
+        self.assertEqual({p['state'] for p in self.archive.parts()}, {'done'})
+        self.assertEqual(self.hot_response_ids(), [3, 4])
+
+    def test_trend_cache_is_emptied_when_the_archive_changes(self):
+        cache = TrendCache()
+        before = self.trend(cache)
+        self.assertEqual(len(cache), 4)
+        self.archive.archive(self.storage, date(2024, 3, 1))
+        self.assertEqual(self.trend(cache), before)
+        self.assertEqual(archive_module.default_horizon(30, date(2024, 3, 31)), date(2024, 3, 1))
+
+    def test_repeated_answers_in_legacy_rows_are_archived(self):
+        answers = [{'question_id': self.site_question, 'answer_value': SITE_A},
+                   {'question_id': self.site_question, 'answer_value': SITE_B}]
+        with self.storage.connection() as conn:
+            self.storage.write_survey_response(conn.cursor(), answers, self.survey.survey_id, datetime(2024, 1, 2))
+            conn.commit()
+        self.archive.archive(self.storage, date(2024, 3, 1))
+        archived = {r[0]: r[-1] for r in self.archive.iter_responses(self.survey.survey_id)}
+        self.assertEqual(archived[6], [(self.site_question, SITE_A), (self.site_question, SITE_B)])
+
+    def test_archive_refuses_storage_that_dies_with_the_container(self):
+        mounts = os.path.join(self.tmpdir, 'mounts')
+        with open(mounts, 'w') as f:
+            f.write(f"/dev/vda / ext4 rw 0 0\ntmpfs {self.tmpdir} tmpfs rw 0 0\n")
+        with patch('os.path.ismount', side_effect=lambda p: p in (os.sep, os.path.realpath(self.tmpdir))):
+            with self.assertRaises(ArchiveStorageError):
+                persistent_mount(os.path.join(self.tmpdir, 'archive'), mounts)
+            with open(mounts, 'w') as f:
+                f.write(f"//survey.file.core.windows.net/survey-archive {self.tmpdir} cifs rw 0 0\n")
+            self.assertEqual(persistent_mount(os.path.join(self.tmpdir, 'archive'), mounts),
+                             os.path.realpath(self.tmpdir))
+            with self.assertRaises(ArchiveStorageError):
+                persistent_mount(os.sep, mounts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+from app import asgi, main
+from app.utils.metadata_cache import QuestionDefinition, SurveyDefinition
+
+
+def make_survey():
+    return SurveyDefinition(1, 'Patient Experience Survey', None, True, [
+        QuestionDefinition(11, 'Were you properly informed about your procedure?', 'multiple_choice', True,
+                           ('Yes', 'No')),
+    ])
+
+
+class TestAsyncApi(unittest.TestCase):
+    def setUp(self):
+        self.survey = make_survey()
+        patcher = patch.object(main.metadata_cache, 'get_survey', return_value=self.survey)
+        self.get_survey = patcher.start()
+        self.addCleanup(patcher.stop)
+        for name in ('start_background_services', 'stop_background_services'):
+            patcher = patch.object(main, name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.client = TestClient(asgi.app)
+        self.client.__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+
+    def test_submission_is_stored_on_a_db_thread(self):
+        threads = []
+
+        def store(survey, answers):
+            threads.append(threading.current_thread().name)
+            return 42
+
+        answers = [{'question_id': 11, 'answer_value': 'Yes'}]
+        with patch.object(main, 'store_submission', side_effect=store), \
+                patch.object(main, 'index_submission') as index_submission:
+            response = self.client.post('/api/survey', json={'answers': answers})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['response_id'], 42)
+        self.assertTrue(threads[0].startswith('db'))
+        index_submission.assert_called_once_with(42, answers)  # Searchable at once, as through Flask
+
+    def test_lifespan_runs_the_background_services(self):
+        self.start_background_services.assert_called_once_with()
+        self.stop_background_services.assert_not_called()
+        self.client.__exit__(None, None, None)
+        self.stop_background_services.assert_called_once_with()
+        self.client.__enter__()  # For the cleanup
+
+    def test_invalid_submission_uses_shared_validation(self):
+        response = self.client.post('/api/survey', json={'answers': 'nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Answers must be a list')
+
+    def test_questions_revalidate_with_etag(self):
+        response = self.client.get('/api/questions')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['question_id'], 11)
+        etag = response.headers['etag']
+        self.assertEqual(self.client.get('/api/questions', headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_responses_stream_is_relayed_and_closed(self):
+        closed = []
+
+        def stream(after_id, since):
+            try:
+                yield b'{"responses": ['
+                yield b'{"response_id": 1}'
+                yield b']}'
+            finally:
+                closed.append(True)
+
+        with patch.object(main, 'stream_responses', side_effect=stream):
+            response = self.client.get('/api/responses')
+        self.assertEqual(response.json(), {'responses': [{'response_id': 1}]})
+        self.assertEqual(closed, [True])
+
+    def test_bad_cursor_is_rejected(self):
+        self.assertEqual(self.client.get('/api/responses?after=***').status_code, 400)
+
+    def test_health_reports_database_errors(self):
+        main.database_check.invalidate()
+        with patch.object(main, 'check_database', side_effect=RuntimeError('down')):
+            response = self.client.get('/health')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['status'], 'unhealthy')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import assets, main
+from app.assets import AssetManifest, build_assets
+
+
+class TestAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpdir, 'static')
+        self.output = os.path.join(self.tmpdir, 'build')
+        os.makedirs(os.path.join(self.source, 'css'))
+        self.css = b'body { color: #231f20; }\n' * 50
+        with open(os.path.join(self.source, 'css', 'site.css'), 'wb') as f:
+            f.write(self.css)
+        with open(os.path.join(self.source, 'logo.png'), 'wb') as f:
+            f.write(b'\x89PNG' + os.urandom(64))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_build_fingerprints_and_precompresses(self):
+        manifest = build_assets(self.source, self.output)
+        built = manifest['css/site.css']
+        self.assertRegex(built, r'^css/site\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.output, built)
+        with gzip.open(path + '.gz') as f:
+            self.assertEqual(f.read(), self.css)
+        self.assertFalse(os.path.exists(os.path.join(self.output, manifest['logo.png']) + '.gz'))
+
+        # Unchanged content keeps its URL; changed content gets a new one
+        self.assertEqual(build_assets(self.source, self.output)['css/site.css'], built)
+        with open(os.path.join(self.source, 'css', 'site.css'), 'ab') as f:
+            f.write(b'a { color: #005eb8; }\n')
+        self.assertNotEqual(build_assets(self.source, self.output)['css/site.css'], built)
+        self.assertTrue(os.path.exists(path))  # Kept for pages rendered before the rebuild
+
+    def test_served_with_negotiated_encoding_and_immutable_caching(self):
+        build_assets(self.source, self.output)
+        manifest = AssetManifest(self.output)
+        url = manifest.url('css/site.css')
+        client = main.app.test_client()
+        with patch.object(main, 'assets', manifest):
+            identity = client.get(url)
+            gzipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+            best = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+            missing = client.get('/assets/css/site.css')
+
+        self.assertEqual(identity.data, self.css)
+        self.assertNotIn('Content-Encoding', identity.headers)
+        self.assertEqual(gzipped.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.data), self.css)
+        self.assertEqual(gzipped.mimetype, 'text/css')
+        self.assertIn('immutable', gzipped.headers['Cache-Control'])
+        self.assertIn('max-age=31536000', gzipped.headers['Cache-Control'])
+        self.assertIn('Accept-Encoding', gzipped.headers['Vary'])
+        if assets.brotli is not None:
+            self.assertEqual(best.headers['Content-Encoding'], 'br')
+        self.assertEqual(missing.status_code, 404)
+
+    def test_asset_url_falls_back_to_static(self):
+        with main.app.test_request_context(), patch.object(main, 'assets', AssetManifest(self.output)):
+            self.assertEqual(main.asset_url('css/site.css'), '/static/css/site.css')
+
+
+if __name__ == '__main__':
+    unittest.main()
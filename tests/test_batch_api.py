@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import main
+from app.utils.metadata_cache import MetadataCache
+from app.utils.sqlite_storage import SqliteStorage
+
+
+def answers(informed='Yes', extra=None):
+    """Answers to every required question of the seeded survey"""
+    values = {1: '2025-02-03', 2: 'Princess Alexandra Hospital', 3: 'Test Patient', 4: 'Easy', 5: informed, 7: '4'}
+    values.update(extra or {})
+    return [{'question_id': question_id, 'answer_value': value} for question_id, value in values.items()]
+
+
+class TestBatchApi(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = SqliteStorage(os.path.join(self.tmpdir, 'survey.db'), pool_size=2)
+        self.storage.initialize()
+        patchers = [patch.object(main, 'storage', self.storage),
+                    patch.object(main, 'metadata_cache', MetadataCache(self.storage.connection))]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = main.app.test_client()
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def post(self, responses):
+        return self.client.post('/api/survey/batch', json={'responses': responses})
+
+    def count(self, sql):
+        with self.storage.connection() as conn:
+            return conn.cursor().execute(sql).fetchone()[0]
+
+    def test_batch_is_stored_with_client_timestamps_and_replays_are_skipped(self):
+        responses = [
+            {'answers': answers(), 'submitted_at': '2025-02-03T09:15:00+01:00', 'receipt_id': 'a' * 32},
+            {'answers': answers('No', {6: 'Tea'})},
+        ]
+        first = self.post(responses)
+        self.assertEqual(first.status_code, 201)
+        body = first.get_json()
+        self.assertEqual(body['stored'], 2)
+        self.assertEqual([r['status'] for r in body['results']], ['stored', 'stored'])
+
+        with self.storage.connection() as conn:
+            submitted_at = conn.cursor().execute("SELECT submitted_at FROM responses WHERE response_id = ?",
+                                                 (body['results'][0]['response_id'],)).fetchone()[0]
+        self.assertEqual(str(submitted_at), '2025-02-03 08:15:00')
+        self.assertEqual(self.count("SELECT COUNT(*) FROM answers"), 13)
+        self.assertEqual(self.count("SELECT SUM(answer_count) FROM answer_rollups WHERE question_id = 5"), 2)
+
+        replay = self.post(responses[:1]).get_json()
+        self.assertEqual(replay['results'], [{'index': 0, 'status': 'duplicate',
+                                              'response_id': body['results'][0]['response_id']}])
+        self.assertEqual(self.count("SELECT COUNT(*) FROM responses"), 2)
+
+    def test_javascript_utc_timestamps_are_accepted(self):
+        # Date.toISOString(), as sent by the kiosks
+        response = self.post([{'answers': answers(), 'submitted_at': '2025-02-03T08:15:00.000Z'}])
+        self.assertEqual(response.status_code, 201)
+        with self.storage.connection() as conn:
+            submitted_at = conn.cursor().execute("SELECT submitted_at FROM responses").fetchone()[0]
+        self.assertEqual(str(submitted_at), '2025-02-03 08:15:00')
+
+    def test_one_invalid_response_rejects_the_whole_batch(self):
+        response = self.post([
+            {'answers': answers()},
+            {'answers': answers(extra={999: 'Yes'})},
+            {'answers': answers(), 'submitted_at': 'yesterday'},
+            {'answers': answers(), 'submitted_at': '2999-01-01T00:00:00'},
+            {'answers': answers('Maybe')},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.get_json()['errors']
+        self.assertEqual([e['index'] for e in errors], [1, 2, 3, 4])
+        self.assertEqual(errors[3]['errors'][0]['code'], 'invalid_option')
+        self.assertEqual(self.count("SELECT COUNT(*) FROM responses"), 0)
+
+        with patch.object(main.Config, 'BATCH_MAX_RESPONSES', 1):
+            self.assertEqual(self.post([{'answers': []}, {'answers': []}]).status_code, 413)
+        self.assertEqual(self.client.post('/api/survey/batch', data='nope').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
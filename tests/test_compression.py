@@ -0,0 +1,66 @@
+import gzip
+import json
+import unittest
+
+from flask import Response
+from werkzeug.http import parse_accept_header
+
+from app.utils import compression
+from app.utils.compression import ResponseCompressor
+
+
+def accept(value):
+    return parse_accept_header(value)
+
+
+class TestResponseCompressor(unittest.TestCase):
+    def setUp(self):
+        self.compressor = ResponseCompressor(('br', 'gzip'), min_size=100)
+        self.body = json.dumps([{'question': 'What went well during your visit?', 'answer': 'Kind staff'}] * 50)
+
+    def test_negotiation_prefers_client_quality_then_server_order(self):
+        if compression.brotli is None:
+            self.skipTest('brotli not installed')
+        self.assertEqual(self.compressor.negotiate(accept('gzip, br')), 'br')
+        self.assertEqual(self.compressor.negotiate(accept('br;q=0.5, gzip')), 'gzip')
+        self.assertIsNone(self.compressor.negotiate(accept('identity')))
+        self.assertIsNone(self.compressor.negotiate(accept('')))
+
+    def test_buffered_body_is_compressed_above_threshold(self):
+        response = Response(self.body, mimetype='application/json')
+        response.set_etag('abc')
+        self.compressor.compress(response, accept('gzip'))
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.get_data()).decode(), self.body)
+        self.assertEqual(int(response.headers['Content-Length']), len(response.get_data()))
+        self.assertEqual(response.get_etag(), ('abc', True))
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+        small = self.compressor.compress(Response('{}', mimetype='application/json'), accept('gzip'))
+        self.assertNotIn('Content-Encoding', small.headers)
+        other = self.compressor.compress(Response(self.body, mimetype='image/png'), accept('gzip'))
+        self.assertNotIn('Content-Encoding', other.headers)
+
+    def test_streamed_body_is_compressed_incrementally(self):
+        closed = []
+
+        def chunks():
+            try:
+                yield '{'
+                for i in range(200):
+                    yield f'"{i}":{{"answer":"Kind staff"}},'
+                yield '"end":null}'
+            finally:
+                closed.append(True)
+
+        before = compression.compression_output_bytes.labels(encoding='gzip')._value.get()
+        response = self.compressor.compress(Response(chunks(), mimetype='application/json'), accept('gzip'))
+        self.assertNotIn('Content-Length', response.headers)
+        data = b''.join(response.response)
+        self.assertTrue(json.loads(gzip.decompress(data)))
+        self.assertEqual(closed, [True])
+        self.assertEqual(compression.compression_output_bytes.labels(encoding='gzip')._value.get() - before, len(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
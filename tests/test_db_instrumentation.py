@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from prometheus_client import REGISTRY
+
+from app.config import Config
+from app.utils.db_utils import (
+    InstrumentedConnection, db_statement, parameter_shape, statement_name
+)
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestStatementNames(unittest.TestCase):
+    def test_verb_and_table(self):
+        self.assertEqual(statement_name("SELECT survey_id FROM surveys WHERE title = ?"), 'select_surveys')
+        self.assertEqual(statement_name("INSERT INTO answers (response_id) VALUES (?)"), 'insert_answers')
+        self.assertEqual(statement_name("MERGE answer_rollups WITH (HOLDLOCK) AS t USING x"), 'merge_answer_rollups')
+        self.assertEqual(statement_name("SELECT 1"), 'select')
+
+    def test_batch_is_named_after_its_first_statement(self):
+        sql = "SET NOCOUNT ON; DECLARE @ids TABLE (id INT); INSERT INTO responses (survey_id) VALUES (?)"
+        self.assertEqual(statement_name(sql), 'insert_responses')
+
+    def test_parameter_shape_never_contains_values(self):
+        shape = parameter_shape(("Jane Doe", 42, None, datetime(2025, 1, 1)))
+        self.assertEqual(shape, "(str, int, NoneType, datetime)")
+        self.assertNotIn('Jane', shape)
+        self.assertEqual(parameter_shape(([1] * 20 + ['x'] * 5,)), "(25 params: 20 int, 5 str)")
+
+
+class TestInstrumentedCursor(unittest.TestCase):
+    def setUp(self):
+        self.raw = MagicMock()
+        self.conn = InstrumentedConnection(self.raw)
+        self.cursor = self.conn.cursor()
+
+    def test_execute_records_latency_and_rows(self):
+        labels = {'statement': 'select_questions'}
+        before_count = sample('db_query_duration_seconds_count', labels)
+        before_rows = sample('db_rows_fetched_total', labels)
+        self.raw.cursor.return_value.fetchall.return_value = [(1,), (2,), (3,)]
+
+        result = self.cursor.execute("SELECT question_id FROM questions WHERE survey_id = ?", (1,))
+        self.assertIs(result, self.cursor)
+        self.cursor.fetchall()
+        self.raw.cursor.return_value.execute.assert_called_once_with(
+            "SELECT question_id FROM questions WHERE survey_id = ?", (1,))
+        self.assertEqual(sample('db_query_duration_seconds_count', labels) - before_count, 1)
+        self.assertEqual(sample('db_rows_fetched_total', labels) - before_rows, 3)
+
+    def test_iterated_rows_are_counted_under_explicit_name(self):
+        labels = {'statement': 'export_chunk'}
+        before = sample('db_rows_fetched_total', labels)
+        self.raw.cursor.return_value.__iter__.return_value = iter([(1,), (2,)])
+        with db_statement('export_chunk'):
+            self.cursor.execute("SELECT response_id FROM responses")
+        self.assertEqual(list(self.cursor), [(1,), (2,)])
+        self.assertEqual(sample('db_rows_fetched_total', labels) - before, 2)
+
+    def test_errors_are_counted_and_reraised(self):
+        labels = {'statement': 'delete_answers', 'error': 'RuntimeError'}
+        before = sample('db_query_errors_total', labels)
+        self.raw.cursor.return_value.execute.side_effect = RuntimeError('deadlock')
+        with self.assertRaises(RuntimeError):
+            self.cursor.execute("DELETE FROM answers WHERE response_id = ?", 5)
+        self.assertEqual(sample('db_query_errors_total', labels) - before, 1)
+
+    def test_slow_query_log_has_shapes_not_values(self):
+        with patch.object(Config, 'DB_SLOW_QUERY_MS', 0), self.assertLogs('app.db.slow', 'WARNING') as logs:
+            self.cursor.execute("SELECT * FROM responses WHERE patient = ?", ('Jane Doe',))
+        self.assertIn('select_responses', logs.output[0])
+        self.assertIn('(str)', logs.output[0])
+        self.assertNotIn('Jane', logs.output[0])
+
+    def test_attributes_pass_through(self):
+        self.cursor.fast_executemany = True
+        self.assertTrue(self.raw.cursor.return_value.fast_executemany)
+        self.conn.autocommit = True
+        self.assertTrue(self.raw.autocommit)
+        self.conn.commit()
+        self.raw.commit.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from prometheus_client import CollectorRegistry
+
+from app.utils.db_metrics import DatabaseMetricsCollector, DatabaseTotals, load_totals
+
+
+class TestDatabaseMetricsCollector(unittest.TestCase):
+    def setUp(self):
+        self.loads = 0
+        self.fail = False
+
+        def loader(conn):
+            self.loads += 1
+            if self.fail:
+                raise RuntimeError('database unavailable')
+            return DatabaseTotals(120, 3, 1, 7)
+
+        @contextmanager
+        def connect():
+            yield MagicMock()
+
+        self.collector = DatabaseMetricsCollector(connect, ttl=30, loader=loader)
+        self.registry = CollectorRegistry()
+        self.registry.register(self.collector)
+
+    def test_registering_does_not_query(self):
+        self.assertEqual(self.loads, 0)
+
+    def test_totals_are_exposed_under_the_dashboard_names(self):
+        value = self.registry.get_sample_value
+        self.assertEqual(value('patient_survey_submissions_total'), 120)
+        self.assertEqual(value('patient_survey_failures_total'), 3)
+        self.assertEqual(value('active_surveys_total'), 1)
+        self.assertEqual(value('survey_questions_total'), 7)
+        self.assertEqual(value('db_metrics_up'), 1)
+
+    def test_scrapes_within_ttl_share_one_query(self):
+        for _ in range(5):
+            self.registry.get_sample_value('patient_survey_submissions_total')
+        self.assertEqual(self.loads, 1)
+
+    def test_refresh_after_ttl(self):
+        with patch('app.utils.db_metrics.time.monotonic', return_value=1000.0):
+            self.collector.totals()
+        with patch('app.utils.db_metrics.time.monotonic', return_value=1031.0):
+            self.collector.totals()
+        self.assertEqual(self.loads, 2)
+
+    def test_failed_refresh_serves_stale_values(self):
+        with patch('app.utils.db_metrics.time.monotonic', return_value=1000.0):
+            self.collector.totals()
+        self.fail = True
+        with patch('app.utils.db_metrics.time.monotonic', return_value=1031.0):
+            self.assertEqual(self.registry.get_sample_value('patient_survey_submissions_total'), 120)
+            self.assertEqual(self.registry.get_sample_value('db_metrics_up'), 0)
+            # No retry until the ttl has passed again
+            self.collector.totals()
+        self.assertEqual(self.loads, 2)
+
+    def test_no_totals_without_database(self):
+        self.fail = True
+        self.assertIsNone(self.registry.get_sample_value('patient_survey_submissions_total'))
+        self.assertEqual(self.registry.get_sample_value('db_metrics_up'), 0)
+
+    def test_concurrent_scrape_does_not_wait_for_refresh(self):
+        self.collector.totals()
+        self.collector._checked_at = 0.0  # expire
+        self.collector._lock.acquire()  # another scrape is refreshing
+        try:
+            result = []
+            worker = threading.Thread(target=lambda: result.append(self.collector.totals()))
+            worker.start()
+            worker.join(1)
+            self.assertFalse(worker.is_alive())
+            self.assertEqual(result[0].submissions, 120)
+        finally:
+            self.collector._lock.release()
+
+    def test_load_totals_is_a_single_query(self):
+        conn = MagicMock()
+        conn.cursor.return_value.fetchone.return_value = (10, None, 1, 7)
+        totals = load_totals(conn)
+        self.assertEqual(conn.cursor.return_value.execute.call_count, 1)
+        self.assertNotIn('FROM answers', conn.cursor.return_value.execute.call_args[0][0])  # No full scan
+        self.assertEqual(totals.to_dict(), {'submissions': 10, 'failures': 0, 'active_surveys': 1, 'questions': 7})
+
+
+if __name__ == "__main__":
+    unittest.main()
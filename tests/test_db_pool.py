@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import pyodbc
+from app.utils.db_utils import ConnectionPool, PoolExhaustedError
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.opened = []
+
+        def fake_connect(database_name=None):
+            conn = MagicMock(name=f"conn{len(self.opened)}")
+            self.opened.append(conn)
+            return conn
+
+        self.pool = ConnectionPool('patient_survey_test', max_size=2, min_idle=1, timeout=0.1,
+                                   max_lifetime=60, ping_interval=60, connect=fake_connect)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_connections_are_reused(self):
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+        first.rollback.assert_called()
+
+    def test_warm_opens_min_idle(self):
+        self.assertEqual(self.pool.warm(), 1)
+        self.assertEqual(self.pool.idle_count, 1)
+        self.assertEqual(self.pool.warm(), 0)
+
+    def test_checkout_times_out_when_exhausted(self):
+        a = self.pool.acquire()
+        b = self.pool.acquire()
+        with self.assertRaises(PoolExhaustedError):
+            self.pool.acquire()
+        self.pool.release(a)
+        self.pool.release(b)
+        self.assertEqual(self.pool.checked_out_count, 0)
+
+    def test_waiter_gets_released_connection(self):
+        self.pool.timeout = 2
+        a = self.pool.acquire()
+        b = self.pool.acquire()
+        threading.Timer(0.05, self.pool.release, args=(a,)).start()
+        c = self.pool.acquire()
+        self.assertIs(c, a)
+        self.pool.release(b)
+        self.pool.release(c)
+
+    def test_dead_connection_is_replaced_on_borrow(self):
+        self.pool.ping_interval = 0
+        with self.pool.connection() as conn:
+            pass
+        conn.cursor.return_value.execute.side_effect = pyodbc.Error('08S01', 'link failure')
+        time.sleep(0.01)
+        with self.pool.connection() as replacement:
+            self.assertIsNot(replacement, conn)
+        conn.close.assert_called()
+        self.assertEqual(self.pool.size, 1)
+
+    def test_old_connections_are_recycled(self):
+        self.pool.max_lifetime = 0
+        with self.pool.connection() as conn:
+            pass
+        conn.close.assert_called()
+        self.assertEqual(self.pool.size, 0)
+
+    def test_failed_reset_discards_connection(self):
+        conn = self.pool.acquire()
+        conn.rollback.side_effect = pyodbc.Error('08S01', 'link failure')
+        self.pool.release(conn)
+        self.assertEqual(self.pool.size, 0)
+        self.assertEqual(self.pool.idle_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
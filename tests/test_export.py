@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+import unittest
+from contextlib import contextmanager
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from app.export import export_responses, iter_response_chunks
+from app.utils.metadata_cache import QuestionDefinition, SurveyDefinition
+
+SURVEY = SurveyDefinition(1, 'Patient Experience Survey', None, True, [
+    QuestionDefinition(10, 'Date of visit?', 'text', True, ()),
+    QuestionDefinition(11, 'Overall satisfaction (1-5)', 'multiple_choice', True, ('1', '2', '3', '4', '5')),
+])
+
+
+class FakeDatabase:
+    """Answers the keyset export query from an in-memory list of responses."""
+
+    def __init__(self, response_count):
+        self.responses = [
+            (i, datetime(2025, 1, 1, 9, 0), {10: f"2025-01-{i:02d}", 11: str(i % 5 + 1)})
+            for i in range(1, response_count + 1)
+        ]
+        self.queries = 0
+
+    @contextmanager
+    def connect(self):
+        self.queries += 1
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+
+        def execute(sql, params):
+            top, _survey_id, after_id = params[:3]
+            rows = []
+            for response_id, submitted_at, answers in [r for r in self.responses if r[0] > after_id][:top]:
+                rows.extend((response_id, submitted_at, q, v) for q, v in sorted(answers.items()))
+            cursor.__iter__.return_value = iter(rows)
+
+        cursor.execute.side_effect = execute
+        yield conn
+
+
+class TestExport(unittest.TestCase):
+    def test_chunks_are_fixed_size_keyset_pages(self):
+        db = FakeDatabase(25)
+        chunks = list(iter_response_chunks(db.connect, 1, chunk_size=10))
+        self.assertEqual([len(c) for c in chunks], [10, 10, 5])
+        self.assertEqual(chunks[1][0][0], 11)
+        self.assertEqual(db.queries, 3)
+
+    def test_csv_has_one_column_per_question(self):
+        db = FakeDatabase(3)
+        stats = {}
+        body = b''.join(export_responses(db.connect, SURVEY, 'csv', chunk_size=2, stats=stats)).decode()
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ['response_id', 'submitted_at', 'Date of visit?', 'Overall satisfaction (1-5)'])
+        self.assertEqual(rows[1], ['1', '2025-01-01 09:00:00', '2025-01-01', '2'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(stats, {'rows': 3, 'chunks': 2})
+
+    def test_ndjson(self):
+        db = FakeDatabase(2)
+        lines = b''.join(export_responses(db.connect, SURVEY, 'ndjson')).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        record = json.loads(lines[1])
+        self.assertEqual(record['response_id'], 2)
+        self.assertEqual(record['answers']['Overall satisfaction (1-5)'], '3')
+
+    def test_parquet(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("pyarrow not installed")
+        db = FakeDatabase(7)
+        body = b''.join(export_responses(db.connect, SURVEY, 'parquet', chunk_size=3))
+        table = pq.read_table(io.BytesIO(body))
+        self.assertEqual(table.num_rows, 7)
+        self.assertEqual(table.column_names[2:], ['Date of visit?', 'Overall satisfaction (1-5)'])
+        self.assertEqual(pq.ParquetFile(io.BytesIO(body)).num_row_groups, 3)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            list(export_responses(FakeDatabase(0).connect, SURVEY, 'xlsx'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import patch
+
+from app import main
+from app.utils.metadata_cache import QuestionDefinition, SurveyDefinition
+
+
+def make_survey(options=('Yes', 'No')):
+    return SurveyDefinition(1, 'Patient Experience Survey', None, True, [
+        QuestionDefinition(5, 'Were you properly informed about your procedure?', 'multiple_choice', True, options),
+        QuestionDefinition(6, 'What went well during your visit?', 'text', False, ()),
+    ])
+
+
+class TestIndexPage(unittest.TestCase):
+    def setUp(self):
+        main._index_page = None
+        self.client = main.app.test_client()
+
+    def test_questions_are_rendered_into_the_page(self):
+        with patch.object(main.metadata_cache, 'get_survey', return_value=make_survey()):
+            response = self.client.get('/')
+        html = response.get_data(as_text=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('data-rendered="true"', html)
+        self.assertIn('id="question_5_Yes"', html)
+        self.assertIn('name="question_6"', html)
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+
+    def test_rendered_once_per_question_set_version(self):
+        with patch.object(main.metadata_cache, 'get_survey', return_value=make_survey()), \
+                patch.object(main, 'render_template', wraps=main.render_template) as render:
+            first = self.client.get('/')
+            self.client.get('/')
+            self.assertEqual(self.client.get('/', headers={'If-None-Match': first.headers['ETag']}).status_code, 304)
+            self.assertEqual(render.call_count, 1)
+
+        with patch.object(main.metadata_cache, 'get_survey', return_value=make_survey(('Yes', 'No', 'Partially'))):
+            changed = self.client.get('/')
+        self.assertNotEqual(changed.headers['ETag'], first.headers['ETag'])
+        self.assertIn('Partially', changed.get_data(as_text=True))
+
+    def test_falls_back_to_client_rendering_without_metadata(self):
+        with patch.object(main.metadata_cache, 'get_survey', side_effect=ConnectionError('database unavailable')):
+            html = self.client.get('/').get_data(as_text=True)
+        self.assertNotIn('data-rendered', html)
+        self.assertIn('Loading survey questions...', html)
+        self.assertIsNone(main._index_page)
+
+
+if __name__ == '__main__':
+    unittest.main()
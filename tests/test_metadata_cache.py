@@ -0,0 +1,60 @@
+import json
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+from app.utils.metadata_cache import MetadataCache
+
+SURVEYS = [(1, 'Patient Experience Survey', 'Survey to collect feedback', True)]
+QUESTIONS = [
+    (10, 1, 'Date of visit?', 'text', True, None),
+    (11, 1, 'Were you properly informed about your procedure?', 'multiple_choice', True,
+     json.dumps(['Yes', 'No', 'Partially'])),
+]
+
+
+class TestMetadataCache(unittest.TestCase):
+    def setUp(self):
+        self.loads = 0
+        self.questions = list(QUESTIONS)
+        self.cache = MetadataCache(self._connect, ttl=300)
+
+    @contextmanager
+    def _connect(self):
+        self.loads += 1
+        conn = MagicMock()
+        conn.cursor.return_value.fetchall.side_effect = [list(SURVEYS), list(self.questions)]
+        yield conn
+
+    def test_survey_registry_and_parsed_questions(self):
+        survey = self.cache.get_survey()
+        self.assertEqual(survey.survey_id, 1)
+        self.assertIs(self.cache.get_survey_by_id(1), survey)
+        self.assertIsNone(self.cache.get_survey('No such survey'))
+        self.assertEqual(survey.questions_by_id[11].options, ('Yes', 'No', 'Partially'))
+        body = json.loads(survey.questions_json)
+        self.assertEqual(body[0], {'question_id': 10, 'question_text': 'Date of visit?',
+                                   'question_type': 'text', 'is_required': True, 'options': []})
+
+    def test_loaded_once_within_ttl(self):
+        for _ in range(5):
+            self.cache.get_survey()
+        self.assertEqual(self.loads, 1)
+
+    def test_invalidate_reloads_and_changes_version(self):
+        etag = self.cache.get_survey().etag
+        self.questions.append((12, 1, 'Patient name?', 'text', True, None))
+        self.assertEqual(self.cache.get_survey().etag, etag)  # still cached
+        self.cache.invalidate()
+        self.assertNotEqual(self.cache.get_survey().etag, etag)
+        self.assertEqual(self.loads, 2)
+
+    def test_failed_reload_serves_stale_copy(self):
+        survey = self.cache.get_survey()
+        self.cache.invalidate()
+        self.cache._connect = MagicMock(side_effect=ConnectionError('database unavailable'))
+        self.assertIs(self.cache.get_survey(), survey)
+
+
+if __name__ == "__main__":
+    unittest.main()
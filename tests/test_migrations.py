@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from app.utils.migrations import load_migrations, migrate
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._write('0002_add_index.sql', "CREATE INDEX ix_a ON a (b);\nGO\nCREATE INDEX ix_c ON a (c);\n")
+        self._write('0001_initial.sql', "CREATE TABLE a (b INT, c INT);\n")
+        self._write('README.txt', "not a migration")
+        self.conn = MagicMock()
+        self.cursor = self.conn.cursor.return_value
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _write(self, name, body):
+        with open(os.path.join(self.tmpdir, name), 'w') as f:
+            f.write(body)
+
+    def _executed(self):
+        return [c[0][0] for c in self.cursor.execute.call_args_list]
+
+    def test_files_are_ordered_and_split_on_go(self):
+        migrations = load_migrations(self.tmpdir)
+        self.assertEqual([(m.version, m.name) for m in migrations], [(1, 'initial'), (2, 'add_index')])
+        self.assertEqual(len(migrations[1].batches), 2)
+
+    def test_duplicate_versions_are_rejected(self):
+        self._write('0001_again.sql', "SELECT 1;")
+        with self.assertRaises(ValueError):
+            load_migrations(self.tmpdir)
+
+    def test_current_schema_costs_one_query(self):
+        self.cursor.fetchone.return_value = (2,)
+        self.assertEqual(migrate(self.conn, load_migrations(self.tmpdir)), [])
+        self.assertEqual(self.cursor.execute.call_count, 1)
+
+    def test_pending_migrations_are_applied_in_order(self):
+        # current version 1; schema_version has no row for 2 yet
+        self.cursor.fetchone.side_effect = [(1,), None]
+        applied = migrate(self.conn, load_migrations(self.tmpdir))
+        self.assertEqual([m.version for m in applied], [2])
+        executed = self._executed()
+        self.assertIn('sp_getapplock', executed[1])
+        self.assertEqual(executed[3:5], ['CREATE INDEX ix_a ON a (b);', 'CREATE INDEX ix_c ON a (c);'])
+        self.assertIn('INSERT INTO schema_version', executed[5])
+        self.assertEqual(self.conn.commit.call_count, 2)
+
+    def test_failed_migration_rolls_back(self):
+        self.cursor.fetchone.side_effect = [(0,), None]
+        self.cursor.execute.side_effect = [None, None, None, RuntimeError('syntax error')]
+        with self.assertRaises(RuntimeError):
+            migrate(self.conn, load_migrations(self.tmpdir))
+        self.conn.rollback.assert_called_once()
+
+    def test_shipped_migrations_load(self):
+        versions = [m.version for m in load_migrations()]
+        self.assertEqual(versions, sorted(set(versions)))
+        self.assertGreaterEqual(len(versions), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
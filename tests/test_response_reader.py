@@ -0,0 +1,81 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from app.utils.response_reader import (
+    encode_cursor, decode_cursor, parse_since, parse_limit, MAX_PAGE_SIZE,
+    fetch_responses_page, stream_responses_json
+)
+
+ROWS = [
+    (1, '2025-01-01 09:00', 'Date of visit?', '2025-01-01'),
+    (1, '2025-01-01 09:00', 'Overall satisfaction (1-5)', '5'),
+    (2, '2025-01-02 10:30', 'Date of visit?', '2025-01-02'),
+    (3, '2025-01-03 11:15', 'Date of visit?', '2025-01-03'),
+]
+
+
+def make_cursor(rows):
+    cursor = MagicMock()
+    remaining = list(rows)
+
+    def fetchmany(size):
+        batch = remaining[:size]
+        del remaining[:size]
+        return batch
+
+    cursor.fetchmany.side_effect = fetchmany
+    return cursor
+
+
+class TestResponseReader(unittest.TestCase):
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(12345)), 12345)
+        self.assertEqual(decode_cursor(None), 0)
+        with self.assertRaises(ValueError):
+            decode_cursor('not-a-cursor')
+
+    def test_parse_arguments(self):
+        self.assertEqual(parse_since('2025-01-02'), datetime(2025, 1, 2))
+        self.assertEqual(parse_limit(str(MAX_PAGE_SIZE * 10)), MAX_PAGE_SIZE)
+        for bad in ('0', 'abc'):
+            with self.assertRaises(ValueError):
+                parse_limit(bad)
+        with self.assertRaises(ValueError):
+            parse_since('yesterday')
+
+    def test_page_pushes_keyset_into_sql(self):
+        cursor = make_cursor(ROWS[:3])
+        page = fetch_responses_page(cursor, after_id=0, since=datetime(2025, 1, 1), limit=2)
+
+        sql, params = cursor.execute.call_args[0]
+        self.assertIn("SELECT TOP (?) response_id", sql)
+        self.assertIn("submitted_at >= ?", sql)
+        self.assertEqual(params, [2, 0, datetime(2025, 1, 1)])
+        self.assertEqual([r['response_id'] for r in page['responses']], [1, 2])
+        self.assertEqual(len(page['responses'][0]['answers']), 2)
+        self.assertTrue(page['has_more'])
+        self.assertEqual(decode_cursor(page['next_cursor']), 2)
+
+    def test_empty_page_keeps_watermark(self):
+        page = fetch_responses_page(make_cursor([]), after_id=7, limit=10)
+        self.assertEqual(page['responses'], [])
+        self.assertFalse(page['has_more'])
+        self.assertEqual(decode_cursor(page['next_cursor']), 7)
+
+    def test_stream_produces_legacy_document(self):
+        cursor = make_cursor(ROWS)
+        body = ''.join(stream_responses_json(cursor, fetch_size=1))
+        data = json.loads(body)
+        self.assertEqual(list(data), ['1', '2', '3'])
+        self.assertEqual(data['1']['date'], '2025-01-01 09:00')
+        self.assertEqual(data['1']['answers'][1], {'question': 'Overall satisfaction (1-5)', 'answer': '5'})
+        cursor.fetchmany.assert_called_with(1)
+
+    def test_stream_empty(self):
+        self.assertEqual(''.join(stream_responses_json(make_cursor([]))), '{}')
+
+
+if __name__ == "__main__":
+    unittest.main()
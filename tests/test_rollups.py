@@ -0,0 +1,75 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+from app.utils.metadata_cache import QuestionDefinition, SurveyDefinition
+from app.utils.rollups import rollup_rows, build_stats, fetch_distribution
+from app.utils.submissions import insert_survey_response
+
+
+def make_survey():
+    return SurveyDefinition(1, 'Patient Experience Survey', None, True, [
+        QuestionDefinition(10, 'Patient name?', 'text', True, ()),
+        QuestionDefinition(11, 'Were you properly informed about your procedure?', 'multiple_choice', True,
+                           ('Yes', 'No', 'Partially')),
+        QuestionDefinition(12, 'Overall satisfaction (1-5)', 'multiple_choice', True, ('1', '2', '3', '4', '5')),
+    ])
+
+
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        self.survey = make_survey()
+
+    def test_only_valid_choice_answers_are_rolled_up(self):
+        rows = rollup_rows(self.survey, [
+            {'question_id': 10, 'answer_value': 'Jane Doe'},
+            {'question_id': 11, 'answer_value': 'Yes'},
+            {'question_id': 12, 'answer_value': '6'},
+            {'question_id': 99, 'answer_value': 'Yes'},
+        ])
+        self.assertEqual(rows, [(11, 'Yes', 1)])
+
+    def test_duplicate_answers_are_pre_aggregated(self):
+        rows = rollup_rows(self.survey, [
+            {'question_id': 11, 'answer_value': 'No'},
+            {'question_id': 11, 'answer_value': 'No'},
+        ])
+        self.assertEqual(rows, [(11, 'No', 2)])
+
+    def test_rollups_share_the_submission_batch(self):
+        conn = MagicMock()
+        conn.cursor.return_value.fetchone.return_value = (5,)
+        insert_survey_response(conn, [{'question_id': 11, 'answer_value': 'Yes'}], 1, rollups=[(11, 'Yes', 1)])
+        cursor = conn.cursor.return_value
+        self.assertEqual(cursor.execute.call_count, 1)
+        sql, params = cursor.execute.call_args[0]
+        self.assertIn("MERGE answer_rollups", sql)
+        self.assertEqual(params[-3:], [11, 'Yes', 1])
+        conn.commit.assert_called_once()
+
+    def test_stats_read_rollups_with_date_range(self):
+        cursor = MagicMock()
+        fetch_distribution(cursor, 1, date(2025, 1, 1), date(2025, 1, 31))
+        sql, params = cursor.execute.call_args[0]
+        self.assertIn("FROM answer_rollups", sql)
+        self.assertNotIn("answers a", sql)
+        self.assertEqual(params, [1, date(2025, 1, 1), date(2025, 1, 31)])
+
+    def test_build_stats_includes_zero_counts(self):
+        stats = build_stats(self.survey, [(11, 'Yes', 3), (11, 'No', 1)])
+        informed = stats['questions'][0]
+        self.assertEqual(informed['total'], 4)
+        self.assertEqual([o['count'] for o in informed['options']], [3, 1, 0])
+        self.assertEqual(informed['options'][0]['percent'], 75.0)
+        self.assertEqual(stats['questions'][1]['total'], 0)
+        self.assertEqual(len(stats['questions']), 2)
+
+    def test_build_stats_by_day(self):
+        stats = build_stats(self.survey, [(date(2025, 1, 1), 11, 'Yes', 2), (date(2025, 1, 2), 11, 'Yes', 1)],
+                            by_day=True)
+        self.assertEqual(stats['questions'][0]['days'], {'2025-01-01': {'Yes': 2}, '2025-01-02': {'Yes': 1}})
+        self.assertEqual(stats['questions'][0]['total'], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
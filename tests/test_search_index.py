@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from app import main
+from app.utils.metadata_cache import MetadataCache
+from app.utils.search_index import TextIndex, indexable_fields, tokenize
+from app.utils.sqlite_storage import SqliteStorage
+
+SITE_A = 'Princess Alexandra Hospital'
+SITE_B = "St Margaret's Hospital"
+
+
+class TestTextIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = SqliteStorage(os.path.join(self.tmpdir, 'survey.db'), pool_size=2)
+        self.storage.initialize()
+        self.survey = MetadataCache(self.storage.connection).get_survey()
+        self.fields = indexable_fields(self.survey, ['Patient name?', 'Date of visit?'], 'Which site did you visit?')
+        self.index = TextIndex()
+        for day, site, went_well in [
+            (1, SITE_A, 'Friendly staff and a short wait'),
+            (2, SITE_B, 'The nurses were friendly, friendly, friendly'),
+            (3, SITE_A, 'Parking was difficult'),
+        ]:
+            self.store(datetime(2025, 3, day, 10), site, went_well)
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def store(self, submitted_at, site, went_well):
+        answers = [{'question_id': 2, 'answer_value': site}, {'question_id': 3, 'answer_value': 'Jane Friendly'},
+                   {'question_id': 6, 'answer_value': went_well}]
+        with self.storage.connection() as conn:
+            response_id = self.storage.write_survey_response(conn.cursor(), answers, self.survey.survey_id,
+                                                             submitted_at)
+            conn.commit()
+        return response_id, answers
+
+    def sync(self):
+        return self.index.sync(self.storage.connection, self.survey.survey_id, *self.fields)
+
+    def test_fields_exclude_patient_names(self):
+        self.assertEqual(self.fields, ((6,), 2))
+        self.assertEqual(tokenize("The staff weren't rude!"), ['staff', 'weren', 'rude'])
+
+    def test_ranked_filtered_search_with_facets(self):
+        self.assertEqual(self.sync(), 3)
+        result = self.index.search('friendly')
+        self.assertEqual(result['total'], 2)
+        self.assertEqual([r['site'] for r in result['results']], [SITE_B, SITE_A])  # Higher term frequency first
+        self.assertCountEqual(result['facets']['sites'], [{'site': SITE_B, 'count': 1}, {'site': SITE_A, 'count': 1}])
+        self.assertIn({'term': 'staff', 'count': 1}, result['facets']['terms'])
+
+        self.assertEqual(self.index.search('friendly staff')['total'], 1)
+        self.assertEqual(self.index.search('friendly', site=SITE_A)['total'], 1)
+        self.assertEqual(self.index.search('friendly', date_from=date(2025, 3, 2))['total'], 1)
+        self.assertEqual(self.index.search('jane')['total'], 0)  # Patient names are never indexed
+
+    def test_incremental_updates_and_snapshot(self):
+        self.sync()
+        response_id, answers = self.store(datetime(2025, 3, 4, 9), SITE_B, 'Clean ward')
+        self.index.add_response(response_id, datetime(2025, 3, 4, 9), answers)
+        self.assertEqual(self.index.search('clean')['total'], 1)
+        self.store(datetime(2025, 3, 5, 9), SITE_A, 'Clean toilets')  # Stored by another worker
+        self.assertEqual(self.sync(), 1)
+        self.assertEqual(self.index.search('clean')['total'], 2)
+
+        path = os.path.join(self.tmpdir, 'index.json.gz')
+        self.index.save(path)
+        restored = TextIndex()
+        self.assertTrue(restored.load(path))
+        self.assertEqual(restored.search('clean')['results'], self.index.search('clean')['results'])
+        self.assertEqual(restored.high_water, self.index.high_water)
+
+    def test_endpoint_waits_for_the_index(self):
+        client = main.app.test_client()
+        index = TextIndex()
+        with patch.object(main, 'search_index', index):
+            self.assertEqual(client.get('/api/search?q=staff').status_code, 503)
+            index.ready.set()
+            self.assertEqual(client.get('/api/search').status_code, 400)
+            self.assertEqual(client.get('/api/search?q=staff').get_json()['total'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from prometheus_client import CollectorRegistry
+
+from app.utils.spool import SubmissionSpool, SpoolWriter, SpoolMetricsCollector
+
+
+class RejectedSubmission(Exception):
+    pass
+
+
+class TestSubmissionSpool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'spool.db')
+        self.spool = SubmissionSpool(self.path)
+        self.answers = [{'question_id': 1, 'answer_value': 'Yes'}]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_append_claim_complete(self):
+        receipt_id = self.spool.append(self.answers)
+        self.assertEqual(self.spool.depth(), 1)
+        items = self.spool.claim(10)
+        self.assertEqual([i.receipt_id for i in items], [receipt_id])
+        self.assertEqual(items[0].answers, self.answers)
+        self.assertEqual(self.spool.claim(10), [])  # leased
+        self.spool.complete([receipt_id])
+        self.assertEqual(self.spool.depth(), 0)
+        self.assertIsNone(self.spool.status(receipt_id))
+
+    def test_submissions_survive_restart(self):
+        receipt_id = self.spool.append(self.answers)
+        self.spool.claim(10, lease_seconds=0.05)  # writer "crashes" mid-batch
+        reopened = SubmissionSpool(self.path)
+        time.sleep(0.1)
+        self.assertEqual([i.receipt_id for i in reopened.claim(10)], [receipt_id])
+
+    def test_writer_retries_after_outage(self):
+        written = []
+        outage = [True]
+
+        def sink(items):
+            if outage[0]:
+                raise ConnectionError('database unavailable')
+            written.extend(i.receipt_id for i in items)
+
+        writer = SpoolWriter(self.spool, sink)
+        receipt_id = self.spool.append(self.answers)
+        with self.assertRaises(ConnectionError):
+            writer.drain_once()
+        self.assertEqual(self.spool.status(receipt_id), ('pending', 'database unavailable'))
+        outage[0] = False
+        self.assertEqual(writer.drain_once(), 1)
+        self.assertEqual(written, [receipt_id])
+        self.assertEqual(self.spool.depth(), 0)
+
+    def test_rejected_submission_is_isolated(self):
+        bad = self.spool.append([{'question_id': 999, 'answer_value': 'x'}])
+        good = self.spool.append(self.answers)
+        written, batches = [], []
+
+        def sink(items):
+            if any(i.receipt_id == bad for i in items):
+                raise RejectedSubmission('FK violation')
+            written.extend(i.receipt_id for i in items)
+
+        writer = SpoolWriter(self.spool, sink,
+                             is_permanent_error=lambda e: isinstance(e, RejectedSubmission),
+                             on_batch=batches.append)
+        self.assertEqual(writer.drain_once(), 2)
+        self.assertEqual(written, [good])
+        self.assertEqual(self.spool.status(bad), ('failed', 'FK violation'))
+        self.assertEqual(self.spool.failed_count(), 1)
+        self.assertEqual([[i.receipt_id for i in b] for b in batches], [[good]])
+
+    def test_background_writer_group_commits(self):
+        batches = []
+        writer = SpoolWriter(self.spool, lambda items: batches.append(len(items)),
+                             batch_size=50, flush_interval=0.01)
+        for _ in range(20):
+            self.spool.append(self.answers)
+        writer.start()
+        deadline = time.time() + 5
+        while self.spool.depth() and time.time() < deadline:
+            time.sleep(0.01)
+        writer.stop(timeout=1)
+        self.assertEqual(sum(batches), 20)
+        self.assertEqual(self.spool.depth(), 0)
+
+    def test_metrics_are_read_from_the_spool_file(self):
+        registry = CollectorRegistry()
+        spool = None
+        registry.register(SpoolMetricsCollector(lambda: spool))
+        self.assertEqual(registry.get_sample_value('patient_survey_spool_depth'), 0)
+
+        self.spool.append(self.answers)
+        spool = SubmissionSpool(self.path)  # e.g. another worker process
+        self.assertEqual(registry.get_sample_value('patient_survey_spool_depth'), 1)
+        self.assertGreaterEqual(registry.get_sample_value('patient_survey_spool_drain_lag_seconds'), 0)
+        self.assertEqual(registry.get_sample_value('patient_survey_spool_failed'), 0)
+
+        receipt_id = spool.claim(10)[0].receipt_id
+        spool.mark_failed(receipt_id, 'rejected')
+        self.assertEqual(registry.get_sample_value('patient_survey_spool_failed'), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+
+from app.export import export_responses
+from app.utils.metadata_cache import MetadataCache
+from app.utils.response_reader import fetch_responses_page, stream_responses_json
+from app.utils.rollups import rollup_rows, fetch_distribution, build_stats
+from app.utils.spool import SpoolItem
+from app.utils.sqlite_storage import SqliteStorage
+
+
+class TestSqliteStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = SqliteStorage(os.path.join(self.tmpdir, 'data', 'survey.db'), pool_size=2)
+        self.assertEqual([m.version for m in self.storage.initialize()], [1, 2, 3, 4])
+        self.survey = MetadataCache(self.storage.connection).get_survey()
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def submit(self, answers, submitted_at=None):
+        with self.storage.connection() as conn:
+            if submitted_at is None:
+                return self.storage.insert_survey_response(conn, answers, self.survey.survey_id,
+                                                           rollups=rollup_rows(self.survey, answers))
+            response_id = self.storage.write_survey_response(conn.cursor(), answers, self.survey.survey_id,
+                                                             submitted_at=submitted_at,
+                                                             rollups=rollup_rows(self.survey, answers))
+            conn.commit()
+            return response_id
+
+    def test_initialize_is_idempotent_and_seeds_the_survey(self):
+        self.assertEqual(self.storage.initialize(), [])
+        self.assertEqual(self.survey.title, 'Patient Experience Survey')
+        self.assertEqual(len(self.survey.questions), 7)
+        with self.storage.connection() as conn:
+            self.assertEqual(conn.cursor().execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+    def test_submissions_round_trip(self):
+        first = self.submit([{'question_id': 5, 'answer_value': 'Yes'}], datetime(2025, 1, 1, 9, 30))
+        second = self.submit([{'question_id': 5, 'answer_value': 'No'}, {'question_id': 6, 'answer_value': 'Tea'}])
+
+        with self.storage.connection() as conn:
+            page = fetch_responses_page(conn.cursor(), limit=1, dialect=self.storage.dialect)
+        self.assertEqual(page['responses'][0]['response_id'], first)
+        self.assertEqual(page['responses'][0]['date'], '2025-01-01 09:30')
+        self.assertTrue(page['has_more'])
+
+        with self.storage.connection() as conn:
+            document = json.loads(''.join(stream_responses_json(conn.cursor(), after_id=first,
+                                                                dialect=self.storage.dialect)))
+        self.assertEqual(list(document), [str(second)])
+        self.assertEqual(len(document[str(second)]['answers']), 2)
+
+        with self.storage.connection() as conn:
+            totals = self.storage.load_totals(conn)
+        self.assertEqual((totals.submissions, totals.active_surveys, totals.questions), (2, 1, 7))
+
+    def test_failures_total_counts_responses_with_an_unanswered_question(self):
+        self.submit([{'question_id': 5, 'answer_value': 'Yes'}])
+        with self.storage.connection() as conn:
+            self.storage.write_survey_response(conn.cursor(), [{'question_id': 5, 'answer_value': 'Yes'},
+                                                               {'question_id': 6, 'answer_value': None}],
+                                               self.survey.survey_id)
+            conn.commit()
+            self.assertEqual(self.storage.load_totals(conn).failures, 1)
+
+    def test_unknown_question_is_rejected_and_rolled_back(self):
+        with self.assertRaises(self.storage.integrity_errors):
+            self.submit([{'question_id': 999, 'answer_value': 'Yes'}])
+        with self.storage.connection() as conn:
+            self.assertEqual(self.storage.load_totals(conn).submissions, 0)
+
+    def test_rollups_match_a_rebuild(self):
+        self.submit([{'question_id': 5, 'answer_value': 'Yes'}], datetime(2025, 1, 1, 9, 30))
+        self.submit([{'question_id': 5, 'answer_value': 'Yes'}], datetime(2025, 1, 1, 17, 0))
+        self.submit([{'question_id': 5, 'answer_value': 'Maybe'}], datetime(2025, 1, 2, 8, 0))
+
+        def distribution():
+            with self.storage.connection() as conn:
+                return sorted(fetch_distribution(conn.cursor(), self.survey.survey_id, by_day=True))
+
+        incremental = distribution()
+        self.assertEqual(incremental, [(date(2025, 1, 1), 5, 'Yes', 2)])
+        with self.storage.connection() as conn:
+            self.assertEqual(self.storage.rebuild_rollups(conn), 1)
+        self.assertEqual(distribution(), incremental)
+        stats = build_stats(self.survey, incremental, by_day=True)
+        informed = next(q for q in stats['questions'] if q['question_id'] == 5)
+        self.assertEqual(informed['days'], {'2025-01-01': {'Yes': 2}})
+
+    def test_spooled_replay_is_idempotent(self):
+        items = [SpoolItem('a' * 32, [{'question_id': 5, 'answer_value': 'Yes'}], 1735689600.0)]
+        with self.storage.connection() as conn:
+            written = self.storage.insert_spooled_responses(conn, items, self.survey.survey_id)
+        with self.storage.connection() as conn:
+            self.assertEqual(self.storage.insert_spooled_responses(conn, items, self.survey.survey_id), {})
+            cursor = conn.cursor()
+            cursor.execute("SELECT response_id, submitted_at FROM responses")
+            self.assertEqual(cursor.fetchall(), [(written['a' * 32], datetime(2025, 1, 1))])
+
+    def test_export_reads_keyset_chunks(self):
+        for day in (1, 2, 3):
+            self.submit([{'question_id': 3, 'answer_value': f'Patient {day}'}], datetime(2025, 1, day))
+        data = b''.join(export_responses(self.storage.connection, self.survey, 'ndjson',
+                                         date_from=datetime(2025, 1, 2), chunk_size=1,
+                                         dialect=self.storage.dialect))
+        rows = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual([row['submitted_at'] for row in rows], ['2025-01-02 00:00:00', '2025-01-03 00:00:00'])
+        self.assertEqual(rows[0]['answers']['Patient name?'], 'Patient 2')
+
+
+if __name__ == '__main__':
+    unittest.main()
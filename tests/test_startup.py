@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app import main
+from app.utils.startup import CachedCheck, Startup
+
+
+class TestStartup(unittest.TestCase):
+    def test_failing_phase_is_retried_and_later_phases_wait(self):
+        migrate = MagicMock(side_effect=[RuntimeError('database not reachable'), None])
+        warm = MagicMock()
+        startup = Startup([('migrate', migrate), ('warm_pool', warm)], retry_interval=0.01)
+        startup.start()
+        self.assertTrue(startup.ready.wait(2))
+        self.assertEqual(migrate.call_count, 2)
+        warm.assert_called_once_with()
+        status = startup.status()
+        self.assertEqual(list(status['phases']), ['migrate', 'warm_pool'])
+        self.assertEqual((status['pending'], status['error']), ([], None))
+
+    def test_stop_abandons_retries(self):
+        startup = Startup([('migrate', MagicMock(side_effect=RuntimeError('down')))], retry_interval=10)
+        startup.start()
+        startup.stop(timeout=1)
+        self.assertFalse(startup.is_alive())
+        self.assertEqual(startup.status()['error'], 'migrate: down')
+        self.assertEqual(startup.status()['pending'], ['migrate'])
+
+    def test_cached_check_reuses_its_outcome(self):
+        check = MagicMock(side_effect=[None, RuntimeError('down')])
+        cached = CachedCheck(check, ttl=60)
+        self.assertEqual(cached.result(), (True, None))
+        self.assertEqual(cached.result(), (True, None))
+        self.assertEqual(check.call_count, 1)
+        cached.invalidate()
+        self.assertEqual(cached.result(), (False, 'down'))
+
+
+class TestProbes(unittest.TestCase):
+    def setUp(self):
+        self.client = main.app.test_client()
+        self.check = MagicMock()
+        patcher = patch.object(main, 'database_check', CachedCheck(self.check, ttl=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_live_at_once_and_ready_after_startup(self):
+        startup = Startup([('migrate', MagicMock())])
+        with patch.object(main, 'startup', startup):
+            self.assertEqual(self.client.get('/livez').status_code, 200)
+            response = self.client.get('/readyz')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()['startup']['pending'], ['migrate'])
+            self.check.assert_not_called()
+
+            startup.run()
+            response = self.client.get('/readyz')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.client.get('/health').status_code, 200)
+            self.check.assert_called_once_with()  # Shared by both probes
+
+            main.database_check.invalidate()
+            self.check.side_effect = RuntimeError('down')
+            self.assertEqual(self.client.get('/readyz').get_json()['status'], 'unavailable')
+
+
+if __name__ == '__main__':
+    unittest.main()
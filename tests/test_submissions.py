@@ -0,0 +1,80 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from app.utils import submissions
+from app.utils.spool import SpoolItem
+from app.utils.submissions import BatchItem, insert_survey_response, insert_spooled_responses, insert_response_batch
+
+
+class TestBatchedSubmission(unittest.TestCase):
+    def setUp(self):
+        self.conn = MagicMock()
+        self.cursor = self.conn.cursor.return_value
+        self.answers = [
+            {'question_id': 1, 'answer_value': 'Yes'},
+            {'question_id': 2, 'answer_value': 'Easy'},
+        ]
+
+    def test_single_batch_and_single_commit(self):
+        self.cursor.fetchone.return_value = (42,)
+        response_id = insert_survey_response(self.conn, self.answers, 3)
+
+        self.assertEqual(response_id, 42)
+        self.assertEqual(self.cursor.execute.call_count, 1)
+        sql, params = self.cursor.execute.call_args[0]
+        self.assertIn("CROSS JOIN (VALUES (?, ?), (?, ?))", sql)
+        self.assertEqual(params, [3, False, 1, 'Yes', 2, 'Easy'])
+        self.conn.commit.assert_called_once()
+
+    def test_large_submission_uses_fast_executemany(self):
+        self.cursor.fetchone.return_value = (7,)
+        answers = [{'question_id': 1, 'answer_value': str(i)} for i in range(submissions.MAX_INLINE_ANSWERS + 1)]
+        self.assertEqual(insert_survey_response(self.conn, answers, 3), 7)
+        self.assertTrue(self.cursor.fast_executemany)
+        rows = self.cursor.executemany.call_args[0][1]
+        self.assertEqual(len(rows), len(answers))
+        self.assertEqual(rows[0], (7, 1, '0'))
+        self.conn.commit.assert_called_once()
+
+    def test_spooled_batch_skips_stored_receipts(self):
+        items = [SpoolItem('a' * 32, self.answers, 0), SpoolItem('b' * 32, self.answers, 0)]
+        self.cursor.fetchall.return_value = [('a' * 32,)]
+        self.cursor.fetchone.return_value = (9,)
+
+        written = insert_spooled_responses(self.conn, items, 3)
+
+        self.assertEqual(written, {'b' * 32: 9})
+        # one receipt lookup plus one batch for the new submission
+        self.assertEqual(self.cursor.execute.call_count, 2)
+        sql, params = self.cursor.execute.call_args[0]
+        self.assertIn("INSERT INTO ingest_receipts", sql)
+        self.assertIn("survey_id, has_unanswered, submitted_at", sql)
+        self.assertEqual(params[:3], [3, False, datetime(1970, 1, 1)])
+        self.assertEqual(params[-1], 'b' * 32)
+        self.conn.commit.assert_called_once()
+
+    def test_bulk_upload_writes_all_responses_in_a_few_statements(self):
+        items = [BatchItem(self.answers, datetime(2025, 3, 1, 8)), BatchItem(self.answers, None, 'c' * 32),
+                 BatchItem(self.answers, None, 'd' * 32)]
+        # Receipt lookup, then the OUTPUT of the response insert, out of order
+        self.cursor.fetchall.side_effect = [[('d' * 32, 5)], [(1, 11), (0, 10)]]
+
+        results = insert_response_batch(self.conn, items, 3, rollups_for=lambda answers: [(1, 'Yes', 1)])
+
+        self.assertEqual(results, [(10, True), (11, True), (5, False)])
+        insert_sql, params = self.cursor.execute.call_args_list[1][0]
+        self.assertIn("OUTPUT s.row_index, INSERTED.response_id", insert_sql)
+        self.assertEqual(params, [datetime(2025, 3, 1, 8), False, None, False, 3])
+        answer_rows = self.cursor.executemany.call_args_list[0][0][1]
+        self.assertEqual(answer_rows, [(10, 1, 'Yes'), (10, 2, 'Easy'), (11, 1, 'Yes'), (11, 2, 'Easy')])
+        self.assertEqual(self.cursor.executemany.call_args_list[1][0][1], [('c' * 32, 11)])
+        rollup_sql, rollup_params = self.cursor.execute.call_args_list[2][0]
+        self.assertIn("SUM(v.answer_count)", rollup_sql)
+        self.assertEqual(rollup_params, [10, 1, 'Yes', 1, 11, 1, 'Yes', 1])
+        self.assertEqual(self.cursor.execute.call_count, 3)
+        self.conn.commit.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
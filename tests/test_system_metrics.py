@@ -0,0 +1,37 @@
+import gc
+import unittest
+
+from prometheus_client import REGISTRY
+
+from app.utils.system_metrics import SystemMetricsSampler
+
+
+class TestSystemMetricsSampler(unittest.TestCase):
+    def test_sample_fills_gauges(self):
+        sampler = SystemMetricsSampler(interval=60, start_time=0)
+        sample = sampler.sample()
+        self.assertGreater(sample['memory_bytes'], 0)
+        self.assertGreaterEqual(sample['threads'], 1)
+        self.assertGreater(sample['open_fds'], 0)
+        self.assertEqual(sample['memory_growth_bytes'], 0)  # First sample is the baseline
+        self.assertEqual(REGISTRY.get_sample_value('app_memory_usage_bytes'), sample['memory_bytes'])
+        self.assertGreater(REGISTRY.get_sample_value('app_uptime_seconds'), 0)
+
+    def test_gc_runs_are_counted_as_deltas(self):
+        sampler = SystemMetricsSampler(interval=60)
+        before = REGISTRY.get_sample_value('app_gc_collections_total', {'generation': '2'}) or 0
+        gc.collect()
+        sampler.sample()
+        after = REGISTRY.get_sample_value('app_gc_collections_total', {'generation': '2'})
+        self.assertEqual(after - before, 1)
+
+    def test_thread_stops_promptly(self):
+        sampler = SystemMetricsSampler(interval=60)
+        sampler.start()
+        sampler.stop(timeout=2)
+        self.assertFalse(sampler.is_alive())
+        self.assertIn('cpu_percent', sampler.last_sample)
+
+
+if __name__ == "__main__":
+    unittest.main()
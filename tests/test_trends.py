@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from app import main
+from app.utils.metadata_cache import MetadataCache
+from app.utils.sqlite_storage import SqliteStorage
+from app.utils.trends import TrendCache, bucket_range, find_question, load_trend
+
+SITE_A = 'Princess Alexandra Hospital'
+SITE_B = "St Margaret's Hospital"
+
+
+class TestTrends(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = SqliteStorage(os.path.join(self.tmpdir, 'survey.db'), pool_size=2)
+        self.storage.initialize()
+        self.survey = MetadataCache(self.storage.connection).get_survey()
+        self.site_question = find_question(self.survey, 'Which site did you visit?').question_id
+        self.rating_question = find_question(self.survey, 'Overall satisfaction (1-5)').question_id
+        for submitted_at, site, rating in [
+            (datetime(2025, 3, 2, 23, 59), SITE_A, '5'),  # Sunday
+            (datetime(2025, 3, 3, 8, 0), SITE_A, '3'),    # Monday
+            (datetime(2025, 3, 3, 9, 0), SITE_B, '4'),
+            (datetime(2025, 3, 31, 12, 0), SITE_B, None),
+            (datetime(2025, 4, 1, 0, 0), SITE_A, '1'),
+        ]:
+            answers = [{'question_id': self.site_question, 'answer_value': site}]
+            if rating:
+                answers.append({'question_id': self.rating_question, 'answer_value': rating})
+            with self.storage.connection() as conn:
+                self.storage.write_survey_response(conn.cursor(), answers, self.survey.survey_id, submitted_at)
+                conn.commit()
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def trend(self, granularity, first, last, site=None, cache=None, now=datetime(2025, 4, 1, 12)):
+        return load_trend(self.storage.connection, self.survey, self.site_question, self.rating_question,
+                          granularity, first, last, site, cache=cache, now=now, dialect=self.storage.dialect)
+
+    def test_buckets_by_week_and_month(self):
+        weeks = self.trend('week', date(2025, 3, 1), date(2025, 3, 9))
+        self.assertEqual([(b['start'], b['responses']) for b in weeks], [('2025-02-24', 1), ('2025-03-03', 2)])
+        self.assertEqual(weeks[1]['satisfaction'], 3.5)
+        self.assertEqual([s['site'] for s in weeks[1]['sites']], [SITE_A, SITE_B])
+
+        months = self.trend('month', date(2025, 3, 15), date(2025, 4, 1))
+        self.assertEqual([(b['start'], b['end'], b['responses'], b['rated']) for b in months],
+                         [('2025-03-01', '2025-04-01', 4, 3), ('2025-04-01', '2025-05-01', 1, 1)])
+        self.assertEqual([b['closed'] for b in months], [False, False])
+
+        only_b = self.trend('month', date(2025, 3, 1), date(2025, 3, 31), site=SITE_B)
+        self.assertEqual(only_b[0]['responses'], 2)
+        self.assertEqual(only_b[0]['satisfaction'], 4.0)
+
+    def test_closed_buckets_are_cached_until_a_late_upload(self):
+        cache = TrendCache()
+        first = self.trend('day', date(2025, 3, 2), date(2025, 4, 1), cache=cache)
+        self.assertEqual(len(first), 31)
+        self.assertEqual(len(cache), 28)  # Days that ended 48 hours ago or more
+
+        with patch('app.utils.trends.fetch_trend_rows', return_value=[]) as fetch:
+            again = self.trend('day', date(2025, 3, 2), date(2025, 4, 1), cache=cache)
+        start, end = fetch.call_args[0][5:7]
+        self.assertEqual((start, end), (datetime(2025, 3, 30), datetime(2025, 4, 2)))
+        self.assertEqual(again[0], first[0])
+
+        cache.invalidate([date(2025, 3, 3)])
+        self.assertEqual(len(cache), 27)
+
+    def test_late_upload_stored_by_another_worker_invalidates_every_cache(self):
+        caches = [TrendCache(), TrendCache()]  # One per worker process
+        before = [self.trend('day', date(2025, 3, 2), date(2025, 4, 1), cache=cache) for cache in caches]
+        self.assertEqual(before[0][1]['responses'], 2)
+
+        # Stored through neither cache, as by a third worker's spool writer
+        with self.storage.connection() as conn:
+            self.storage.write_survey_response(conn.cursor(), [{'question_id': self.site_question,
+                                                                'answer_value': SITE_B}],
+                                               self.survey.survey_id, datetime(2025, 3, 3, 10, 0))
+            conn.commit()
+        for cache in caches:
+            after = self.trend('day', date(2025, 3, 2), date(2025, 4, 1), cache=cache)
+            self.assertEqual(after[1]['responses'], 3)
+            self.assertEqual(after[2:], before[0][2:])
+            self.assertEqual(len(cache), 28)
+
+    def test_endpoint_validates_parameters(self):
+        client = main.app.test_client()
+        self.assertEqual(client.get('/api/trends?by=year').status_code, 400)
+        self.assertEqual(client.get('/api/trends?from=2025-02-01&to=2025-01-01').status_code, 400)
+        self.assertEqual(client.get('/api/trends?from=2000-01-01&to=2025-01-01').status_code, 400)
+        self.assertEqual(len(bucket_range(date(2025, 1, 31), date(2025, 3, 1), 'month')), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch
+
+from app import main
+from app.utils.metadata_cache import QuestionDefinition, SurveyDefinition
+from app.utils.validation import SubmissionValidator
+
+
+class TestSubmissionValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = SubmissionValidator([
+            QuestionDefinition(1, 'Date of visit?', 'text', True, ()),
+            QuestionDefinition(5, 'Were you properly informed about your procedure?', 'multiple_choice', True,
+                               ('Yes', 'No', 'Partially')),
+            QuestionDefinition(6, 'What went well during your visit?', 'text', False, ()),
+        ])
+
+    def test_valid_answers(self):
+        self.assertEqual(self.validator.validate([
+            {'question_id': 1, 'answer_value': '2025-01-01'},
+            {'question_id': 5, 'answer_value': 'Partially'},
+        ]), [])
+
+    def test_errors_are_reported_per_field(self):
+        errors = self.validator.validate([
+            {'question_id': 1, 'answer_value': '   '},
+            {'question_id': 5, 'answer_value': 'Maybe'},
+            {'question_id': 6, 'answer_value': 3},
+            {'question_id': 42, 'answer_value': 'Yes'},
+            {'question_id': '5th', 'answer_value': 'Yes'},
+            'Yes',
+        ])
+        self.assertEqual([(e['field'], e['code']) for e in errors], [
+            ('answers[1].answer_value', 'invalid_option'),
+            ('answers[2].answer_value', 'invalid_type'),
+            ('answers[3].question_id', 'unknown_question'),
+            ('answers[4].question_id', 'unknown_question'),
+            ('answers[5]', 'malformed'),
+            ('answers', 'required'),
+        ])
+        self.assertEqual(errors[-1]['question_id'], 1)  # Question 5 already has its invalid_option
+        self.assertEqual(errors[0]['message'], 'Must be one of: Yes, No, Partially')
+
+    def test_required_question_gets_one_error(self):
+        errors = self.validator.validate([
+            {'question_id': 1, 'answer_value': 20250101},
+            {'question_id': 5, 'answer_value': None},
+        ])
+        self.assertEqual([(e['field'], e['code'], e['question_id']) for e in errors], [
+            ('answers[0].answer_value', 'invalid_type', 1),
+            ('answers', 'required', 5),
+        ])
+
+    def test_optional_question_may_be_null_and_ids_may_be_numeric_strings(self):
+        answers = [
+            {'question_id': '1', 'answer_value': '2025-01-01'},
+            {'question_id': 5, 'answer_value': 'Yes'},
+            {'question_id': '6', 'answer_value': None},
+        ]
+        self.assertEqual(self.validator.validate(answers), [])
+        self.assertEqual([a['question_id'] for a in answers], [1, 5, 6])
+
+    def test_repeated_question_is_rejected(self):
+        errors = self.validator.validate([
+            {'question_id': 1, 'answer_value': '2025-01-01'},
+            {'question_id': 5, 'answer_value': 'Yes'},
+            {'question_id': 5, 'answer_value': 'No'},
+        ])
+        self.assertEqual([(e['field'], e['code'], e['question_id']) for e in errors],
+                         [('answers[2].question_id', 'duplicate', 5)])
+
+    def test_invalid_submission_is_rejected_without_a_connection(self):
+        survey = SurveyDefinition(1, 'Patient Experience Survey', None, True, [
+            QuestionDefinition(5, 'Were you properly informed about your procedure?', 'multiple_choice', True,
+                               ('Yes', 'No')),
+        ])
+        with patch.object(main.metadata_cache, 'get_survey', return_value=survey), \
+                patch.object(main.storage, 'connection', side_effect=AssertionError('connection borrowed')):
+            response = main.app.test_client().post('/api/survey', json={'answers': [
+                {'question_id': 5, 'answer_value': 'Maybe'}
+            ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['errors'][0]['code'], 'invalid_option')
+
+    def test_malformed_json_is_a_bad_request(self):
+        with patch.object(main.storage, 'connection', side_effect=AssertionError('connection borrowed')):
+            response = main.app.test_client().post('/api/survey', data='{"answers": [',
+                                                   content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'No JSON data provided or missing answers field')
+
+
+if __name__ == '__main__':
+    unittest.main()